@@ -0,0 +1,211 @@
+"""
+Benchmark OpenBNMAPI against the offline mock BNM server.
+
+Measures, for every endpoint:
+- latency percentiles of sequential calls
+- throughput of one shared client under increasing concurrency
+- memory allocated by a call (tracemalloc peak), for rtype='json' and rtype='df'
+- JSON decoding and DataFrame conversion cost of the payload alone
+
+    python benchmarks/bench_client.py --output bench_results.json
+    python benchmarks/bench_client.py --latency 0.02 --scale 10 --compare bench_results.json
+
+Results are written as JSON so that runs of different releases can be compared with --compare.
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from mock_server import MockBNMServer
+
+import openbnmapi
+from openbnmapi import decoding
+from openbnmapi.frames import to_frame
+
+# One representative call per endpoint: (name, path relative to the base url, call)
+ENDPOINT_CALLS = [
+    ("base_rate", "/base-rate", lambda c, rtype: c.base_rate(rtype=rtype)),
+    ("base_rate_by_bank", "/base-rate/MBBEMYKL", lambda c, rtype: c.base_rate(bank_codes="MBBEMYKL", rtype=rtype)),
+    ("daily_fx_turnover", "/fx-turn-over/year/2020/month/1",
+     lambda c, rtype: c.daily_fx_turnover(year=2020, month=1, rtype=rtype)),
+    ("exchange_rate", "/exchange-rate", lambda c, rtype: c.exchange_rate(rtype=rtype)),
+    ("exchange_rate_month", "/exchange-rate/USD/year/2020/month/1",
+     lambda c, rtype: c.exchange_rate(currency_code="USD", year=2020, month=1, rtype=rtype)),
+    ("consumer_alert", "/consumer-alert", lambda c, rtype: c.consumer_alert(rtype=rtype)),
+    ("interbank_swap", "/interbank-swap/year/2020/month/1",
+     lambda c, rtype: c.interbank_swap(year=2020, month=1, rtype=rtype)),
+    ("interest_rate", "/interest-rate/year/2020/month/1",
+     lambda c, rtype: c.interest_rate(year=2020, month=1, rtype=rtype)),
+    ("interest_volume", "/interest-volume/year/2020/month/1",
+     lambda c, rtype: c.interest_volume(year=2020, month=1, rtype=rtype)),
+    ("islamic_interback_rate", "/islamic-interbank-rate/year/2020/month/1",
+     lambda c, rtype: c.islamic_interback_rate(year=2020, month=1, rtype=rtype)),
+    ("kijang_emas", "/kijang-emas/year/2020/month/1", lambda c, rtype: c.kijang_emas(year=2020, month=1, rtype=rtype)),
+    ("overnight_policy_rate", "/opr", lambda c, rtype: c.overnight_policy_rate(rtype=rtype)),
+    ("renminbi_deposit_acceptance_rate", "/renminbi-deposit-acceptance-rate",
+     lambda c, rtype: c.renminbi_deposit_acceptance_rate(rtype=rtype)),
+    ("renminbi_fx_forward_price", "/renminbi-fx-forward-price",
+     lambda c, rtype: c.renminbi_fx_forward_price(rtype=rtype)),
+    ("usd_interbank_intraday_rate", "/usd-interbank-intraday-rate/year/2020/month/1",
+     lambda c, rtype: c.usd_interbank_intraday_rate(year=2020, month=1, rtype=rtype)),
+    ("kl_usd_reference_rate", "/kl-usd-reference-rate/year/2020/month/1",
+     lambda c, rtype: c.kl_usd_reference_rate(year=2020, month=1, rtype=rtype)),
+]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def pick(q):
+        return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": pick(0.50) * 1000,
+        "p90_ms": pick(0.90) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+def make_client(server, **kwargs):
+    client = openbnmapi.OpenBNMAPI(**kwargs)
+    client.base_url = server.url
+    return client
+
+
+def bench_latency(server, iterations):
+    results = {}
+    with make_client(server) as client:
+        for name, _, call in ENDPOINT_CALLS:
+            call(client, "json")  # warm up the connection
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                call(client, "json")
+                samples.append(time.perf_counter() - start)
+            results[name] = percentiles(samples)
+    return results
+
+
+def bench_throughput(server, total, levels):
+    results = {}
+    for workers in levels:
+        with make_client(server, pool_size=workers) as client:
+            calls = [ENDPOINT_CALLS[i % len(ENDPOINT_CALLS)][2] for i in range(total)]
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda call: call(client, "json"), calls))
+            elapsed = time.perf_counter() - start
+        results[str(workers)] = {"requests": total, "seconds": elapsed, "requests_per_second": total / elapsed}
+    return results
+
+
+def bench_memory(server):
+    results = {}
+    with make_client(server) as client:
+        for name, _, call in ENDPOINT_CALLS:
+            results[name] = {}
+            for rtype in ("json", "df"):
+                call(client, rtype)
+                tracemalloc.start()
+                call(client, rtype)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results[name][rtype + "_peak_bytes"] = peak
+    return results
+
+
+def time_per_call(func, min_time=0.2):
+    loops, elapsed = 0, 0.0
+    start = time.perf_counter()
+    while elapsed < min_time:
+        func()
+        loops += 1
+        elapsed = time.perf_counter() - start
+    return elapsed / loops
+
+
+def bench_conversion(server):
+    results = {}
+    for name, path, _ in ENDPOINT_CALLS:
+        body = server.payloads.get(path)
+        payload = json.loads(body)
+        results[name] = {
+            "payload_bytes": len(body),
+            "json_loads_ms": time_per_call(lambda: json.loads(body)) * 1000,
+            "backend_loads_ms": time_per_call(lambda: decoding.loads(body)) * 1000,
+            "streaming_ms": time_per_call(lambda: list(decoding.iter_json_items([body]))) * 1000,
+            "to_frame_ms": time_per_call(lambda: to_frame(path, payload)) * 1000,
+        }
+    return results
+
+
+def compare(current, baseline_path):
+    # Print the change of every numeric result against an earlier run
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def walk(new, old, prefix):
+        for key, value in new.items():
+            if key not in old:
+                continue
+            if isinstance(value, dict):
+                walk(value, old[key], prefix + key + ".")
+            elif isinstance(value, (int, float)) and old[key]:
+                print("{:<70} {:>12.3f} {:>12.3f} {:>+8.1%}".format(prefix + key, old[key], value, value / old[key] - 1))
+
+    for section in ("latency", "throughput", "memory", "conversion"):
+        walk(current.get(section, {}), baseline.get(section, {}), section + ".")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the results")
+    parser.add_argument("--compare", help="Earlier results to compare against")
+    parser.add_argument("--iterations", type=int, default=50, help="Sequential calls per endpoint")
+    parser.add_argument("--requests", type=int, default=400, help="Calls per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma separated worker counts")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency added by the mock server (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 429/503 responses")
+    parser.add_argument("--scale", type=int, default=1, help="Payload size multiplier")
+    parser.add_argument("--payload-dir", help="Directory of recorded payloads")
+    args = parser.parse_args()
+
+    server = MockBNMServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           scale=args.scale, payload_dir=args.payload_dir)
+    with server:
+        results = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "json_backend": decoding.BACKEND,
+                "settings": vars(args),
+            },
+            "latency": bench_latency(server, args.iterations),
+            "throughput": bench_throughput(server, args.requests, [int(n) for n in args.concurrency.split(",")]),
+            "memory": bench_memory(server),
+            "conversion": bench_conversion(server),
+        }
+        results["meta"]["server_requests"] = server.requests
+        results["meta"]["server_bytes_sent"] = server.bytes_sent
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results written to {}".format(args.output))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
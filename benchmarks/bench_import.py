@@ -0,0 +1,115 @@
+"""
+Benchmark the import time of openbnmapi and check which heavy modules each entry point loads.
+
+Every scenario runs in fresh interpreters. The time of its statements is measured inside the interpreter, so
+Python's own startup is left out. Heavy modules (pandas, numpy, orjson, pyarrow, aiohttp) must only be loaded
+by the scenarios that use them: a scenario loading one it should not fails the run, as does a median over
+--max-ms. Use it in CI to guard against import time regressions.
+
+    python benchmarks/bench_import.py --output import_results.json
+    python benchmarks/bench_import.py --runs 20 --max-ms 400 --compare import_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+from datetime import datetime, timezone
+
+# Benchmark the working tree rather than an installed copy
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "numpy", "orjson", "pyarrow", "aiohttp"]
+
+# (name, statements, heavy modules it may load)
+SCENARIOS = [
+    ("import", "import openbnmapi", []),
+    ("client", "from openbnmapi import OpenBNMAPI\nOpenBNMAPI()", []),
+    ("json", "from openbnmapi.decoding import loads\nloads(b'{\"data\": []}')", ["orjson"]),
+    ("cli", "import openbnmapi.__main__", []),
+    ("dataframe", "from openbnmapi.frames import to_frame\nto_frame('/kijang-emas', {'data': []})",
+     ["pandas", "numpy"]),
+    ("async_client", "from openbnmapi import AsyncOpenBNMAPI\nAsyncOpenBNMAPI()", []),
+]
+
+RUNNER = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile({statements!r}, "<scenario>", "exec"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_scenario(statements, runs):
+    code = RUNNER.format(statements=statements, heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    samples, loaded = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        samples.append(result["ms"])
+        loaded.update(result["loaded"])
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "loaded": sorted(loaded),
+    }
+
+
+def compare(current, baseline_path):
+    # Print the change of the median of every scenario against an earlier run
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old and old["median_ms"]:
+            print("{:<20} {:>10.1f} {:>10.1f} {:>+8.1%}".format(
+                name, old["median_ms"], result["median_ms"], result["median_ms"] / old["median_ms"] - 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="import_results.json", help="Where to write the results")
+    parser.add_argument("--compare", help="Earlier results to compare against")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per scenario")
+    parser.add_argument("--max-ms", type=float, help="Fail if the median of a scenario takes longer (ms)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": vars(args),
+        },
+        "scenarios": {},
+    }
+    failures = []
+    for name, statements, allowed in SCENARIOS:
+        result = results["scenarios"][name] = run_scenario(statements, args.runs)
+        unexpected = sorted(set(result["loaded"]) - set(allowed))
+        if unexpected:
+            failures.append("{} loads {}".format(name, ", ".join(unexpected)))
+        if args.max_ms is not None and result["median_ms"] > args.max_ms:
+            failures.append("{} takes {:.1f} ms, over {:.1f} ms".format(name, result["median_ms"], args.max_ms))
+        print("{:<20} {:>8.1f} ms  loads: {}".format(name, result["median_ms"], ", ".join(result["loaded"]) or "-"))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results written to {}".format(args.output))
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if failures:
+        print("\n".join(["FAILED:"] + failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
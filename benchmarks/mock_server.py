@@ -0,0 +1,185 @@
+"""
+Offline stand-in for the BNM Open API, for benchmarks and local experiments.
+
+    python benchmarks/mock_server.py --port 8000 --latency 0.05 --error-rate 0.01
+
+then point a client at it:
+
+    obnmapi = OpenBNMAPI()
+    obnmapi.base_url = "http://127.0.0.1:8000/public"
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from payloads import PayloadStore
+
+BASE_PATH = "/public"
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # Room for the connections of a burst of requests (eg: a snapshot). With the default backlog of 5, the extra
+    # connection attempts are dropped and retried a second later
+    request_queue_size = 128
+
+
+class MockBNMServer:
+
+    """
+    Threaded HTTP server replaying BNM payloads.
+
+    params:
+
+    port: int
+        Port to listen on. Defaults to a free port
+    latency: float
+        Seconds added before every response
+    jitter: float
+        Random extra latency in [0, jitter] seconds
+    error_rate: float
+        Share of requests answered with a 503 (half of them) or a 429 with Retry-After: 0 (the other half)
+    scale: int
+        Size multiplier of the synthetic payloads
+    payload_dir: string
+        Directory of recorded payloads, see payloads.PayloadStore
+    etags: bool
+        Send an ETag with every payload and answer If-None-Match with 304 Not Modified
+    quota: int
+        Requests allowed per second, the extra ones get a 429 with Retry-After: 1. Defaults to no quota
+    script: list
+        Answers of the first requests, in order, before the server behaves as usual: a status code or a
+        (status code, headers) tuple, eg: [503, (429, {"Retry-After": "1"})]. Sent with an empty body
+    """
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, scale=1, payload_dir=None, seed=0,
+                 etags=False, quota=None, script=None):
+        self.latency = latency
+        self.script = list(script or [])
+        self.etags = etags
+        self.quota = quota
+        self.throttled = 0
+        self._window = (0, 0)
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.payloads = PayloadStore(payload_dir, scale)
+        self.requests = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _HTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}{}".format(self._server.server_port, BASE_PATH)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, Nagle + delayed ACK would add ~40ms to every response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    roll = server._random.random()
+                    delay = server.latency + server._random.uniform(0, server.jitter)
+                    over_quota = server._over_quota()
+                    scripted = server.script.pop(0) if server.script else None
+                if over_quota:
+                    return self._send(429, headers={"Retry-After": "1"})
+                if delay:
+                    time.sleep(delay)
+
+                if scripted is not None:
+                    status, headers = scripted if isinstance(scripted, tuple) else (scripted, None)
+                    return self._send(status, headers=headers)
+
+                if roll < server.error_rate / 2:
+                    return self._send(503)
+                if roll < server.error_rate:
+                    return self._send(429, headers={"Retry-After": "0"})
+                if not self.path.startswith(BASE_PATH):
+                    return self._send(404)
+
+                body = server.payloads.get(self.path[len(BASE_PATH):])
+                if body is None:
+                    return self._send(404)
+                if not server.etags:
+                    return self._send(200, body)
+
+                etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, headers={"ETag": etag})
+                self._send(200, body, {"ETag": etag})
+
+        return Handler
+
+    def _over_quota(self):
+        # Fixed one second windows, called with the lock held
+        if self.quota is None:
+            return False
+        second, count = self._window
+        now = int(time.time())
+        count = count + 1 if now == second else 1
+        self._window = (now, count)
+        if count > self.quota:
+            self.throttled += 1
+            return True
+        return False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--payload-dir")
+    parser.add_argument("--etags", action="store_true")
+    parser.add_argument("--quota", type=int)
+    args = parser.parse_args()
+
+    server = MockBNMServer(args.port, args.latency, args.jitter, args.error_rate, args.scale, args.payload_dir,
+                           etags=args.etags, quota=args.quota)
+    print("Serving mock BNM API on {}".format(server.url))
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
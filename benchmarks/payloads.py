@@ -0,0 +1,150 @@
+"""
+Payloads replayed by the mock BNM server.
+
+If a directory of recorded responses is given, a file named after the request path is served as is, eg:
+`kijang-emas__year__2020__month__1.json` for /kijang-emas/year/2020/month/1. Any other request gets a synthetic
+payload with the same shape as the BNM API v1 responses.
+"""
+import calendar
+import json
+import os
+import random
+import sys
+
+from datetime import date, timedelta
+
+# Benchmark the working tree rather than an installed copy
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openbnmapi import constants
+
+INTRADAY_TIMES = ["0900", "1000", "1100", "1200", "1500", "1600"]
+TENURES = ["overnight", "1_week", "1_month", "3_month", "6_month", "1_year"]
+
+
+def business_days(year, month):
+    last = calendar.monthrange(year, month)[1]
+    return [date(year, month, day) for day in range(1, last + 1) if date(year, month, day).weekday() < 5]
+
+
+def _rate(rng, base):
+    return round(base + rng.uniform(-0.05, 0.05), 4)
+
+
+def _dated(endpoint, day, rng, scale):
+    if endpoint == "/kijang-emas":
+        return {
+            "effective_date": day.isoformat(),
+            "one_oz": {"buying": _rate(rng, 7000), "selling": _rate(rng, 7300)},
+            "half_oz": {"buying": _rate(rng, 3500), "selling": _rate(rng, 3700)},
+            "quarter_oz": {"buying": _rate(rng, 1750), "selling": _rate(rng, 1900)},
+        }
+    if endpoint == "/usd-interbank-intraday-rate":
+        times = INTRADAY_TIMES * scale
+        return {"date": day.isoformat(), "rate": [{"time": t, "rate": _rate(rng, 4.2)} for t in times]}
+    if endpoint == "/kl-usd-reference-rate":
+        return {"date": day.isoformat(), "rate": _rate(rng, 4.2)}
+    if endpoint == "/fx-turn-over":
+        return {"date": day.isoformat(), "total_sum": _rate(rng, 12000)}
+    record = {"date": day.isoformat()}
+    for tenure in TENURES * scale:
+        record[tenure] = _rate(rng, 3.0)
+    return record
+
+
+def synthetic_payload(path, scale=1, seed=0):
+    """
+    Build a payload shaped like the BNM response of `path` (relative to the base url).
+
+    params:
+
+    scale: int
+        Multiplies the size of the nested parts of each record, to test large payloads
+    """
+    rng = random.Random("{}{}".format(seed, path))
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    endpoint = "/" + parts[0]
+    args = parts[1:]
+
+    days = [date(2020, 1, 2)]
+    by_period = False
+    if "date" in args:
+        day = date.fromisoformat(args[args.index("date") + 1])
+        days = [day] if day.weekday() < 5 else []
+        by_period = True
+    elif "year" in args and "month" in args:
+        days = business_days(int(args[args.index("year") + 1]), int(args[args.index("month") + 1]))
+        by_period = True
+
+    if by_period and not days:
+        return None
+
+    if endpoint == "/exchange-rate":
+        codes = [args[0]] if args and args[0] not in ("date", "year") else constants.currency_codes[:25] * scale
+
+        def rate(day):
+            mid = _rate(rng, 4.0)
+            return {"date": day.isoformat(), "buying_rate": mid - 0.01, "selling_rate": mid + 0.01, "middle_rate": mid}
+
+        if "year" in args:
+            data = {"currency_code": codes[0], "unit": 1, "rate": [rate(day) for day in days]}
+        elif args and args[0] not in ("date", "year"):
+            data = {"currency_code": codes[0], "unit": 1, "rate": rate(days[0])}
+        else:
+            data = [{"currency_code": code, "unit": 1, "rate": rate(days[0])} for code in codes]
+    elif endpoint == "/base-rate":
+        banks = [args[0]] if args else constants.SWIFT_codes
+        data = [
+            {"bank_code": bank, "bank_name": "Bank {}".format(bank), "base_rate": _rate(rng, 2.5),
+             "base_lending_rate": _rate(rng, 5.5), "indicative_eff_lending_rate": _rate(rng, 4.0)}
+            for bank in banks
+        ]
+        data = data[0] if args else data
+    elif endpoint == "/consumer-alert":
+        data = [
+            {"name": "Company {} Sdn Bhd".format(i), "registration_number": str(100000 + i),
+             "added_date": (date(2018, 1, 1) + timedelta(days=i)).isoformat(),
+             "websites": ["http://example{}.com".format(i)]}
+            for i in range(300 * scale)
+        ]
+    elif endpoint == "/opr":
+        data = {"year": 2020, "date": "2020-07-07", "new_opr_level": 1.75, "change_in_opr": -0.25}
+    else:
+        data = [_dated(endpoint, day, rng, scale) for day in days]
+        if not by_period or "date" in args:
+            data = data[0]
+
+    return {"data": data, "meta": {"last_updated": "2020-01-02 12:00:00", "total_result": len(days)}}
+
+
+class PayloadStore:
+
+    """
+    Serves recorded payloads from `directory` when available, synthetic ones otherwise. Encoded payloads are
+    memoized so that the server does not measure its own JSON encoding.
+    """
+    def __init__(self, directory=None, scale=1):
+        self.directory = directory
+        self.scale = scale
+        self._cache = {}
+
+    def get(self, path):
+        """
+        returns: the encoded body for `path`, or None if there is no data (404)
+        rtype: bytes
+        """
+        path = path.split("?", 1)[0]
+        if path not in self._cache:
+            self._cache[path] = self._load(path)
+        return self._cache[path]
+
+    def _load(self, path):
+        if self.directory:
+            name = path.strip("/").replace("/", "__") + ".json"
+            recorded = os.path.join(self.directory, name)
+            if os.path.exists(recorded):
+                with open(recorded, "rb") as f:
+                    return f.read()
+
+        payload = synthetic_payload(path, self.scale)
+        return None if payload is None else json.dumps(payload).encode()
@@ -1,2 +1,33 @@
-from .openbnmapi import *
-from .constants import *
\ No newline at end of file
+import importlib
+import importlib.util
+
+# Constants and exceptions are light and imported right away. The clients (and requests, aiohttp, ...) are
+# imported on first access, eg: openbnmapi.OpenBNMAPI, and pandas, numpy and orjson on first use
+from .constants import *
+from .exceptions import *
+
+# Public names of the submodules, imported on first access
+_LAZY = {
+    "OpenBNMAPI": "openbnmapi",
+    "STREAM_CHUNK_SIZE": "openbnmapi",
+    "AsyncOpenBNMAPI": "aio",
+    "AsyncBNMSession": "aio",
+}
+
+# Keep `from openbnmapi import *` exporting the clients
+__all__ = sorted(name for name in globals() if not name.startswith("_") and name != "importlib") + sorted(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module("." + _LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    if importlib.util.find_spec("." + name, __name__) is not None:
+        # Submodule not imported yet, eg: openbnmapi.analytics
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
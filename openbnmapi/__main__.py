@@ -0,0 +1,110 @@
+# Command line exporter:
+#
+#   python -m openbnmapi kijang_emas kl_usd_reference_rate --start 2015-01-01 --format csv --output exports
+#   python -m openbnmapi exchange_rate --param currency_code=USD,SGD --start 2020-01-01 --end 2020-12-31
+#
+# See export.py. An interrupted export resumes when the same command is run again.
+
+import argparse
+import os
+import sys
+
+# Local modules
+from .cache import SQLiteCache
+from .endpoints import ENDPOINTS
+from .export import EXTENSIONS, FORMATS, Exporter, plan
+from .openbnmapi import OpenBNMAPI
+
+
+def default_cache_path():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "openbnmapi", "cache.sqlite")
+
+
+def parse_params(values):
+    # ['currency_code=USD,SGD', 'session=0900'] -> {'currency_code': ['USD', 'SGD'], 'session': ['0900']}
+    params = {}
+    for value in values or []:
+        key, sep, given = value.partition("=")
+        if not sep or not key or not given:
+            raise ValueError("Invalid --param {}, expected KEY=VALUE[,VALUE...]".format(value))
+        params.setdefault(key, []).extend(item for item in given.split(",") if item)
+    return params
+
+
+def parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m openbnmapi",
+        description="Export BNM Open API endpoints over a date range to CSV, JSON Lines or Parquet.",
+    )
+    parser.add_argument("endpoints", nargs="+", metavar="endpoint",
+                        help="endpoints to export: {}".format(", ".join(ENDPOINTS)))
+    parser.add_argument("--start", help="first day of the range (YYYY-MM-DD). Without it, the latest data")
+    parser.add_argument("--end", help="last day of the range (YYYY-MM-DD). Defaults to today")
+    parser.add_argument("--param", action="append", metavar="KEY=VALUE[,VALUE...]",
+                        help="endpoint argument, eg: currency_code=USD,SGD (one file per value, 'all' for every "
+                             "currency or bank BNM publishes), product=interbank, session=0900. Repeatable")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="output format. Defaults to the extension of --output, or jsonl")
+    parser.add_argument("--output", default="-",
+                        help="directory of the files (one per endpoint and argument values), a file for a single "
+                             "one, or - for stdout. Defaults to -")
+    parser.add_argument("--workers", type=int, default=8, help="requests sent in parallel. Defaults to 8")
+    parser.add_argument("--rate-limit", type=float, help="maximum requests per second")
+    parser.add_argument("--cache", default=default_cache_path(),
+                        help="on-disk cache of the responses. Defaults to {}".format(default_cache_path()))
+    parser.add_argument("--no-cache", action="store_true", help="do not use the on-disk cache")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="start over instead of resuming an interrupted export")
+    parser.add_argument("--quiet", action="store_true", help="do not print progress and summary")
+    parser.add_argument("--base-url", help="API base url, eg: of a mirror or a mock server")
+    return parser
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    progress = None if args.quiet else sys.stderr
+
+    fmt = args.format
+    if fmt is None:
+        fmt = next((name for name, extension in EXTENSIONS.items() if args.output.endswith(extension)), "jsonl")
+
+    cache = None
+    if not args.no_cache:
+        os.makedirs(os.path.dirname(os.path.abspath(args.cache)), exist_ok=True)
+        cache = SQLiteCache(args.cache)
+
+    client = OpenBNMAPI(pool_size=max(10, args.workers), cache=cache, rate_limit=args.rate_limit)
+    if args.base_url:
+        client.base_url = args.base_url.rstrip("/")
+
+    try:
+        params = parse_params(args.param)
+        series = plan(client, args.endpoints, params, args.start, args.end)
+        run = {"endpoints": args.endpoints, "params": params, "start": args.start, "end": args.end, "format": fmt}
+        exporter = Exporter(client, args.output, fmt, args.workers, args.overwrite, progress)
+        summary = exporter.run(series, run, args.start, args.end)
+    except (ValueError, ImportError) as e:
+        print("Error: {}".format(e), file=sys.stderr)
+        return 2
+    finally:
+        client.close()
+        if cache is not None:
+            cache.close()
+
+    if progress is not None:
+        print("{requests} requests ({skipped} already done, {failed} failed, {cache_hits} from the cache), "
+              "{records} records in {seconds}s: {requests_per_second} requests/s, {records_per_second} records/s"
+              .format(**summary), file=progress)
+    if summary["interrupted"]:
+        print("Interrupted, run the same command again to resume", file=sys.stderr)
+        return 130
+    if summary["failed"]:
+        print("{} requests failed, run the same command again to retry them".format(summary["failed"]),
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+import asyncio
+import time
+
+# Local modules
+from . import constants
+from .arrow import batch_reader, records_to_table
+from .cache import CachedResponse
+from .exceptions import BNMNotFoundError, OpenBNMAPIError
+from .fanout import FanOutResult, published_codes
+from .openbnmapi import OpenBNMAPI, _request_info
+from .ratelimit import as_rate_limiter
+from .ranges import DATE_ENDPOINTS, merge_range_results, split_date_range
+from .records import endpoint_of
+from .singleflight import AsyncSingleFlight
+from .snapshot import SnapshotResult, snapshot_requests
+from .session import RetryingSession, is_conditional
+
+
+class AsyncBNMSession(RetryingSession):
+
+    """
+    asyncio counterpart of BNMSession, built on aiohttp (pip install openbnmapi[async]).
+
+    One connection pool is shared by every request. `concurrency` bounds how many requests are in flight
+    at once and `rate_limiter` spaces them out. A request waiting to be retried does not count as in flight.
+
+    params:
+
+    headers: dict
+        Headers sent with every request
+    pool_size: int
+        Maximum number of open connections. Defaults to 10
+    timeout: float or tuple(float, float)
+        Connect and read timeouts in seconds. Defaults to (3.05, 30)
+    max_retries: int
+        How many times a request is retried on timeouts, connection errors, 429 and 5xx. Defaults to 3
+    backoff_factor: float
+        Base delay in seconds for the exponential backoff. Defaults to 0.5
+    backoff_max: float
+        Longest we are willing to sleep between two attempts, including Retry-After. Defaults to 30
+    concurrency: int
+        Maximum number of requests in flight. Defaults to 10
+    rate_limiter: RateLimiter
+        Optional client-side rate limiter, see BNMSession
+    """
+    def __init__(self, headers=None, pool_size=10, timeout=(3.05, 30), max_retries=3, backoff_factor=0.5,
+                 backoff_max=30, concurrency=10, rate_limiter=None):
+        self.headers = headers
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+
+    def _create_session(self):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AsyncOpenBNMAPI requires aiohttp. Install it with: pip install openbnmapi[async]")
+
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+        else:
+            connect = read = self.timeout
+
+        # The session has to be created from within the running event loop
+        return aiohttp.ClientSession(
+            headers=self.headers,
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+        )
+
+    async def get(self, url, params=None, headers=None, info=None):
+        """
+        Send a GET request, retrying transient failures.
+
+        info: dict
+            Optional request info (see metrics.Metrics) to fill with the status code, retries and timings
+
+        returns: the response for a 2xx status code, or 304 if `headers` make the request conditional, with its
+            body already read
+        rtype: CachedResponse
+
+        raises: BNMTimeoutError, BNMConnectionError or a BNMHTTPError subclass
+        """
+        import aiohttp
+
+        if self.session is None:
+            self.session = self._create_session()
+
+        endpoint = info.get("endpoint") if info is not None else None
+        conditional = is_conditional(headers)
+        attempt = 0
+        while True:
+            # Waits for the rate limiter and the backoff do not hold a concurrency slot
+            if self.rate_limiter is not None:
+                self._rate_limit_waited(info, await self.rate_limiter.acquire_async(endpoint))
+
+            if info is not None:
+                info["retries"] = attempt
+            async with self.semaphore:
+                try:
+                    start = time.perf_counter()
+                    async with self.session.get(url, params=params, headers=headers) as r:
+                        headers_at = time.perf_counter()
+                        content = await r.read()
+                        response = CachedResponse(r.status, dict(r.headers), content, str(r.url))
+                    if info is not None:
+                        info["status_code"] = r.status
+                        info["ttfb"] = headers_at - start
+                        info["download"] = time.perf_counter() - headers_at
+                        info["size"] = len(content)
+                except asyncio.TimeoutError as e:
+                    delay = self._failure_delay(attempt, url, True, e)
+                except aiohttp.ClientConnectionError as e:
+                    delay = self._failure_delay(attempt, url, False, e)
+                else:
+                    delay = self._response_delay(attempt, endpoint, response, info, conditional)
+                    if delay is None:
+                        return response
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class AsyncOpenBNMAPI(OpenBNMAPI):
+
+    """
+    asyncio version of OpenBNMAPI. Every public endpoint method is available with the same arguments and
+    validation, and returns an awaitable:
+
+        async with AsyncOpenBNMAPI(concurrency=20, rate_limit=10) as obnmapi:
+            rates = await asyncio.gather(*(obnmapi.exchange_rate(currency_code=c) for c in ["USD", "SGD"]))
+
+    Invalid arguments raise ValueError straight away, when the method is called.
+
+    params:
+
+    Same as OpenBNMAPI, plus:
+
+    concurrency: int
+        Maximum number of requests in flight. Defaults to 10
+    rate_limit: float or RateLimiter
+        Maximum requests per second sent by this client, or a RateLimiter with per endpoint budgets.
+        Defaults to no limit
+    """
+    def __init__(self, default_rtype = 'json', pool_size=10, timeout=(3.05, 30), max_retries=3,
+                 backoff_factor=0.5, session=None, cache=None, cache_ttls=None, conditional=False, coalesce=True,
+                 concurrency=10, rate_limit=None):
+        if session is None:
+            session = AsyncBNMSession(headers=constants.headers, pool_size=pool_size,
+                                      timeout=timeout, max_retries=max_retries, backoff_factor=backoff_factor,
+                                      concurrency=concurrency, rate_limiter=as_rate_limiter(rate_limit))
+        super().__init__(default_rtype, session=session, cache=cache, cache_ttls=cache_ttls, conditional=conditional,
+                         coalesce=coalesce)
+        # Waiting tasks must not block the event loop
+        self.inflight = AsyncSingleFlight() if coalesce else None
+        self._alert_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' with AsyncOpenBNMAPI")
+
+    """
+    Close the pooled connections
+    """
+    async def close(self):
+        await self.session.close()
+
+    """
+    Helper function to send requests. Same as OpenBNMAPI._send_get_request but awaitable.
+    """
+    async def _send_get_request(self, req_url, params={}):
+        info = self.metrics.start(endpoint_of(req_url[len(self.base_url):]), req_url, params)
+        try:
+            key, cached = self._cache_lookup(req_url, params, info)
+            if cached is not None:
+                r = cached
+            elif self.inflight is None:
+                r = await self._fetch(req_url, params, key, info)
+            else:
+                r, shared = await self.inflight.do(key, lambda: self._fetch(req_url, params, key, info))
+                if shared:
+                    self._coalesced(r, info)
+        except Exception as e:
+            self.metrics.finish(info, e)
+            raise
+
+        _request_info.set(info)
+        return r
+
+    """
+    Helper function to send a request. Same as OpenBNMAPI._fetch but awaitable.
+    """
+    async def _fetch(self, req_url, params, key, info=None):
+        stale = self._validated(key)
+        r = await self.session.get(req_url, params=params, headers=self._conditional_headers(stale), info=info)
+        r = self._revalidate(key, stale, r, info)
+        return self._cache_store(req_url, key, r, info)
+
+    """
+    Helper function to handle return types of data. Receives the pending request from the endpoint methods
+    and returns an awaitable of the converted data.
+    """
+    def _return_response(self, response, rtype):
+        return self._await_response(response, rtype)
+
+    async def _await_response(self, response, rtype):
+        return OpenBNMAPI._return_response(self, await response, rtype)
+
+    """
+    Helper function for the list / "all" forms of exchange_rate and base_rate. Same as OpenBNMAPI._fan_out, but
+    the missing codes are fetched concurrently on the event loop.
+    """
+    async def _fan_out(self, endpoint, key, codes, fetch_one, fetch_latest, rtype=None, dated=False):
+        latest = None
+        if codes is None:
+            latest = await fetch_latest()
+            codes = published_codes(latest, key)
+        elif not dated and len(codes) > 1:
+            try:
+                latest = await fetch_latest()
+            except OpenBNMAPIError:
+                latest = False
+
+        result = FanOutResult(endpoint, codes)
+        if latest is not None:
+            result.requests += 1
+        if latest and not dated:
+            result.add_latest(latest, key)
+
+        async def fetch(code):
+            try:
+                result.add(code, await fetch_one(code))
+            except OpenBNMAPIError as e:
+                result.errors[code] = e
+
+        missing = result.missing()
+        result.requests += len(missing)
+        await asyncio.gather(*(fetch(code) for code in missing))
+
+        return result.response(rtype or self.default_rtype)
+
+    """
+    Get the Financial Consumer Alert list as a local index. Same as OpenBNMAPI.consumer_alert_index, but
+    awaitable. The index itself (search, match, screen) is synchronous, it sends no requests.
+    """
+    async def consumer_alert_index(self, max_age=None):
+        async with self._alert_lock:
+            now = time.time()
+            if self._alert_index_fresh(now, max_age):
+                return self._alert_index
+            return self._update_alert_index(now, await self.consumer_alert(rtype='json'))
+
+    """
+    Fetch every record of a date-aware endpoint between two dates. Same as OpenBNMAPI.fetch_range, but the
+    requests run concurrently on the event loop, bounded by the client's concurrency.
+    """
+    async def fetch_range(self, endpoint, start, end, max_edge_days=3, rtype = 'json', **kwargs):
+        name, method = self._range_endpoint(endpoint, kwargs)
+        requests_args = split_date_range(start, end, max_edge_days)
+
+        async def fetch(args):
+            try:
+                return await method(rtype='json', **kwargs, **args)
+            except BNMNotFoundError:
+                return None
+
+        payloads = await asyncio.gather(*(fetch(args) for args in requests_args))
+
+        records = merge_range_results([payload for payload in payloads if payload is not None], start, end)
+        return self._range_response(name, records, start, end, len(requests_args), rtype)
+
+    """
+    Get the records of a date-aware endpoint between two dates as Arrow record batches. Same as
+    OpenBNMAPI.fetch_range_batches, but the requests run concurrently on the event loop, bounded by the client's
+    concurrency, and are all done when it returns: a pyarrow.RecordBatchReader is read synchronously. The records
+    of each request are converted to Arrow as soon as it is done, the Arrow tables of the range are held until
+    the stream is read. Needs pyarrow.
+    """
+    async def fetch_range_batches(self, endpoint, start, end, max_edge_days=3, **kwargs):
+        name, method = self._range_endpoint(endpoint, kwargs)
+        requests_args = split_date_range(start, end, max_edge_days)
+        path = DATE_ENDPOINTS[name]
+
+        async def fetch(args):
+            try:
+                payload = await method(rtype='json', **kwargs, **args)
+            except BNMNotFoundError:
+                return None
+            return records_to_table(path, merge_range_results([payload], start, end))
+
+        tables = await asyncio.gather(*(fetch(args) for args in requests_args))
+        return batch_reader(path, [table for table in tables if table is not None])
+
+    """
+    Fetch the latest data of every endpoint at once. Same as OpenBNMAPI.snapshot, but the requests run
+    concurrently on the event loop, bounded by the client's concurrency. Requests still in flight at the
+    deadline are cancelled.
+    """
+    async def snapshot(self, endpoints=None, deadline=10, rtype = 'json'):
+        requests_args = snapshot_requests(endpoints)
+        result = SnapshotResult(requests_args)
+
+        async def fetch(request):
+            key, name, kwargs = request
+            try:
+                result.add(key, await getattr(self, name)(rtype=rtype, **kwargs))
+            except Exception as e:
+                result.fail(key, e)
+
+        tasks = [asyncio.ensure_future(fetch(request)) for request in requests_args]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=deadline)
+            for task in pending:
+                task.cancel()
+        return result.response(deadline)
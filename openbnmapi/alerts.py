@@ -0,0 +1,175 @@
+# Local index of the Financial Consumer Alert list, to search and screen names without one request each.
+# Names are normalized (accents, case and punctuation dropped, legal forms such as "Sdn Bhd" ignored), searched
+# by token and matched fuzzily by the similarity of their character trigrams.
+import math
+import re
+import unicodedata
+
+from functools import lru_cache
+from itertools import chain
+
+# Local modules
+from .records import extract_records
+
+NON_WORD = re.compile(r"[\W_]+")
+
+# Legal forms left out of the names before matching, "Acme Sdn Bhd" is the same as "Acme Berhad"
+LEGAL_FORMS = frozenset([
+    "sdn", "bhd", "berhad", "sendirian", "plt", "pte", "ltd", "limited", "llc", "llp", "inc", "incorporated",
+    "corp", "corporation", "co", "company", "plc", "gmbh", "ag", "sa", "bv", "pty",
+])
+
+NGRAM = 3
+
+
+@lru_cache(maxsize=65536)
+def normalize(name):
+    """
+    Normalize a name for matching: accents, case, punctuation and legal forms are dropped.
+    eg: 'Émas Dinar  SDN. BHD.' -> 'emas dinar'
+
+    rtype: string
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    tokens = NON_WORD.sub(" ", stripped.casefold()).split()
+    significant = [token for token in tokens if token not in LEGAL_FORMS]
+    # A name made of legal forms only is kept as is
+    return " ".join(significant or tokens)
+
+
+def ngrams(key, n=NGRAM):
+    """
+    returns: the character n-grams of a normalized name, padded so that word edges count. eg: 'ab' -> {' ab', 'ab '}
+    rtype: frozenset(string)
+    """
+    padded = " {} ".format(key)
+    return frozenset(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+
+
+class AlertIndex:
+
+    """
+    In-memory index of consumer alert records: an inverted index of the tokens and of the trigrams of their
+    names. Building it takes a few milliseconds for the whole list, a match then takes microseconds.
+
+    params:
+
+    records: list(dict)
+        Consumer alert records, eg: extract_records(obnmapi.consumer_alert())
+    fields: list(string)
+        Fields of the records that are indexed. Defaults to ['name']
+    meta: dict
+        meta of the response the records come from
+    """
+    def __init__(self, records, fields=("name",), meta=None):
+        self.records = list(records)
+        self.fields = tuple(fields)
+        self.meta = meta or {}
+        # One entry per indexed name: (record id, normalized name, its trigrams)
+        self._entries = []
+        self._tokens = {}
+        self._grams = {}
+        for record_id, record in enumerate(self.records):
+            for field in self.fields:
+                value = record.get(field)
+                if isinstance(value, str) and value.strip():
+                    self._add(record_id, value)
+        self._matches = lru_cache(maxsize=16384)(self._match)
+
+    @classmethod
+    def from_payload(cls, payload, fields=("name",)):
+        """
+        Build the index of a consumer_alert() response.
+        """
+        return cls(extract_records(payload), fields, payload.get("meta") if isinstance(payload, dict) else None)
+
+    def _add(self, record_id, name):
+        key = normalize(name)
+        if not key:
+            return
+        entry_id = len(self._entries)
+        grams = ngrams(key)
+        self._entries.append((record_id, key, grams))
+        for token in set(key.split()):
+            self._tokens.setdefault(token, []).append(entry_id)
+        for gram in grams:
+            self._grams.setdefault(gram, []).append(entry_id)
+
+    def __len__(self):
+        return len(self.records)
+
+    def search(self, query, limit=20):
+        """
+        Token search: the records whose names contain every word of the query, in any order, most similar
+        first. Unlike consumer_alert(search_query=...), queries of any length are accepted.
+
+        returns: list of (score, record)
+        rtype: list(tuple(float, dict))
+        """
+        key = normalize(query)
+        tokens = set(key.split())
+        if not tokens:
+            return []
+        postings = sorted((self._tokens.get(token, ()) for token in tokens), key=len)
+        found = set(postings[0]).intersection(*postings[1:])
+        grams = ngrams(key)
+        return self._ranked(((entry_id, self._similarity(grams, entry_id)) for entry_id in found), limit)
+
+    def match(self, name, threshold=0.8, limit=5):
+        """
+        Fuzzy match of one name: the records whose names have a trigram similarity (Dice coefficient of the
+        normalized names) of at least `threshold`, 1.0 being the same normalized name.
+
+        returns: list of (score, record), best first
+        rtype: list(tuple(float, dict))
+        """
+        return list(self._matches(normalize(name), threshold, limit))
+
+    def screen(self, names, threshold=0.8, limit=5):
+        """
+        Fuzzy match a batch of names, eg: the counterparties of a screening run. Names seen before (after
+        normalization) are answered from memory.
+
+        returns: {name: [(score, record), ...]}, an empty list for the names without a match
+        rtype: dict
+        """
+        return {name: list(self._matches(normalize(name), threshold, limit)) for name in names}
+
+    def _match(self, key, threshold, limit):
+        if not key:
+            return ()
+        grams = ngrams(key)
+        size = len(grams)
+        # A name scoring `threshold` has between `low` and `high` trigrams and shares at least `low` with the
+        # query, so it holds one of the query's size - low + 1 rarest: only their postings are read
+        low = threshold * size / (2.0 - threshold) - 1e-9
+        high = size * (2.0 - threshold) / max(threshold, 1e-9) + 1e-9
+        needed = max(int(math.ceil(low)), 1)
+        rarest = sorted((self._grams.get(gram, ()) for gram in grams), key=len)[:size - needed + 1]
+        entries = self._entries
+        scored = []
+        for entry_id in set(chain.from_iterable(rarest)):
+            other = entries[entry_id][2]
+            if not low <= len(other) <= high:
+                continue
+            score = 2.0 * len(grams & other) / (size + len(other))
+            if score >= threshold:
+                scored.append((entry_id, score))
+        return tuple(self._ranked(scored, limit))
+
+    def _similarity(self, grams, entry_id):
+        other = self._entries[entry_id][2]
+        return 2.0 * len(grams & other) / (len(grams) + len(other))
+
+    def _ranked(self, scored, limit):
+        # Best score per record, a record may be indexed under several fields
+        best = {}
+        for entry_id, score in scored:
+            record_id = self._entries[entry_id][0]
+            if score > best.get(record_id, -1.0):
+                best[record_id] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(round(score, 4), self.records[record_id]) for record_id, score in ranked]
@@ -0,0 +1,311 @@
+# Vectorized analytics on the DataFrame form of the endpoints (rtype='df'), see frames.SCHEMAS for their layout:
+# exchange rates are indexed by (date, currency_code) with MYR per `unit` units of the currency (quote 'rm'),
+# kijang emas, interest rates and the OPR are indexed by date.
+import json
+import threading
+
+# Local modules
+from . import constants
+from .asof import AsOfRates
+from .exceptions import BNMNotFoundError
+from .lazy import LazyModule
+from .ranges import to_date
+
+# Loaded on the first call
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+DATE_LEVEL = "date"
+
+
+def myr_rates(frame, rate="middle_rate"):
+    """
+    MYR price of one unit of each currency: exchange rates are quoted per `unit` units (eg: 100 JPY).
+
+    rtype: pandas.Series
+    """
+    return frame[rate] / frame["unit"].fillna(1.0)
+
+
+def _snapshot(frame, date=None):
+    # Rows of one date (the last one by default), indexed by currency code
+    dates = frame.index.get_level_values(DATE_LEVEL)
+    day = dates.max() if date is None else pd.Timestamp(to_date(date))
+    snapshot = frame[dates == day]
+    if snapshot.empty:
+        raise ValueError("No exchange rates on {}".format(day.date()))
+    return snapshot.droplevel(DATE_LEVEL)
+
+
+def cross_rates(frame, date=None, rate="middle_rate", include_myr=True):
+    """
+    Cross rates between every pair of currencies of one exchange rate snapshot, in one vectorized division.
+
+    params:
+
+    frame: pandas.DataFrame
+        exchange_rate(rtype='df') frame, quote 'rm'
+    date: string<date> or date
+        Snapshot to use. Defaults to the last date of the frame
+    rate: string
+        'middle_rate', 'buying_rate' or 'selling_rate'
+    include_myr: bool
+        Add MYR as a currency. Defaults to True
+
+    returns: matrix where cross.loc[a, b] is the price of one `a` in `b`
+    rtype: pandas.DataFrame
+    """
+    per_unit = myr_rates(_snapshot(frame, date), rate)
+    codes = per_unit.index.astype(str).tolist()
+    values = per_unit.to_numpy(dtype=float)
+    if include_myr:
+        codes.append("MYR")
+        values = np.append(values, 1.0)
+
+    matrix = values[:, None] / values[None, :]
+    return pd.DataFrame(matrix, index=pd.Index(codes, name="base"), columns=pd.Index(codes, name="quote"))
+
+
+def cross_rate(frame, base, quote, rate="middle_rate"):
+    """
+    History of one cross rate: the price of one `base` in `quote` on every date of an exchange rate frame.
+
+    rtype: pandas.Series
+    """
+    wide = myr_rates(frame, rate).unstack("currency_code")
+    wide.columns = wide.columns.astype(str)
+    wide["MYR"] = 1.0
+    return (wide[base] / wide[quote]).rename("{}/{}".format(base, quote))
+
+
+def spreads(frame):
+    """
+    Bid/ask spread of exchange rates: selling - buying, and the same relative to the middle rate in basis points.
+
+    rtype: pandas.DataFrame
+    """
+    spread = frame["selling_rate"] - frame["buying_rate"]
+    return pd.DataFrame({"spread": spread, "spread_bps": spread / frame["middle_rate"] * 10000}, index=frame.index)
+
+
+def align_sessions(frames):
+    """
+    Join frames of the different exchange rate sessions on their index, eg: (date, currency_code).
+
+    params:
+
+    frames: dict
+        Maps a session (eg: '0900') to its frame
+
+    returns: columns (session, column), one row per index value of any session
+    rtype: pandas.DataFrame
+    """
+    return pd.concat(frames, axis=1, names=["session"]).sort_index()
+
+
+def opr_spread(opr, rates, column="overnight"):
+    """
+    Spread of an interbank rate over the OPR in force on each date. The OPR is carried forward from each
+    decision date with an as-of join, dates before the first decision in `opr` get NaN.
+
+    params:
+
+    opr: pandas.DataFrame
+        overnight_policy_rate(rtype='df') frame
+    rates: pandas.DataFrame
+        interest_rate(rtype='df') frame
+    column: string
+        Column of `rates` to compare, eg: 'overnight'
+
+    returns: columns rate, opr, spread (percentage points) and spread_bps
+    rtype: pandas.DataFrame
+    """
+    left = pd.DataFrame({"rate": rates[column].to_numpy(dtype=float)},
+                        index=rates.index.astype("datetime64[ns]").rename(DATE_LEVEL)).sort_index()
+    right = pd.DataFrame({"opr": opr["new_opr_level"].to_numpy(dtype=float)},
+                         index=opr.index.astype("datetime64[ns]").rename(DATE_LEVEL)).sort_index()
+
+    joined = pd.merge_asof(left, right, left_index=True, right_index=True)
+    joined["spread"] = joined["rate"] - joined["opr"]
+    joined["spread_bps"] = joined["spread"] * 100
+    return joined
+
+
+def _wide(frame):
+    # One column per series: frames indexed by (date, code) are unstacked on the code
+    if not isinstance(frame.index, pd.MultiIndex):
+        return frame, []
+    others = [name for name in frame.index.names if name != DATE_LEVEL]
+    return frame.unstack(others), others
+
+
+def _long(wide, others):
+    if not others:
+        return wide
+    return wide.stack(others).dropna(how="all")
+
+
+def resample(frame, rule="MS", how="mean"):
+    """
+    Resample a frame by date, eg: monthly averages of kijang emas prices. Frames indexed by (date, code) are
+    resampled per code.
+
+    params:
+
+    rule: string
+        pandas offset alias. Defaults to 'MS' (calendar months, labelled by their first day)
+    how: string or callable
+        Aggregation, eg: 'mean', 'last', 'max'. Defaults to 'mean'
+
+    rtype: pandas.DataFrame
+    """
+    wide, others = _wide(frame)
+    return _long(wide.resample(rule).agg(how), others)
+
+
+def rolling(frame, window, stats=("mean", "std"), min_periods=None):
+    """
+    Rolling statistics of every column of a frame, per code for frames indexed by (date, code).
+
+    params:
+
+    window: int or string
+        Number of observations, or a time span such as '30D'
+    stats: list(string)
+        Rolling methods to compute, eg: 'mean', 'std', 'min', 'max', 'median'
+
+    returns: the statistics as an extra, first level of the columns
+    rtype: pandas.DataFrame
+    """
+    wide, others = _wide(frame)
+    window_of = wide.rolling(window, min_periods=min_periods)
+    result = pd.concat({stat: getattr(window_of, stat)() for stat in stats}, axis=1, names=["stat"])
+    return _long(result, others)
+
+
+class Analytics:
+
+    """
+    Run the analytics helpers on data pulled through a client.
+
+    Each frame is fetched once per set of arguments and kept, so several computations on the same data
+    send no new requests. Historical data goes through fetch_range, latest data through the endpoint methods,
+    so the client's cache and conditional requests apply too. Call clear() to pick up newly published data.
+
+        analytics = Analytics(obnmapi)
+        analytics.cross_rates()                                        # every pair, latest 1130 session
+        analytics.kijang_emas_monthly("2020-01-01", "2020-12-31")
+        analytics.opr_spread("2020-01-01", "2020-12-31")
+        analytics.rate_asof(trades["executed_at"])                     # USD/MYR in effect at each trade
+
+    params:
+
+    client: OpenBNMAPI
+        Client used for the requests (not the asyncio one)
+    """
+    def __init__(self, client):
+        self.client = client
+        self._frames = {}
+        self._asof = {}
+        self._lock = threading.Lock()
+
+    def frame(self, endpoint, start=None, end=None, **kwargs):
+        """
+        returns: the DataFrame of an endpoint, for the range [start, end] if given, the latest data otherwise
+        rtype: pandas.DataFrame
+        """
+        if (start is None) != (end is None):
+            raise ValueError("Give both 'start' and 'end', or neither")
+        key = (endpoint, start and to_date(start), end and to_date(end), json.dumps(kwargs, sort_keys=True))
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+
+        if start is None:
+            frame = getattr(self.client, endpoint)(rtype='df', **kwargs)
+        else:
+            frame = self.client.fetch_range(endpoint, start, end, rtype='df', **kwargs)
+        with self._lock:
+            self._frames[key] = frame
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._asof.clear()
+
+    def exchange_rates(self, start=None, end=None, currencies=None, session="1130"):
+        """
+        returns: exchange rates of a session indexed by (date, currency_code). The latest snapshot of every
+            currency by default, the history of `currencies` between `start` and `end` otherwise
+        rtype: pandas.DataFrame
+        """
+        quote = {"session": session, "quote": "rm"}
+        if start is None and end is None:
+            frame = self.frame("exchange_rate", quote=quote)
+            if currencies is not None:
+                codes = frame.index.get_level_values("currency_code").astype(str)
+                frame = frame[codes.isin(currencies)]
+            return frame
+
+        if currencies is None:
+            raise ValueError("'currencies' is required for a range of exchange rates")
+        frames = [self.frame("exchange_rate", start, end, quote=quote, currency_code=code) for code in currencies]
+        return pd.concat(frames).sort_index()
+
+    def cross_rates(self, session="1130", rate="middle_rate", currencies=None):
+        """
+        Cross rates of every pair of currencies in the latest snapshot of a session, see cross_rates.
+        """
+        return cross_rates(self.exchange_rates(currencies=currencies, session=session), rate=rate)
+
+    def session_spreads(self, start=None, end=None, currencies=None, sessions=constants.exchange_rate_snapshots):
+        """
+        Bid/ask spreads of every session side by side, see spreads and align_sessions.
+        """
+        return align_sessions({
+            session: spreads(self.exchange_rates(start, end, currencies, session)) for session in sessions
+        })
+
+    def opr_decisions(self, start, end):
+        """
+        returns: OPR decisions of the years from the one before `start` (for the rate in force at `start`) to
+            the one of `end`, indexed by date
+        rtype: pandas.DataFrame
+        """
+        frames = []
+        for year in range(to_date(start).year - 1, to_date(end).year + 1):
+            try:
+                frames.append(self.frame("overnight_policy_rate", year=year))
+            except BNMNotFoundError:
+                # No decision that year
+                continue
+        if not frames:
+            return self.frame("overnight_policy_rate")
+        decisions = pd.concat(frames).sort_index()
+        return decisions[~decisions.index.duplicated(keep="last")]
+
+    def opr_spread(self, start, end, product="interbank", column="overnight"):
+        """
+        Spread of an interbank rate over the OPR, see opr_spread. Dates before the first decision found in
+        opr_decisions get NaN.
+        """
+        rates = self.frame("interest_rate", start, end, product=product)
+        return opr_spread(self.opr_decisions(start, end), rates, column)
+
+    def kijang_emas_monthly(self, start, end, how="mean"):
+        """
+        Monthly aggregate of the kijang emas prices, see resample.
+        """
+        return resample(self.frame("kijang_emas", start, end), "MS", how)
+
+    def rate_asof(self, timestamps, endpoint="usd_interbank_intraday_rate", return_times=False):
+        """
+        USD/MYR rate in effect at each timestamp, from the intraday rates or the KL USD reference rate
+        (endpoint='kl_usd_reference_rate'), see asof.AsOfRates. The months loaded are kept until clear().
+        """
+        with self._lock:
+            asof = self._asof.get(endpoint)
+            if asof is None:
+                asof = self._asof[endpoint] = AsOfRates(self.client, endpoint)
+        return asof.rate_asof(timestamps, return_times)
@@ -0,0 +1,300 @@
+# Apache Arrow form of the endpoints (rtype='arrow'), for Polars, DuckDB and other Arrow consumers.
+#
+# Tables are built straight from the decoded records, without pandas, with the column layout of frames.SCHEMAS:
+# index fields first, then the columns, nested names joined with dots (eg: 'one_oz.buying'). Every column has a
+# concrete type, never null: values that are not numbers, dates or strings (eg: lists) are stored as JSON text,
+# like the exporter does. pyarrow is optional (pip install openbnmapi[arrow]) and only imported when a table is
+# built.
+import json
+
+from datetime import date as Date
+from functools import lru_cache
+
+# Local modules
+from .frames import (AUTO, CATEGORY, DATETIME, DEFAULT_SCHEMA, FLOAT, INT, OBJECT, SCHEMAS, STRING, _flat_items,
+                     _get_path)
+from .lazy import LazyModule
+from .records import endpoint_of, extract_records
+
+pa = LazyModule("pyarrow")
+ipc = LazyModule("pyarrow.ipc")
+
+# Schema metadata keys
+ENDPOINT_KEY = "openbnmapi.endpoint"
+META_KEY = "openbnmapi.meta"
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("rtype='arrow' requires pyarrow. Install it with: pip install openbnmapi[arrow]")
+    return pyarrow
+
+
+def column_name(name):
+    # ('one_oz', 'buying') -> 'one_oz.buying'
+    return ".".join(part for part in name if part) if isinstance(name, tuple) else name
+
+
+def arrow_type(kind):
+    """
+    returns: the Arrow type of a frames column kind, None for AUTO, which depends on the values
+    rtype: pyarrow.DataType
+    """
+    if kind == FLOAT:
+        return pa.float64()
+    if kind == INT:
+        return pa.int64()
+    if kind == DATETIME:
+        return pa.date32()
+    if kind == CATEGORY:
+        return pa.dictionary(pa.int32(), pa.string())
+    if kind in (STRING, OBJECT):
+        return pa.string()
+    return None
+
+
+def arrow_schema(endpoint):
+    """
+    The fixed part of the schema of an endpoint. Fields returned by BNM that are not in frames.SCHEMAS (eg: the
+    tenures of interest rates) follow as float64 columns, or as string columns if they are not all numbers.
+
+    params:
+
+    endpoint: string
+        Endpoint path, eg: '/kijang-emas'
+
+    rtype: pyarrow.Schema
+    """
+    require_pyarrow()
+    schema = SCHEMAS.get(endpoint_of(endpoint), DEFAULT_SCHEMA)
+    return pa.schema([
+        pa.field(column_name(name), arrow_type(kind))
+        for name, _, kind in schema.index + schema.columns
+    ])
+
+
+@lru_cache(maxsize=16384)
+def _parse_date(value):
+    # 'YYYY-MM-DD...' -> date. Memoized, a range repeats the same few thousand dates
+    try:
+        return Date.fromisoformat(value[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def _coerce(values, convert):
+    # Value by value conversion of columns pyarrow refused, eg: numbers sent as strings or placeholders ("-")
+    coerced = []
+    for value in values:
+        try:
+            coerced.append(None if value is None else convert(value))
+        except (TypeError, ValueError):
+            coerced.append(None)
+    return coerced
+
+
+def _to_text(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _array(values, kind):
+    if kind == AUTO:
+        # Columns without any value are float64 too, like the other tenures of their endpoint
+        is_numeric = all(isinstance(value, (int, float)) and not isinstance(value, bool)
+                         for value in values if value is not None)
+        kind = FLOAT if is_numeric else STRING
+
+    errors = (pa.ArrowInvalid, pa.ArrowTypeError)
+    if kind == DATETIME:
+        return pa.array([_parse_date(value) for value in values], type=pa.date32())
+    if kind in (FLOAT, INT):
+        arrow = arrow_type(kind)
+        try:
+            return pa.array(values, type=arrow)
+        except errors:
+            return pa.array(_coerce(values, float if kind == FLOAT else lambda value: int(float(value))),
+                            type=arrow)
+    # STRING, CATEGORY and OBJECT, eg: websites as the JSON text of their lists
+    try:
+        array = pa.array(values, type=pa.string())
+    except errors:
+        array = pa.array(_coerce(values, _to_text), type=pa.string())
+    return array.dictionary_encode() if kind == CATEGORY else array
+
+
+def records_to_table(endpoint, records, meta=None):
+    """
+    Convert already flattened records (see records.extract_records) of an endpoint to an Arrow table, sorted by
+    its index fields like the DataFrames.
+
+    params:
+
+    endpoint: string
+        Endpoint path, eg: '/exchange-rate'
+    records: list(dict)
+        Records of the endpoint
+    meta: dict
+        Stored as JSON in the schema metadata (key 'openbnmapi.meta'), eg: the meta of the response
+
+    rtype: pyarrow.Table
+    """
+    require_pyarrow()
+    endpoint = endpoint_of(endpoint)
+    schema = SCHEMAS.get(endpoint, DEFAULT_SCHEMA)
+    fields = schema.index + schema.columns
+
+    rows = list(schema._rows(records))
+    if schema.index:
+        index_paths = [path for _, path, _ in schema.index]
+        rows.sort(key=lambda row: tuple(str(_get_path(row, path) or "") for path in index_paths))
+
+    names = [column_name(name) for name, _, _ in fields]
+    arrays = [_array([_get_path(row, path) for row in rows], kind) for _, path, kind in fields]
+
+    if schema.extra is not None:
+        extras = {}
+        for i, row in enumerate(rows):
+            for path, value in _flat_items(row):
+                if path in schema.known_paths:
+                    continue
+                column = extras.get(path)
+                if column is None:
+                    # Column first seen on this row, earlier rows did not have it
+                    column = extras[path] = [None] * len(rows)
+                column[i] = value
+        for path, values in extras.items():
+            names.append(column_name(path))
+            arrays.append(_array(values, schema.extra))
+
+    metadata = {ENDPOINT_KEY: endpoint}
+    if meta is not None:
+        metadata[META_KEY] = json.dumps(meta, default=str)
+    return pa.Table.from_arrays(arrays, names=names).replace_schema_metadata(metadata)
+
+
+def to_table(endpoint, payload):
+    """
+    Convert a decoded response of an endpoint to an Arrow table, its meta in the schema metadata.
+
+    rtype: pyarrow.Table
+    """
+    meta = payload.get("meta") if isinstance(payload, dict) else None
+    return records_to_table(endpoint, extract_records(payload), meta)
+
+
+def stream_schema(endpoint, table):
+    """
+    returns: the schema of a stream of tables of an endpoint: the fixed part (see arrow_schema), then the other
+        columns of `table` (eg: the tenures of interest rates) typed as in it, with its schema metadata
+    rtype: pyarrow.Schema
+    """
+    fields = list(arrow_schema(endpoint))
+    known = set(field.name for field in fields)
+    fields.extend(field for field in table.schema if field.name not in known)
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+
+def _cast(column, type):
+    # Cast a column, value by value when pyarrow refuses it, eg: text ("-") in a float64 column
+    try:
+        return column.cast(type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        values = column.to_pylist()
+    if pa.types.is_floating(type):
+        return pa.array(_coerce(values, float), type=type)
+    if pa.types.is_integer(type):
+        return pa.array(_coerce(values, lambda value: int(float(value))), type=type)
+    if pa.types.is_date(type):
+        return pa.array([_parse_date(_to_text(value)) for value in values], type=type)
+    return pa.array(_coerce(values, _to_text), type=type)
+
+
+def _conform(table, schema):
+    # Give a table the columns of `schema`, in its order, the missing ones null and the unknown ones left out
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(len(table), type=field.type))
+            continue
+        column = table.column(field.name)
+        if column.type != field.type:
+            column = _cast(column, field.type)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def batch_reader(endpoint, tables):
+    """
+    Stream tables (eg: one per request of a range) as the record batches of one pyarrow.RecordBatchReader. Tables
+    are only taken from `tables` as the stream is read, and released once their batches are: a generator of
+    tables (eg: fetch_range_batches) is never held in memory as a whole.
+
+    The schema of the stream is known before the first batch: the fixed schema of the endpoint, and the other
+    columns of the first table (see stream_schema). Every table is conformed to it: a column it misses is null, a
+    column first seen in a later table, eg: a tenure BNM started publishing mid-range, is left out. Use
+    fetch_range(..., rtype='arrow') to keep every column.
+
+    params:
+
+    endpoint: string
+        Endpoint path of the tables, for the schema of an empty stream
+    tables: iterable(pyarrow.Table)
+        Tables of the endpoint, in order
+
+    rtype: pyarrow.RecordBatchReader
+    """
+    require_pyarrow()
+    tables = iter(tables)
+    first = [next(tables, None)]
+    if first[0] is None:
+        first[0] = records_to_table(endpoint, [])
+    schema = stream_schema(endpoint, first[0])
+
+    def batches():
+        # The first table is released as it is read, the others are only read when they are due
+        yield from _conform(first.pop(), schema).to_batches()
+        for table in tables:
+            yield from _conform(table, schema).to_batches()
+
+    return pa.RecordBatchReader.from_batches(schema, batches())
+
+
+def write_ipc(data, path):
+    """
+    Write a table or a stream of record batches to an Arrow IPC file (the Feather V2 format), batch by batch.
+    The file is uncompressed, so that read_ipc can memory-map it, and readable by Polars (pl.read_ipc),
+    DuckDB, pandas (pd.read_feather) and pyarrow.feather.
+
+    params:
+
+    data: pyarrow.Table or pyarrow.RecordBatchReader
+        eg: obnmapi.kijang_emas(rtype='arrow') or obnmapi.fetch_range_batches(...)
+    path: string
+        Location of the file, eg: 'kijang_emas.arrow'
+
+    returns: the number of rows written
+    rtype: int
+    """
+    require_pyarrow()
+    batches = data.to_batches() if isinstance(data, pa.Table) else data
+    rows = 0
+    with pa.OSFile(path, "wb") as sink:
+        with ipc.new_file(sink, data.schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
+
+
+def read_ipc(path, memory_map=True):
+    """
+    Read an Arrow IPC / Feather V2 file written by write_ipc. Memory-mapped by default: the columns point into
+    the file rather than being copied, and only the pages that are used are read.
+
+    rtype: pyarrow.Table
+    """
+    require_pyarrow()
+    source = pa.memory_map(path, "r") if memory_map else pa.OSFile(path, "rb")
+    return ipc.open_file(source).read_all()
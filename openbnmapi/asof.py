@@ -0,0 +1,196 @@
+# As-of lookups of the USD/MYR rate in effect at given timestamps, from the intraday and reference rate
+# endpoints. Observations are kept as sorted int64 arrays (UTC nanoseconds) and looked up with one vectorized
+# numpy.searchsorted, whatever the number of timestamps.
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as Date
+
+# Local modules
+from .cache import MYT
+from .exceptions import BNMNotFoundError
+from .lazy import LazyModule
+
+# Loaded on the first lookup
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+NS_PER_MINUTE = 60 * 10 ** 9
+
+# When each endpoint's rates take effect, in Malaysian time: intraday rates at the time of their row, the KL USD
+# reference rate at its daily fixing
+ASOF_ENDPOINTS = ("usd_interbank_intraday_rate", "kl_usd_reference_rate")
+REFERENCE_TIME = "1530"
+
+
+def to_utc_ns(timestamps):
+    """
+    Convert timestamps (datetimes, strings, numpy datetime64 or a pandas DatetimeIndex / Series) to UTC
+    nanoseconds. Naive timestamps are taken as Malaysian time, like BNM's data. NaT becomes numpy's NaT value,
+    the smallest int64.
+
+    rtype: numpy.ndarray(int64)
+    """
+    if isinstance(timestamps, (str, Date)) or np.ndim(timestamps) == 0:
+        timestamps = [timestamps]
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps))
+    if index.tz is None:
+        index = index.tz_localize(MYT)
+    return index.tz_convert("UTC").tz_localize(None).to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def minutes_of_day(times):
+    # 'HHMM', 'HH:MM' or 'HH:MM:SS' strings -> minutes since midnight
+    digits = pd.Series(times, dtype="string").str.replace(":", "", regex=False).str.slice(0, 4).str.zfill(4)
+    values = digits.astype("int64").to_numpy()
+    return values // 100 * 60 + values % 100
+
+
+def month_range(start, end):
+    """
+    returns: the (year, month) of every month from the one of `start` to the one of `end`
+    rtype: list(tuple(int, int))
+    """
+    first, last = start.year * 12 + start.month - 1, end.year * 12 + end.month - 1
+    return [(index // 12, index % 12 + 1) for index in range(first, last + 1)]
+
+
+def observations(endpoint, frame, reference_time=REFERENCE_TIME):
+    """
+    returns: the times (UTC nanoseconds) and rates of the df of an as-of endpoint
+    rtype: tuple(numpy.ndarray(int64), numpy.ndarray(float64))
+    """
+    if frame is None or frame.empty:
+        return np.empty(0, dtype="int64"), np.empty(0, dtype="float64")
+    days = frame.index.get_level_values("date").to_numpy(dtype="datetime64[ns]").view("int64")
+    if endpoint == "usd_interbank_intraday_rate":
+        minutes = minutes_of_day(frame.index.get_level_values("time"))
+    else:
+        minutes = np.full(len(frame), int(reference_time[:2]) * 60 + int(reference_time[2:]), dtype="int64")
+    # Malaysian wall clock -> UTC
+    offset = int(MYT.utcoffset(None).total_seconds()) // 60
+    times = days + (minutes - offset) * NS_PER_MINUTE
+    rates = frame["rate"].to_numpy(dtype="float64")
+    keep = ~np.isnan(rates)
+    return times[keep], rates[keep]
+
+
+class AsOfRates:
+
+    """
+    Rate in effect at any timestamp, for batches of millions of timestamps, eg: to price a trade blotter.
+
+    The months covering the timestamps (and the one before, for the rate in effect at the start of a month) are
+    fetched once through the endpoint's year/month requests and merged into sorted arrays. The current month is
+    fetched again once `max_age` has passed, earlier months are kept.
+
+        asof = AsOfRates(obnmapi)
+        trades["usd_myr"] = asof.rate_asof(trades["executed_at"])
+
+    params:
+
+    client: OpenBNMAPI
+        Client used for the requests (not the asyncio one)
+    endpoint: string
+        'usd_interbank_intraday_rate' (defaults) or 'kl_usd_reference_rate'
+    reference_time: string
+        HHMM (Malaysian time) at which a KL USD reference rate takes effect. Defaults to 1530
+    max_workers: int
+        Months fetched in parallel. Defaults to 8
+    max_age: float
+        Seconds before the current month is fetched again. Defaults to 60
+    """
+    def __init__(self, client, endpoint="usd_interbank_intraday_rate", reference_time=REFERENCE_TIME,
+                 max_workers=8, max_age=60):
+        if endpoint not in ASOF_ENDPOINTS:
+            raise ValueError("AsOfRates supports these endpoints only: {}".format(", ".join(ASOF_ENDPOINTS)))
+        self.client = client
+        self.endpoint = endpoint
+        self.reference_time = reference_time
+        self.max_workers = max_workers
+        self.max_age = max_age
+        # (year, month) -> (times, rates, fetched at)
+        self._months = {}
+        self._merged = None
+        self._lock = threading.Lock()
+
+    def _fetch_month(self, month):
+        year, number = month
+        try:
+            frame = getattr(self.client, self.endpoint)(year=year, month=number, rtype='df')
+        except BNMNotFoundError:
+            # No data that month
+            frame = None
+        return observations(self.endpoint, frame, self.reference_time)
+
+    def load(self, start, end):
+        """
+        Fetch the months from the one before `start` to the one of `end` that are missing, and the current
+        month if it is older than `max_age`. Months after the current one are skipped.
+        """
+        today = pd.Timestamp.now(tz=MYT)
+        current = (today.year, today.month)
+        first = start - pd.DateOffset(months=1)
+        now = time.time()
+        with self._lock:
+            missing = [
+                month for month in month_range(first, min(end, today))
+                if month not in self._months or (month >= current and now - self._months[month][2] >= self.max_age)
+            ]
+        if not missing:
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(missing)))) as executor:
+            results = list(executor.map(self._fetch_month, missing))
+        with self._lock:
+            for month, (times, rates) in zip(missing, results):
+                self._months[month] = (times, rates, now)
+            self._merged = None
+
+    def arrays(self):
+        """
+        returns: every observation loaded so far, sorted by time (UTC nanoseconds)
+        rtype: tuple(numpy.ndarray(int64), numpy.ndarray(float64))
+        """
+        with self._lock:
+            if self._merged is None:
+                months = [self._months[month] for month in sorted(self._months)]
+                times = np.concatenate([m[0] for m in months]) if months else np.empty(0, dtype="int64")
+                rates = np.concatenate([m[1] for m in months]) if months else np.empty(0, dtype="float64")
+                # Stable, so that the last of equal times wins the lookups
+                order = np.argsort(times, kind="stable")
+                self._merged = (times[order], rates[order])
+            return self._merged
+
+    def rate_asof(self, timestamps, return_times=False):
+        """
+        Rate in effect at each timestamp: the last one published at or before it. Missing months are fetched
+        first.
+
+        params:
+
+        timestamps: datetimes, strings, numpy datetime64 or a pandas DatetimeIndex / Series
+            Naive timestamps are taken as Malaysian time
+        return_times: bool
+            Also return when each rate took effect. Defaults to False
+
+        returns: the rates, NaN for timestamps before the first rate (or NaT), and their times as
+            datetime64[ns] UTC if return_times
+        rtype: numpy.ndarray(float64) or tuple(numpy.ndarray, numpy.ndarray)
+        """
+        ns = to_utc_ns(timestamps)
+        valid = ns != np.iinfo("int64").min
+        if valid.any():
+            bounds = pd.to_datetime(ns[valid].min()), pd.to_datetime(ns[valid].max())
+            self.load(*(bound.tz_localize("UTC").tz_convert(MYT) for bound in bounds))
+
+        times, rates = self.arrays()
+        position = np.searchsorted(times, ns, side="right") - 1
+        found = valid & (position >= 0)
+        position = np.where(found, position, 0)
+        result = np.where(found, rates[position] if len(rates) else np.nan, np.nan)
+        if not return_times:
+            return result
+        effective = np.where(found, times[position] if len(times) else 0, np.iinfo("int64").min)
+        return result, effective.view("datetime64[ns]")
@@ -0,0 +1,464 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+# Local modules
+from . import constants
+from .decoding import dumps, loads
+from .recordset import RecordSet
+
+# BNM publishes in Malaysian time (UTC+8, no daylight saving)
+MYT = timezone(timedelta(hours=8))
+
+DATE_PATH = re.compile(r"/date/(\d{4})-(\d{1,2})-(\d{1,2})")
+YEAR_MONTH_PATH = re.compile(r"/year/(\d{4})/month/(\d{1,2})")
+LAST_UPDATED = re.compile(rb'"last_updated"\s*:\s*"([^"]*)"')
+
+# Default time to live (seconds) of "latest" data per endpoint
+HOUR = 60 * 60
+DAY = 24 * HOUR
+DEFAULT_TTLS = {
+    "/base-rate": DAY,
+    "/consumer-alert": HOUR,
+    "/opr": 3 * DAY,
+    "/renminbi-deposit-acceptance-rate": DAY,
+    "/renminbi-fx-forward-price": DAY,
+}
+DEFAULT_TTL = HOUR
+
+
+def cache_key(url, params=None, accept=None):
+    """
+    Build the cache key of a request from its final url, query parameters and Accept header.
+    """
+    query = urlencode(sorted((params or {}).items()))
+    return "{}?{}|{}".format(url, query, accept or "")
+
+
+def next_exchange_rate_session(now):
+    """
+    Return the next exchange rate publication time (0900/1130/1200/1700 MYT) after `now`.
+    """
+    local = now.astimezone(MYT)
+    for snapshot in sorted(constants.exchange_rate_snapshots):
+        session = local.replace(hour=int(snapshot[:2]), minute=int(snapshot[2:]), second=0, microsecond=0)
+        if session > local:
+            return session
+    # All of today's sessions are over, the next one is tomorrow's first session
+    first = sorted(constants.exchange_rate_snapshots)[0]
+    return (local + timedelta(days=1)).replace(hour=int(first[:2]), minute=int(first[2:]), second=0, microsecond=0)
+
+
+def header(headers, name):
+    """
+    Case-insensitive lookup of a header in a plain dict (eg: the headers of a CachedResponse).
+    """
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def last_updated(content):
+    """
+    Read BNM's meta.last_updated from a raw response body without decoding it. meta comes after data,
+    so the body is searched from the end.
+
+    returns: the last_updated value, or None if it is missing
+    rtype: bytes
+    """
+    start = content.rfind(b'"last_updated"')
+    if start < 0:
+        return None
+    match = LAST_UPDATED.match(content, start)
+    return match.group(1) if match else None
+
+
+class TTLPolicy:
+
+    """
+    Decide how long the response of an endpoint can be cached.
+
+    - Historical data (/date/... or /year/.../month/... in the past) never expires
+    - Exchange rates expire at the next 0900/1130/1200/1700 session
+    - Other "latest" data expires after a per endpoint ttl (see DEFAULT_TTLS)
+
+    params:
+
+    ttls: dict
+        Overrides the ttl of an endpoint. Maps the endpoint path (eg: '/opr') to seconds, None (never expire)
+        or a callable(path, now) returning one of those
+    default_ttl: int
+        Ttl of endpoints missing from `ttls`. Defaults to 1 hour
+    """
+    def __init__(self, ttls=None, default_ttl=DEFAULT_TTL):
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls["/exchange-rate"] = self._exchange_rate_ttl
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+
+    def ttl(self, path, now=None):
+        """
+        returns: seconds the response of `path` stays fresh, or None if it never expires
+        rtype: float
+        """
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        if self._is_historical(path, now):
+            return None
+
+        endpoint = "/" + path.lstrip("/").split("/", 1)[0]
+        ttl = self.ttls.get(endpoint, self.default_ttl)
+        if callable(ttl):
+            ttl = ttl(path, now)
+        return ttl
+
+    def _exchange_rate_ttl(self, path, now):
+        return (next_exchange_rate_session(now) - now).total_seconds()
+
+    def _is_historical(self, path, now):
+        today = now.astimezone(MYT).date()
+
+        match = DATE_PATH.search(path)
+        if match:
+            return tuple(int(x) for x in match.groups()) < (today.year, today.month, today.day)
+
+        match = YEAR_MONTH_PATH.search(path)
+        if match:
+            # The current month is still being filled in
+            return (int(match.group(1)), int(match.group(2))) < (today.year, today.month)
+
+        return False
+
+
+class CachedResponse:
+
+    """
+    The parts of a requests.Response that the client needs, in a form that can be stored in a cache.
+
+    A compact response (see `compact`) holds its data as a RecordSet instead of the body. Its body is encoded
+    again when asked for. json() decodes the body, or rebuilds the document from the columns, on every call.
+    """
+    from_cache = True
+
+    def __init__(self, status_code, headers, content, url, records=None):
+        self.status_code = status_code
+        self.headers = headers
+        self._content = content
+        self.url = url
+        self.records = records
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(response.status_code, dict(response.headers), response.content, response.url)
+
+    @property
+    def content(self):
+        if self._content is None and self.records is not None:
+            return dumps(self.records.to_payload())
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        # A new document on every call: the response may be shared (cache, coalesced calls, validators) and
+        # callers are free to modify what they get
+        if self.records is not None:
+            return self.records.to_payload()
+        return loads(self.content)
+
+    def recordset(self):
+        """
+        returns: the data of the response as a RecordSet
+        rtype: RecordSet
+        """
+        if self.records is not None:
+            return self.records
+        return RecordSet.from_payload(self.json())
+
+    def compact(self):
+        """
+        returns: a copy of this response holding its data as a RecordSet rather than the body, or this
+            response if it is not a BNM document of records
+        rtype: CachedResponse
+        """
+        if self.records is not None or self.status_code != 200:
+            return self
+        try:
+            records = RecordSet.from_payload(self.json())
+        except ValueError:
+            return self
+        return CachedResponse(self.status_code, self.headers, None, self.url, records)
+
+    def iter_content(self, chunk_size=1):
+        content = self.content
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class CacheStats:
+
+    """
+    Hit / miss / eviction counters of a cache backend.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def incr(self, counter, value=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class MemoryCache:
+
+    """
+    In-memory cache with least recently used eviction.
+
+    params:
+
+    maxsize: int
+        Maximum number of responses kept. Defaults to 256
+    compact: bool
+        Keep the data of the responses as RecordSets (see recordset.py) rather than their bodies and decoded
+        JSON, a fraction of the memory for long series. Defaults to True
+    """
+    def __init__(self, maxsize=256, compact=True):
+        self.maxsize = maxsize
+        self.compact = compact
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.incr("misses")
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.stats.incr("expirations")
+                self.stats.incr("misses")
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.incr("hits")
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = None if ttl is None else time.time() + ttl
+        if self.compact:
+            value = value.compact()
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.incr("evictions")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+
+    """
+    Persistent on-disk cache backed by a SQLite file. Survives restarts and can be shared by processes.
+
+    params:
+
+    path: string
+        Location of the SQLite file
+    maxsize: int
+        Maximum number of responses kept, least recently used are evicted first. Defaults to no limit
+    """
+    def __init__(self, path, maxsize=None):
+        self.path = path
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, expires_at REAL, accessed_at REAL,"
+            " status_code INTEGER, headers TEXT, content BLOB, url TEXT)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, status_code, headers, content, url FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.incr("misses")
+                return None
+
+            expires_at, status_code, headers, content, url = row
+            now = time.time()
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.stats.incr("expirations")
+                self.stats.incr("misses")
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats.incr("hits")
+            return CachedResponse(status_code, json.loads(headers), content, url)
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, expires_at, now, value.status_code, json.dumps(dict(value.headers)), value.content, value.url)
+            )
+            if self.maxsize is not None:
+                evicted = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.maxsize,)
+                ).rowcount
+                if evicted > 0:
+                    self.stats.incr("evictions", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class Validated:
+
+    """
+    The last response of a url and the validators it came with.
+    """
+    def __init__(self, response):
+        self.response = response
+        self.etag = header(response.headers, "ETag")
+        self.last_modified = header(response.headers, "Last-Modified")
+        self.last_updated = last_updated(response.content)
+
+    def conditional_headers(self):
+        """
+        returns: the headers that make the next request of this url conditional
+        rtype: dict
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def unchanged(self, response):
+        """
+        Whether a 200 response carries the same data, judged by meta.last_updated. Only used when the server
+        did not send ETag or Last-Modified, which it would have answered with a 304.
+        """
+        if self.etag or self.last_modified or self.last_updated is None:
+            return False
+        return last_updated(response.content) == self.last_updated
+
+
+class ValidatorStore:
+
+    """
+    Remembers the last response of every url with its validators (ETag, Last-Modified, or BNM's meta.last_updated
+    when the headers are missing), so that the next request of the url is conditional. When the data did not
+    change (304, or the same last_updated) the stored response is reused. Only the raw body is kept, every call
+    decodes its own copy of the data.
+
+    params:
+
+    maxsize: int
+        Maximum number of urls remembered, least recently used are dropped first. Defaults to 64
+    """
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.unchanged = 0
+        self.bytes_saved = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, response):
+        entry = Validated(response)
+        if not (entry.etag or entry.last_modified or entry.last_updated):
+            # Nothing to validate against next time
+            return None
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def record(self, outcome, size):
+        """
+        Count a reused response. `outcome` is 'not_modified' (304) or 'unchanged' (same last_updated), `size`
+        the body size that was not downloaded (304) or that was downloaded again (unchanged).
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if outcome == "not_modified":
+                self.bytes_saved += size
+
+    def as_dict(self):
+        return {
+            "urls": len(self._entries),
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,245 @@
+import codecs
+import importlib
+import json
+import re
+
+# Use the fastest JSON parser available. orjson and ujson are optional, and imported on the first document
+BACKENDS = ("orjson", "ujson")
+_backend = None
+
+
+def backend():
+    """
+    returns: the JSON module used by loads and dumps, the fastest one installed
+    """
+    global _backend
+    if _backend is None:
+        for name in BACKENDS:
+            try:
+                _backend = importlib.import_module(name)
+                break
+            except ImportError:
+                continue
+        else:
+            _backend = json
+    return _backend
+
+
+def __getattr__(name):
+    # Name of the backend, eg: 'orjson'. Resolved on access, which loads it
+    if name == "BACKEND":
+        return backend().__name__
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def loads(content):
+    """
+    Decode a JSON document (str or bytes) with the fastest backend installed.
+    """
+    return (_backend or backend()).loads(content)
+
+
+def dumps(data):
+    """
+    Encode a document to JSON bytes with the fastest backend installed.
+    """
+    encoded = (_backend or backend()).dumps(data)
+    return encoded if isinstance(encoded, bytes) else encoded.encode("utf-8")
+
+
+# Characters the scanner has to look at. Everything else is skipped by the regex engine
+STRUCTURE = re.compile(r'[\[\]{}",:]')
+# Rest of a string after its opening quote
+STRING_END = re.compile(r'(?:[^"\\]|\\.)*"', re.S)
+
+# Scanner states
+SEEK, VALUE, ITEMS, SINGLE, DONE = range(5)
+
+
+class RecordStream:
+
+    """
+    Incremental parser that yields the items of one top-level key of a JSON document (by default BNM's
+    "data" array) while the document is still being received.
+
+    Only one item is held in memory at a time; each item is decoded on its own with `loads`. If the value of
+    the key is an object rather than an array, that object is yielded once.
+
+        stream = RecordStream()
+        for chunk in response.iter_content(65536):
+            for record in stream.feed(chunk):
+                ...
+        stream.close()
+
+    params:
+
+    key: string
+        Top-level key holding the records. Defaults to 'data'
+    """
+    def __init__(self, key="data"):
+        self.key = key
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._state = SEEK
+        self._last_string = None
+        self._container_depth = None
+        self._item_start = None
+        self._boundary = None
+
+    def feed(self, chunk):
+        """
+        Add the next chunk (bytes or str) of the document.
+
+        returns: the items completed by this chunk
+        rtype: list
+        """
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self._buf += chunk
+        items = self._scan()
+        self._trim()
+        return items
+
+    def close(self):
+        """
+        Signal the end of the document.
+
+        raises: ValueError if the document ended in the middle of the records
+        """
+        self._buf += self._decoder.decode(b"", final=True)
+        items = self._scan()
+        if self._state in (ITEMS, SINGLE):
+            raise ValueError("Incomplete JSON document: the '{}' value is truncated".format(self.key))
+        return items
+
+    @property
+    def done(self):
+        return self._state == DONE
+
+    def _scan(self):
+        items = []
+        buf = self._buf
+
+        while self._state != DONE:
+            match = STRUCTURE.search(buf, self._pos)
+            if match is None:
+                self._pos = len(buf)
+                break
+
+            char, i = match.group(), match.start()
+            if char == '"':
+                end = STRING_END.match(buf, i + 1)
+                if end is None:
+                    # String split across chunks, wait for the rest
+                    self._pos = i
+                    break
+                if self._state == SEEK and self._depth == 1:
+                    self._last_string = buf[i:end.end()]
+                self._pos = end.end()
+                continue
+
+            self._pos = i + 1
+
+            if self._state == VALUE:
+                if char == "[":
+                    self._depth += 1
+                    self._container_depth = self._depth
+                    self._boundary = i + 1
+                    self._state = ITEMS
+                    continue
+                if char == "{":
+                    self._item_start = i
+                    self._container_depth = self._depth
+                    self._depth += 1
+                    self._state = SINGLE
+                    continue
+                # Scalar value (eg: null), there are no records
+                self._state = SEEK
+
+            if self._state == SEEK:
+                if char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._state = DONE
+                elif char == ":" and self._depth == 1:
+                    if self._last_string is not None and json.loads(self._last_string) == self.key:
+                        self._state = VALUE
+                    self._last_string = None
+                elif char == ",":
+                    self._last_string = None
+                continue
+
+            if self._state == SINGLE:
+                if char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == self._container_depth:
+                        items.append(loads(buf[self._item_start:i + 1]))
+                        self._item_start = None
+                        self._state = DONE
+                continue
+
+            # ITEMS: split the array on its own commas
+            if char in "{[":
+                if self._depth == self._container_depth and self._item_start is None:
+                    self._item_start = i
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth < self._container_depth:
+                    # End of the array
+                    self._emit_scalar(buf, i, items)
+                    self._state = DONE
+                elif self._depth == self._container_depth and self._item_start is not None:
+                    items.append(loads(buf[self._item_start:i + 1]))
+                    self._item_start = None
+                    self._boundary = None
+            elif char == "," and self._depth == self._container_depth:
+                if self._item_start is None:
+                    self._emit_scalar(buf, i, items)
+                self._boundary = i + 1
+
+        return items
+
+    def _emit_scalar(self, buf, end, items):
+        # Items that are not objects/arrays (numbers, strings, null) span from the last comma to `end`
+        if self._boundary is not None:
+            text = buf[self._boundary:end].strip()
+            if text:
+                items.append(loads(text))
+        self._boundary = None
+
+    def _trim(self):
+        # Drop what has been consumed so that the buffer only ever holds the current item
+        keep = [self._pos]
+        if self._item_start is not None:
+            keep.append(self._item_start)
+        if self._boundary is not None:
+            keep.append(self._boundary)
+        cut = min(keep)
+        if cut > 0:
+            self._buf = self._buf[cut:]
+            self._pos -= cut
+            if self._item_start is not None:
+                self._item_start -= cut
+            if self._boundary is not None:
+                self._boundary -= cut
+
+
+def iter_json_items(chunks, key="data"):
+    """
+    Yield the items of `key` from an iterable of chunks of a JSON document.
+    """
+    stream = RecordStream(key)
+    for chunk in chunks:
+        if stream.done:
+            # Keep reading what is left (eg: meta) so that the connection can be reused
+            continue
+        yield from stream.feed(chunk)
+    if not stream.done:
+        yield from stream.close()
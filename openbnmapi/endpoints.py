@@ -0,0 +1,208 @@
+import re
+
+from datetime import date as Date
+from functools import lru_cache
+
+# Local modules
+from . import constants
+
+# Declarative description of the BNM endpoints. The public methods of OpenBNMAPI validate their arguments and
+# build their urls from the ENDPOINTS registry below, through the memoized build_request.
+
+DATE_FORMAT = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})$")
+
+
+class Choice:
+
+    """
+    Validator of an argument that takes one value of a fixed set. Membership is a frozenset lookup.
+
+    params:
+
+    values: list
+        Valid values, in the order used when all of them are asked for
+    error: string
+        Message of the ValueError raised for an invalid value
+    """
+    def __init__(self, values, error):
+        self.values = tuple(values)
+        self.valid = frozenset(self.values)
+        self.error = error
+
+    def __contains__(self, value):
+        try:
+            return value in self.valid
+        except TypeError:
+            # Unhashable, eg: a list
+            return False
+
+    def __call__(self, value):
+        if value not in self:
+            raise ValueError(self.error)
+        return value
+
+
+BANK_CODES = Choice(constants.SWIFT_codes, "Wrong Swift Code")
+CURRENCY_CODES = Choice(constants.currency_codes,
+                        "Invalid Currency Code.\n"
+                        "Please ensure your currency is in ISO 4217 standard format.\n"
+                        "Read more here: https://www.iso.org/iso-4217-currency-codes.html")
+PRODUCTS = Choice(constants.interest_related_products, "Invalid product type")
+SESSIONS = Choice(constants.exchange_rate_snapshots,
+                  "Invalid exchange rate snapshots. Valid snapshots are: '0900', '1130', '1200', '1700'")
+QUOTES = Choice(["rm", "fx"], "Invalid quote. Valid quotes are: 'rm' and 'fx'")
+
+
+def search_query(value):
+    # Consumer alert searches of 1 to 49 characters, anything else lists every alert
+    return value if value and len(value) < 50 else None
+
+
+# Precompiled path templates of the date arguments
+DATE_TEMPLATE = "/date/{}".format
+YEAR_MONTH_TEMPLATE = "/year/{}/month/{}".format
+YEAR_TEMPLATE = "/year/{}".format
+
+
+def date_segment(date, year, month):
+    """
+    Validate the date arguments and build their url path segment.
+
+    returns: a valid url path segment. eg: /date/{date} or /year/{year}/month/{month}, or None without arguments
+    rtype: string
+    """
+    # Check is both date and year,month is being filled up. Either one of them can be inputed
+    if date and (year and month):
+        raise ValueError("Either 'date' or 'year, month' is accepted as arguments")
+
+    if date:
+        if isinstance(date, Date):
+            date = date.isoformat()
+        match = DATE_FORMAT.match(date) if isinstance(date, str) else None
+        try:
+            parsed = Date(*(int(part) for part in match.groups()))
+        except (AttributeError, ValueError):
+            raise ValueError("Incorrect date format, should be YYYY-MM-DD")
+        # Only accept date arguments after year 2000
+        if parsed.year <= 2000:
+            raise ValueError("Year out of range. Please ensure year is more recent than 2000")
+        # Zero padded, eg: 2020-1-5 -> 2020-01-05, so that both spellings share one url and cache entry
+        return DATE_TEMPLATE(parsed.isoformat())
+
+    # Check is year and month exists and is of type int
+    if (year and month) and (type(year) == int) and (type(month) == int):
+        if (year > 2000) and (1 <= month <= 12):
+            return YEAR_MONTH_TEMPLATE(year, month)
+        raise ValueError("Incorrect year and month format. "
+                         "Ensure year is more recent than 2000 and month is in range of [1...12]")
+
+    # Default case. Return nothing
+    return None
+
+
+class Endpoint:
+
+    """
+    Declaration of one endpoint.
+
+    params:
+
+    name: string
+        Name of the OpenBNMAPI method
+    path: string
+        Path relative to the base url, eg: '/exchange-rate'
+    argument: callable
+        Validator of the optional path argument (eg: a currency code): returns the value to put in the path,
+        None to leave it out, or raises ValueError
+    dated: bool
+        Accepts 'date' or 'year, month' (/date/{date} or /year/{year}/month/{month}). When the endpoint has an
+        argument, only together with it
+    by_year: bool
+        Accepts 'year' (/year/{year})
+    query: dict
+        Query parameters and their validators
+    """
+    def __init__(self, name, path, argument=None, dated=False, by_year=False, query=None):
+        self.name = name
+        self.path = path
+        self.argument = argument
+        self.dated = dated
+        self.by_year = by_year
+        self.query = query or {}
+        # Precompiled templates
+        self.argument_template = (path + "/{}").format
+        self.year_template = (path + YEAR_TEMPLATE("{}")).format
+
+    def path_for(self, argument=None, date=None, year=None, month=None):
+        """
+        returns: the validated path of a request, eg: /exchange-rate/USD/year/2020/month/1
+        rtype: string
+        """
+        path = self.path
+        if self.argument is not None:
+            argument = self.argument(argument) if argument else None
+            if argument:
+                path = self.argument_template(argument)
+
+        if self.dated and (self.argument is None or argument):
+            segment = date_segment(date, year, month)
+            if segment:
+                path = path + segment
+        if self.by_year and year and year > 2000:
+            path = self.year_template(year)
+        return path
+
+    def params_for(self, query=None):
+        """
+        returns: the validated query parameters of a request
+        rtype: dict
+        """
+        query = query or {}
+        for key, validator in self.query.items():
+            validator(query.get(key))
+        return dict(query)
+
+
+ENDPOINTS = {endpoint.name: endpoint for endpoint in [
+    Endpoint("base_rate", "/base-rate", argument=BANK_CODES),
+    Endpoint("daily_fx_turnover", "/fx-turn-over", dated=True),
+    Endpoint("exchange_rate", "/exchange-rate", argument=CURRENCY_CODES, dated=True,
+             query={"session": SESSIONS, "quote": QUOTES}),
+    Endpoint("consumer_alert", "/consumer-alert", argument=search_query),
+    Endpoint("interbank_swap", "/interbank-swap", dated=True),
+    Endpoint("interest_rate", "/interest-rate", dated=True, query={"product": PRODUCTS}),
+    Endpoint("interest_volume", "/interest-volume", dated=True, query={"product": PRODUCTS}),
+    Endpoint("islamic_interback_rate", "/islamic-interbank-rate", dated=True),
+    Endpoint("kijang_emas", "/kijang-emas", dated=True),
+    Endpoint("overnight_policy_rate", "/opr", by_year=True),
+    Endpoint("renminbi_deposit_acceptance_rate", "/renminbi-deposit-acceptance-rate"),
+    Endpoint("renminbi_fx_forward_price", "/renminbi-fx-forward-price"),
+    Endpoint("usd_interbank_intraday_rate", "/usd-interbank-intraday-rate", dated=True),
+    Endpoint("kl_usd_reference_rate", "/kl-usd-reference-rate", dated=True),
+]}
+
+
+@lru_cache(maxsize=4096)
+def _build_request(name, argument, date, year, month, query):
+    endpoint = ENDPOINTS[name]
+    return endpoint.path_for(argument, date, year, month), endpoint.params_for(dict(query))
+
+
+def build_request(name, argument=None, date=None, year=None, month=None, query=None):
+    """
+    Validate the arguments of an endpoint and build its request. Memoized, so the repeated requests of range
+    and fan-out calls are validated and built once.
+
+    raises: ValueError for invalid arguments
+
+    returns: the path relative to the base url, and the query parameters
+    rtype: tuple(string, dict)
+    """
+    query_items = tuple((query or {}).items())
+    try:
+        path, params = _build_request(name, argument, date, year, month, query_items)
+    except TypeError:
+        # Unhashable arguments cannot be memoized
+        path, params = _build_request.__wrapped__(name, argument, date, year, month, query_items)
+    # A copy, the memoized dict is shared
+    return path, dict(params)
@@ -0,0 +1,88 @@
+# Exceptions raised by the OpenBNMAPI client when a request cannot be completed
+
+
+class OpenBNMAPIError(Exception):
+    """
+    Base class for every error raised while talking to the BNM Open API.
+    """
+
+
+class BNMConnectionError(OpenBNMAPIError):
+    """
+    The request never got a response (DNS failure, refused connection, reset, ...).
+    """
+
+
+class BNMTimeoutError(BNMConnectionError):
+    """
+    The connect or read timeout was exceeded.
+    """
+
+
+class BNMHTTPError(OpenBNMAPIError):
+    """
+    BNM answered with a non-success status code.
+
+    attributes:
+
+    status_code: int
+        HTTP status code of the response
+    url: string
+        Final url of the request
+    response: requests.Response
+        The response object, if available
+    """
+    def __init__(self, message, status_code=None, url=None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.url = url
+        self.response = response
+
+
+class BNMClientError(BNMHTTPError):
+    """
+    4xx response. Usually caused by invalid parameters.
+    """
+
+
+class BNMNotFoundError(BNMClientError):
+    """
+    404 response. BNM returns this when there is no data for the requested date/month.
+    """
+
+
+class BNMRateLimitError(BNMClientError):
+    """
+    429 response that could not be recovered by retrying.
+
+    attributes:
+
+    retry_after: float
+        Seconds BNM asked us to wait before retrying, if it sent a Retry-After header
+    """
+    def __init__(self, message, status_code=None, url=None, response=None, retry_after=None):
+        super().__init__(message, status_code, url, response)
+        self.retry_after = retry_after
+
+
+class BNMServerError(BNMHTTPError):
+    """
+    5xx response that could not be recovered by retrying.
+    """
+
+
+def error_for_status(status_code, url=None, response=None, retry_after=None):
+    """
+    Build the matching exception for a non-success status code.
+    """
+    message = "BNM API returned HTTP {} for {}".format(status_code, url)
+
+    if status_code == 429:
+        return BNMRateLimitError(message, status_code, url, response, retry_after)
+    if status_code == 404:
+        return BNMNotFoundError(message, status_code, url, response)
+    if 400 <= status_code < 500:
+        return BNMClientError(message, status_code, url, response)
+    if status_code >= 500:
+        return BNMServerError(message, status_code, url, response)
+    return BNMHTTPError(message, status_code, url, response)
@@ -0,0 +1,537 @@
+# Bulk export of endpoints over a date range to CSV, JSON Lines or Parquet, used by the command line
+# (python -m openbnmapi, see __main__.py). pandas is only imported for Parquet output.
+
+import csv
+import inspect
+import io
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+# Local modules
+from .cache import MYT
+from .endpoints import ENDPOINTS
+from .exceptions import BNMNotFoundError, OpenBNMAPIError
+from .fanout import ALL, published_codes
+from .ranges import merge_range_results, split_date_range, to_date
+from .records import extract_records
+
+FORMATS = ("csv", "jsonl", "parquet")
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+
+# Checkpoint of an export to a directory, next to its files
+CHECKPOINT = ".openbnmapi-checkpoint.jsonl"
+
+# Path argument of the endpoints that have one, and the endpoint (and field) listing the codes 'all' stands for
+ARGUMENTS = {"base_rate": "bank_codes", "consumer_alert": "search_query", "exchange_rate": "currency_code"}
+ALL_CODES = {"bank_codes": ("base_rate", "bank_code"), "currency_code": ("exchange_rate", "currency_code")}
+# exchange_rate arguments passed in its 'quote' dict, and their defaults
+QUOTE_DEFAULTS = {"session": "1130", "quote": "rm"}
+
+# Seconds between two progress lines
+PROGRESS_INTERVAL = 0.5
+
+
+def unit_key(args):
+    """
+    Identify a request of a series by its date arguments, eg: '{"month": 1, "year": 2020}'.
+    """
+    return json.dumps(args, sort_keys=True)
+
+
+class Series:
+
+    """
+    One endpoint with one set of arguments, eg: exchange_rate for USD, and the requests covering the range.
+
+    params:
+
+    endpoint: string
+        Name of the endpoint method, eg: 'exchange_rate'
+    kwargs: dict
+        Arguments of the method, besides the date ones
+    units: list(dict)
+        Date arguments of each request, eg: [{'year': 2020, 'month': 1}, {'date': '2020-02-01'}]. {} requests
+        the latest data
+    name: string
+        Name of the output file, eg: 'exchange_rate-USD'
+    """
+    def __init__(self, endpoint, kwargs, units, name):
+        self.endpoint = endpoint
+        self.kwargs = kwargs
+        self.units = units
+        self.name = name
+
+
+def all_codes(client, argument, listed):
+    """
+    returns: the codes 'all' stands for: those of the unfiltered latest response, eg: the currencies BNM
+        publishes. Requested once per argument, `listed` remembers them
+    rtype: list(string)
+    """
+    if argument not in listed:
+        endpoint, key = ALL_CODES[argument]
+        listed[argument] = published_codes(getattr(client, endpoint)(rtype='json'), key)
+    return listed[argument]
+
+
+def plan(client, endpoints, params=None, start=None, end=None):
+    """
+    Split an export into series and requests.
+
+    Date-aware endpoints are requested by month (and by day at the edges, see ranges.split_date_range), the OPR
+    by year, others once for their latest data. Arguments with several values (or 'all' for currency and bank
+    codes, those BNM publishes) give one series per value.
+
+    params:
+
+    client: OpenBNMAPI
+        Client whose methods are inspected for the arguments they accept
+    endpoints: list(string)
+        Names of the endpoint methods
+    params: dict
+        Maps an argument to its values, eg: {'currency_code': ['USD', 'SGD'], 'session': ['0900']}. Arguments an
+        endpoint does not accept are left out of its series
+    start, end: string<date> or date
+        Range of the export. Without `start` the latest data is exported. `end` defaults to today
+
+    raises: ValueError for unknown endpoints and missing or invalid arguments
+
+    rtype: list(Series)
+    """
+    params = params or {}
+    if start is not None:
+        start = to_date(start)
+        end = to_date(end) if end is not None else datetime.now(MYT).date()
+        if start > end:
+            raise ValueError("'start' must not be after 'end'")
+
+    series = []
+    listed = {}
+    for name in endpoints:
+        if name not in ENDPOINTS:
+            raise ValueError("Unknown endpoint: {}. Valid endpoints are: {}".format(name, ", ".join(ENDPOINTS)))
+        endpoint = ENDPOINTS[name]
+        accepted = inspect.signature(getattr(client, name)).parameters
+
+        names, values = [], []
+        for key, given in params.items():
+            if key in accepted or (name == "exchange_rate" and key in QUOTE_DEFAULTS):
+                if key in ALL_CODES and ALL in given:
+                    given = all_codes(client, key, listed)
+                names.append(key)
+                values.append(given)
+
+        argument = ARGUMENTS.get(name)
+        if start is not None and endpoint.dated and argument is not None and argument not in names:
+            raise ValueError("{} needs '{}' for a date range".format(name, argument))
+
+        if start is None:
+            units = [{}]
+        elif endpoint.dated:
+            units = split_date_range(start, end)
+        elif endpoint.by_year:
+            units = [{"year": year} for year in range(start.year, end.year + 1)]
+        else:
+            units = [{}]
+
+        for combination in itertools.product(*values):
+            kwargs = dict(zip(names, combination))
+            if name == "exchange_rate":
+                kwargs["quote"] = {key: kwargs.pop(key, default) for key, default in QUOTE_DEFAULTS.items()}
+            file_name = "-".join([name] + [str(value) for value in combination])
+            series.append(Series(name, kwargs, units, file_name))
+    return series
+
+
+def _flatten(record, prefix=""):
+    # Dotted names for nested dicts, eg: one_oz.buying. Lists are written as JSON
+    flat = {}
+    for key, value in record.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value)
+        else:
+            flat[name] = value
+    return flat
+
+
+class JSONLinesWriter:
+
+    """
+    Writes the records of a series to a JSON Lines file, or to stdout if `path` is '-'.
+
+    params:
+
+    path: string
+        File to write
+    offset: int
+        Size of the file written by an interrupted export, which is resumed from there. None starts a new file
+    """
+    def __init__(self, path, offset=None):
+        self.path = path
+        if path == "-":
+            self._file = sys.stdout.buffer
+            return
+        self._file = open(path, "r+b" if offset is not None and os.path.exists(path) else "wb")
+        if offset is not None:
+            # Drop whatever was written after the last checkpoint
+            self._file.truncate(offset)
+            self._file.seek(offset)
+
+    def _encode(self, records):
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+    def write(self, index, records):
+        """
+        Write the records of the `index`th request of the series.
+
+        returns: the state to checkpoint, the size of the file
+        rtype: int
+        """
+        self._file.write(self._encode(records))
+        self._file.flush()
+        return None if self.path == "-" else self._file.tell()
+
+    def close(self):
+        if self.path != "-":
+            self._file.close()
+
+
+class CSVWriter(JSONLinesWriter):
+
+    """
+    Writes the records of a series to a CSV file. Nested fields become dotted columns (eg: one_oz.buying) and
+    the columns are those of the first records written: later fields that are not among them are dropped, with a
+    warning.
+    """
+    def __init__(self, path, offset=None):
+        super().__init__(path, offset)
+        self.columns = None
+        self.dropped = set()
+        if offset and path != "-":
+            # Resuming: keep the header already written
+            with open(path, newline="", encoding="utf-8") as f:
+                self.columns = next(csv.reader(f), None)
+
+    def _encode(self, records):
+        rows = [_flatten(record) for record in records]
+        if not rows:
+            return b""
+        buffer = io.StringIO()
+        header = self.columns is None
+        if header:
+            self.columns = list(dict.fromkeys(name for row in rows for name in row))
+        writer = csv.DictWriter(buffer, self.columns, extrasaction="ignore", lineterminator="\n")
+        if header:
+            writer.writeheader()
+        for row in rows:
+            extra = set(row) - set(self.columns) - self.dropped
+            if extra:
+                self.dropped |= extra
+                print("Warning: {} not in the CSV header of {}, dropped".format(", ".join(sorted(extra)), self.path),
+                      file=sys.stderr)
+            writer.writerow(row)
+        return buffer.getvalue().encode("utf-8")
+
+
+class ParquetWriter:
+
+    """
+    Writes the records of a series to a directory of Parquet files, one per request (part-00000.parquet, ...),
+    readable as one table with pandas.read_parquet(path). Columns are typed as in the DataFrames of the endpoint
+    (see frames.SCHEMAS). Needs pandas with pyarrow or fastparquet.
+    """
+    def __init__(self, path, endpoint, offset=None):
+        # pandas is only needed for Parquet, import it now rather than at startup
+        import pandas as pd
+        pd.io.parquet.get_engine("auto")
+
+        self.path = path
+        self.endpoint = endpoint
+        os.makedirs(path, exist_ok=True)
+        if offset is None:
+            for name in os.listdir(path):
+                if name.startswith("part-") and name.endswith(".parquet"):
+                    os.remove(os.path.join(path, name))
+
+    def write(self, index, records):
+        if records:
+            from .frames import records_to_frame
+            frame = records_to_frame(ENDPOINTS[self.endpoint].path, records).reset_index()
+            frame.columns = [".".join(part for part in column if part) if isinstance(column, tuple) else column
+                             for column in frame.columns]
+            frame.to_parquet(os.path.join(self.path, "part-{:05d}.parquet".format(index)), index=False)
+        return 0
+
+    def close(self):
+        pass
+
+
+class Checkpoint:
+
+    """
+    Progress of an export: one JSON line per request written, with the size of its output file at that point.
+    An interrupted export run again with the same arguments skips the requests already written and truncates
+    the files to their last checkpointed size.
+
+    params:
+
+    path: string
+        Location of the checkpoint file
+    run: dict
+        Arguments of the export. A checkpoint of different arguments is not resumed
+    overwrite: bool
+        Start over even if a checkpoint exists
+    """
+    def __init__(self, path, run, overwrite=False):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path) and not overwrite:
+            with open(path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+            if lines and lines[0].get("run") != run:
+                raise ValueError("{} belongs to another export, remove it or pass --overwrite".format(path))
+            for entry in lines[1:]:
+                self.done[(entry["series"], entry["unit"])] = entry["state"]
+        self.resumed = bool(self.done)
+
+        self._file = open(path, "a" if self.resumed else "w", encoding="utf-8")
+        if not self.resumed:
+            self._write({"run": run})
+        self._lock = threading.Lock()
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def state(self, series):
+        """
+        returns: the size of the output file of a series at its last checkpoint, None if nothing was written
+        """
+        states = [state for (name, _), state in self.done.items() if name == series and state is not None]
+        return max(states) if states else None
+
+    def add(self, series, unit, state):
+        with self._lock:
+            self.done[(series, unit)] = state
+            self._write({"series": series, "unit": unit, "state": state})
+
+    def close(self):
+        self._file.close()
+
+    def remove(self):
+        self.close()
+        os.remove(self.path)
+
+
+class Progress:
+
+    """
+    Counts requests and records, prints a progress line at most every PROGRESS_INTERVAL seconds and a summary
+    at the end.
+    """
+    def __init__(self, total, stream=None):
+        self.total = total
+        self.stream = stream
+        self.requests = 0
+        self.records = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+        self._printed = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def update(self, records=0, failed=False):
+        self.requests += 1
+        self.records += records
+        self.failed += int(failed)
+        now = time.perf_counter()
+        if self.stream is not None and now - self._printed >= PROGRESS_INTERVAL:
+            self._printed = now
+            print("{}/{} requests, {} records, {:.1f} requests/s".format(
+                self.requests + self.skipped, self.total, self.records, self.requests / max(self.elapsed, 1e-9)
+            ), file=self.stream, flush=True)
+
+    def summary(self, cache_hits=0):
+        """
+        rtype: dict
+        """
+        elapsed = self.elapsed
+        return {
+            "requests": self.requests,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "records": self.records,
+            "cache_hits": cache_hits,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(self.requests / max(elapsed, 1e-9), 1),
+            "records_per_second": round(self.records / max(elapsed, 1e-9), 1),
+        }
+
+
+class Exporter:
+
+    """
+    Export series to files, fetching their requests in parallel and writing the records of each series in
+    date order as they arrive.
+
+        exporter = Exporter(obnmapi, "exports", fmt="csv", workers=8)
+        exporter.run(plan(obnmapi, ["kijang_emas"], start="2015-01-01"))
+
+    params:
+
+    client: OpenBNMAPI
+        Client sending the requests, with its cache and rate limits
+    output: string
+        Directory of the files, one per series, or a file (ending with the extension of the format) when
+        exporting one series. '-' writes a single series to stdout (csv and jsonl only, not resumable)
+    fmt: string
+        'csv', 'jsonl' or 'parquet'. Defaults to 'jsonl'
+    workers: int
+        Requests sent in parallel. Defaults to 8
+    overwrite: bool
+        Start over instead of resuming an interrupted export. Defaults to False
+    progress: file
+        Where progress lines are printed, eg: sys.stderr. Defaults to none
+    """
+    def __init__(self, client, output, fmt="jsonl", workers=8, overwrite=False, progress=None):
+        if fmt not in FORMATS:
+            raise ValueError("Invalid format. Valid formats are: {}".format(", ".join(FORMATS)))
+        self.client = client
+        self.output = output
+        self.fmt = fmt
+        self.workers = workers
+        self.overwrite = overwrite
+        self.progress_stream = progress
+
+    def _single_file(self):
+        return self.output == "-" or self.output.endswith(EXTENSIONS[self.fmt])
+
+    def _paths(self, series):
+        # Output of every series, and the checkpoint file
+        if self._single_file():
+            if len(series) != 1:
+                raise ValueError("Several series ({}) need an output directory".format(
+                    ", ".join(s.name for s in series)))
+            if self.output == "-" and self.fmt == "parquet":
+                raise ValueError("Parquet cannot be written to stdout")
+            checkpoint = None if self.output == "-" else self.output + ".checkpoint"
+            return {series[0].name: self.output}, checkpoint
+
+        os.makedirs(self.output, exist_ok=True)
+        paths = {s.name: os.path.join(self.output, s.name + EXTENSIONS[self.fmt]) for s in series}
+        return paths, os.path.join(self.output, CHECKPOINT)
+
+    def _writer(self, series, path, offset):
+        if self.fmt == "parquet":
+            return ParquetWriter(path, series.endpoint, offset)
+        if self.fmt == "csv":
+            return CSVWriter(path, offset)
+        return JSONLinesWriter(path, offset)
+
+    def _fetch(self, series, unit, bounds):
+        try:
+            payload = getattr(self.client, series.endpoint)(rtype="json", **series.kwargs, **unit)
+        except BNMNotFoundError:
+            # No data published for that day or month
+            return []
+        if bounds is None:
+            return extract_records(payload)
+        return merge_range_results([payload], *bounds)
+
+    def run(self, series, run=None, start=None, end=None):
+        """
+        Fetch and write every request of `series` not written by an interrupted run of the same export.
+
+        params:
+
+        run: dict
+            Arguments identifying the export in its checkpoint. Defaults to the series and their requests
+        start, end: string<date> or date
+            Records outside of [start, end] (eg: of a month requested whole) are dropped
+
+        returns: the summary of the export, see Progress.summary. 'interrupted' is True if it was stopped by
+            Ctrl-C, 'failed' counts the requests that failed. The next run sends them again, with the requests
+            of their series that come after them
+        rtype: dict
+        """
+        if run is None:
+            run = {s.name: [unit_key(unit) for unit in s.units] for s in series}
+        bounds = None if start is None else (start, end if end is not None else datetime.now(MYT).date())
+        paths, checkpoint_path = self._paths(series)
+        checkpoint = None if checkpoint_path is None else Checkpoint(checkpoint_path, run, self.overwrite)
+
+        # Requests of each series still to write, in order
+        pending = {}
+        progress = Progress(sum(len(s.units) for s in series), self.progress_stream)
+        for s in series:
+            pending[s.name] = [i for i, unit in enumerate(s.units)
+                               if checkpoint is None or (s.name, unit_key(unit)) not in checkpoint.done]
+            progress.skipped += len(s.units) - len(pending[s.name])
+
+        writers = {}
+        interrupted = False
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for s in series:
+                state = checkpoint.state(s.name) if checkpoint is not None and checkpoint.resumed else None
+                writers[s.name] = self._writer(s, paths[s.name], state)
+
+            futures = {pool.submit(self._fetch, s, s.units[i], bounds): (s, i)
+                       for s in series for i in pending[s.name]}
+            ready = {s.name: {} for s in series}
+            for future in as_completed(futures):
+                s, i = futures[future]
+                try:
+                    ready[s.name][i] = future.result()
+                    progress.update(len(ready[s.name][i]))
+                except OpenBNMAPIError as e:
+                    # Not checkpointed, the next run sends it again
+                    ready[s.name][i] = e
+                    progress.update(failed=True)
+                self._flush(s, pending[s.name], ready[s.name], writers[s.name], checkpoint)
+        except KeyboardInterrupt:
+            interrupted = True
+        finally:
+            pool.shutdown(wait=not interrupted, cancel_futures=True)
+            for writer in writers.values():
+                writer.close()
+
+        if checkpoint is not None:
+            if not interrupted and not progress.failed:
+                checkpoint.remove()
+            else:
+                checkpoint.close()
+
+        cache = getattr(self.client, "cache", None)
+        summary = progress.summary(cache.stats.hits if cache is not None else 0)
+        summary["interrupted"] = interrupted
+        return summary
+
+    def _flush(self, series, pending, ready, writer, checkpoint):
+        # Write the requests of a series that are done, in order, up to the first one still running or failed
+        while pending and pending[0] in ready:
+            if isinstance(ready[pending[0]], Exception):
+                # Nothing after a failed request is written: the next run sends it and the ones after it again,
+                # so that the file stays in date order and the checkpoint contiguous
+                error = ready[pending[0]]
+                ready.clear()
+                ready[pending[0]] = error
+                return
+            index = pending.pop(0)
+            records = ready.pop(index)
+            state = writer.write(index, records)
+            if checkpoint is not None:
+                checkpoint.add(series.name, unit_key(series.units[index]), state)
@@ -0,0 +1,117 @@
+# Helpers for the list / "all" forms of exchange_rate and base_rate
+
+from .arrow import records_to_table
+from .frames import records_to_frame
+from .records import extract_records
+from .recordset import RecordSet
+
+ALL = "all"
+
+# Requests sent in parallel for the items missing from the unfiltered response
+FAN_OUT_WORKERS = 8
+
+
+def is_fan_out(codes):
+    """
+    Whether an endpoint argument asks for several items: a list of codes or "all". Lowercase only, "ALL" is
+    the currency code of the Albanian lek.
+    """
+    if codes is None:
+        return False
+    if isinstance(codes, str):
+        return codes == ALL
+    return True
+
+
+def resolve_codes(codes, choice):
+    """
+    returns: the requested codes in order and without duplicates, or None for "all": the codes BNM publishes,
+        read from the unfiltered response (see published_codes)
+    rtype: list(string)
+
+    raises: ValueError if one of the codes is not valid
+
+    choice: endpoints.Choice
+        Valid codes of the argument
+    """
+    if isinstance(codes, str):
+        return None
+
+    resolved = []
+    for code in codes:
+        if code not in choice:
+            raise ValueError("{}: {}".format(choice.error, code))
+        if code not in resolved:
+            resolved.append(code)
+    return resolved
+
+
+def index_by(payload, key):
+    """
+    Index the items of an unfiltered response by one of their fields, eg: {'USD': {...}, 'SGD': {...}}.
+    """
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if isinstance(data, dict):
+        data = [data]
+    return {item[key]: item for item in data or [] if isinstance(item, dict) and key in item}
+
+
+def published_codes(payload, key):
+    """
+    returns: the codes of the items of an unfiltered response, in order, eg: the ~25 currencies BNM publishes
+        rather than every ISO 4217 code
+    rtype: list(string)
+    """
+    return list(index_by(payload, key))
+
+
+class FanOutResult:
+
+    """
+    Items gathered for a list of codes, from the unfiltered response and from one request per missing code.
+    """
+    def __init__(self, endpoint, codes):
+        self.endpoint = endpoint
+        self.codes = codes
+        self.items = {}
+        self.errors = {}
+        self.requests = 0
+
+    def add_latest(self, payload, key):
+        # Serve the codes present in the unfiltered response
+        latest = index_by(payload, key)
+        self.items.update((code, latest[code]) for code in self.codes if code in latest)
+
+    def missing(self):
+        return [code for code in self.codes if code not in self.items]
+
+    def add(self, code, payload):
+        self.items[code] = payload.get("data")
+
+    def response(self, rtype):
+        """
+        returns: {'data': {code: item}, 'errors': {code: exception}, 'meta': {...}} for rtype 'json', a
+            DataFrame for 'df' (errors in df.attrs['errors']), an iterator of records for 'records', a
+            RecordSet for 'recordset' (errors in its meta) or a pyarrow.Table for 'arrow' (errors in its schema
+            metadata)
+        """
+        items = {code: self.items[code] for code in self.codes if code in self.items}
+        if rtype in ('df', 'dataframe'):
+            frame = records_to_frame(self.endpoint, extract_records({"data": list(items.values())}))
+            frame.attrs["errors"] = dict(self.errors)
+            return frame
+        if rtype == 'records':
+            return iter(extract_records({"data": list(items.values())}))
+        if rtype == 'recordset':
+            return RecordSet.from_records(extract_records({"data": list(items.values())}),
+                                          {"errors": dict(self.errors)})
+        if rtype == 'arrow':
+            return records_to_table(self.endpoint, extract_records({"data": list(items.values())}),
+                                    {"errors": {code: repr(error) for code, error in self.errors.items()}})
+        if rtype == 'json':
+            return {
+                "data": items,
+                "errors": dict(self.errors),
+                "meta": {"requested": len(self.codes), "returned": len(items), "requests": self.requests},
+            }
+        raise ValueError("Invalid rtype. Valid values are: 'json', 'df', 'records', 'recordset' and 'arrow'")
@@ -0,0 +1,249 @@
+# Local modules
+from .lazy import LazyModule
+from .records import endpoint_of, extract_records
+
+# Loaded on the first DataFrame
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# Column kinds
+FLOAT = "float"
+INT = "int"
+DATETIME = "datetime"
+CATEGORY = "category"
+STRING = "string"
+OBJECT = "object"
+# Kind of columns that are not part of the schema: float if every value is a number, object otherwise
+AUTO = "auto"
+
+
+class FrameSchema:
+
+    """
+    Column layout of the DataFrame of an endpoint.
+
+    params:
+
+    index: list(tuple(name, path, kind))
+        Index levels. More than one level gives a MultiIndex
+    columns: list(tuple(name, path, kind))
+        Columns, in order. Tuple names give MultiIndex columns
+    explode: string
+        Key of a nested list of sub-records (eg: intraday rates per time of day) that becomes one row each
+    extra: string
+        Kind of the fields that are not in `columns`, or None to drop them. Defaults to AUTO
+
+    `path` is the tuple of keys leading to the value in a record, eg: ('one_oz', 'buying').
+    """
+    def __init__(self, index=(), columns=(), explode=None, extra=AUTO):
+        self.index = list(index)
+        self.columns = list(columns)
+        self.explode = explode
+        self.extra = extra
+        self.known_paths = set(path for _, path, _ in self.index + self.columns)
+
+    def _rows(self, records):
+        # Explode nested lists of sub-records into one row per item
+        for record in records:
+            nested = record.get(self.explode) if self.explode else None
+            if isinstance(nested, list):
+                parent = {k: v for k, v in record.items() if k != self.explode}
+                for item in nested:
+                    row = dict(parent)
+                    row.update(item)
+                    yield row
+            else:
+                yield record
+
+    def build(self, records):
+        """
+        Build the DataFrame of a list of records in a single pass, filling each column as we go.
+
+        rtype: pandas.DataFrame
+        """
+        fields = self.index + self.columns
+        values = [[] for _ in fields]
+        extras = {}
+        n_rows = 0
+
+        for row in self._rows(records):
+            for i, (_, path, _) in enumerate(fields):
+                values[i].append(_get_path(row, path))
+
+            if self.extra is not None:
+                for path, value in _flat_items(row):
+                    if path in self.known_paths:
+                        continue
+                    column = extras.get(path)
+                    if column is None:
+                        # Column first seen on this row, earlier rows did not have it
+                        column = extras[path] = [None] * n_rows
+                    column.append(value)
+
+            n_rows += 1
+            for column in extras.values():
+                if len(column) < n_rows:
+                    column.append(None)
+
+        names, arrays = [], []
+        for (name, _, kind), column in zip(self.columns, values[len(self.index):]):
+            names.append(name)
+            arrays.append(_convert(column, kind))
+        for path, column in extras.items():
+            names.append(path if len(path) > 1 else path[0])
+            arrays.append(_convert(column, self.extra))
+
+        # Columns are keyed by position first since MultiIndex names are tuples
+        frame = pd.DataFrame(dict(enumerate(arrays)), index=pd.RangeIndex(n_rows))
+        if any(isinstance(name, tuple) for name in names):
+            width = max(len(name) for name in names if isinstance(name, tuple))
+            frame.columns = pd.MultiIndex.from_tuples(
+                [_pad(name if isinstance(name, tuple) else (name,), width) for name in names]
+            )
+        else:
+            frame.columns = names
+
+        levels = [(name, _convert(column, kind)) for (name, _, kind), column in zip(self.index, values)
+                  if any(value is not None for value in column)]
+        if len(levels) == 1:
+            frame.index = pd.Index(levels[0][1], name=levels[0][0])
+        elif levels:
+            frame.index = pd.MultiIndex.from_arrays([level for _, level in levels], names=[name for name, _ in levels])
+
+        if levels:
+            frame = frame.sort_index()
+        return frame
+
+
+def _pad(name, width):
+    return name + ("",) * (width - len(name))
+
+
+def _get_path(record, path):
+    value = record
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _flat_items(record, prefix=()):
+    for key, value in record.items():
+        if isinstance(value, dict):
+            yield from _flat_items(value, prefix + (key,))
+        else:
+            yield prefix + (key,), value
+
+
+def _convert(values, kind):
+    if kind == AUTO:
+        numbers = [value for value in values if value is not None]
+        is_numeric = all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in numbers)
+        kind = FLOAT if numbers and is_numeric else OBJECT
+
+    if kind == FLOAT:
+        try:
+            return np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            # Values sent as strings, possibly with placeholders such as "-"
+            return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    if kind == INT:
+        return pd.array(values, dtype="Int64")
+    if kind == DATETIME:
+        return pd.to_datetime(pd.Series(values, dtype=object), errors="coerce").to_numpy()
+    if kind == CATEGORY:
+        return pd.Categorical(values)
+    if kind == STRING:
+        return pd.array(values, dtype="string")
+
+    # Filled item by item so that list values (eg: websites) are not turned into a 2d array
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+def _date_schema(*columns, **kwargs):
+    return FrameSchema(index=[("date", ("date",), DATETIME)], columns=columns, **kwargs)
+
+
+# Kijang Emas prices are nested per coin size and side
+KIJANG_EMAS_COLUMNS = [
+    ((size, side), (size, side), FLOAT)
+    for size in ("one_oz", "half_oz", "quarter_oz")
+    for side in ("buying", "selling")
+]
+
+SCHEMAS = {
+    "/base-rate": FrameSchema(
+        index=[("bank_code", ("bank_code",), CATEGORY)],
+        columns=[
+            ("bank_name", ("bank_name",), STRING),
+            ("base_rate", ("base_rate",), FLOAT),
+            ("base_lending_rate", ("base_lending_rate",), FLOAT),
+            ("indicative_eff_lending_rate", ("indicative_eff_lending_rate",), FLOAT),
+        ],
+    ),
+    "/consumer-alert": FrameSchema(
+        columns=[
+            ("name", ("name",), STRING),
+            ("registration_number", ("registration_number",), STRING),
+            ("added_date", ("added_date",), DATETIME),
+            ("websites", ("websites",), OBJECT),
+        ],
+    ),
+    "/exchange-rate": FrameSchema(
+        index=[("date", ("date",), DATETIME), ("currency_code", ("currency_code",), CATEGORY)],
+        columns=[
+            ("unit", ("unit",), FLOAT),
+            ("buying_rate", ("buying_rate",), FLOAT),
+            ("selling_rate", ("selling_rate",), FLOAT),
+            ("middle_rate", ("middle_rate",), FLOAT),
+        ],
+    ),
+    "/fx-turn-over": _date_schema(("total_sum", ("total_sum",), FLOAT)),
+    "/interbank-swap": _date_schema(),
+    "/interest-rate": _date_schema(),
+    "/interest-volume": _date_schema(),
+    "/islamic-interbank-rate": _date_schema(),
+    "/kijang-emas": FrameSchema(index=[("date", ("effective_date",), DATETIME)], columns=KIJANG_EMAS_COLUMNS),
+    "/kl-usd-reference-rate": _date_schema(("rate", ("rate",), FLOAT)),
+    "/opr": _date_schema(
+        ("year", ("year",), INT),
+        ("new_opr_level", ("new_opr_level",), FLOAT),
+        ("change_in_opr", ("change_in_opr",), FLOAT),
+    ),
+    "/renminbi-deposit-acceptance-rate": _date_schema(),
+    "/renminbi-fx-forward-price": _date_schema(),
+    "/usd-interbank-intraday-rate": FrameSchema(
+        index=[("date", ("date",), DATETIME), ("time", ("time",), STRING)],
+        columns=[("rate", ("rate",), FLOAT)],
+        explode="rate",
+    ),
+}
+
+DEFAULT_SCHEMA = _date_schema()
+
+
+def records_to_frame(endpoint, records):
+    """
+    Convert already flattened records (see records.extract_records) of an endpoint to a DataFrame.
+    """
+    return SCHEMAS.get(endpoint_of(endpoint), DEFAULT_SCHEMA).build(records)
+
+
+def to_frame(endpoint, payload):
+    """
+    Convert a decoded response of an endpoint to a DataFrame.
+
+    params:
+
+    endpoint: string
+        Endpoint path, eg: '/exchange-rate'
+    payload: dict
+        Decoded JSON response
+
+    rtype: pandas.DataFrame
+    """
+    return records_to_frame(endpoint, extract_records(payload))
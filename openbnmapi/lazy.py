@@ -0,0 +1,35 @@
+# Deferred imports of the heavy backends (pandas, numpy, orjson, pyarrow, ...): they are loaded on first use
+# rather than when openbnmapi is imported, so that JSON only scripts start fast
+
+import importlib
+
+
+class LazyModule:
+
+    """
+    Stand-in for a module that imports it on first attribute access.
+
+        pd = LazyModule("pandas")
+        pd.DataFrame(...)           # pandas is imported here
+
+    params:
+
+    name: string
+        Name of the module, eg: 'pandas'
+    """
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = self.__dict__["_module"] = importlib.import_module(self.__dict__["_name"])
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return "<lazy module '{}' ({})>".format(self.__dict__["_name"], state)
@@ -0,0 +1,297 @@
+import logging
+import threading
+import time
+
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets (upper bounds) for durations in seconds and sizes in bytes
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+
+# Timings recorded for each request, in seconds
+#   connect:  DNS lookup + TCP connect, only when a new connection was opened
+#   tls:      TLS handshake, only when a new https connection was opened
+#   ttfb:     from sending the request to receiving the response headers (excluding connect and tls)
+#   download: reading the body
+#   decode:   JSON decoding and conversion to the requested rtype
+#   total:    whole call, including retries and backoff
+TIMINGS = ("connect", "tls", "ttfb", "download", "decode", "total")
+
+
+class Histogram:
+
+    """
+    Cumulative histogram with fixed buckets, in the Prometheus layout.
+    """
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "buckets": dict(zip(self.buckets, self.counts)),
+        }
+
+
+class EndpointMetrics:
+
+    """
+    Counters and histograms of one endpoint.
+    """
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.rate_limit_wait = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+        self.prefetch_hits = 0
+        self.stale_hits = 0
+        self.prefetches = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.bytes_saved = 0
+        self.new_connections = 0
+        self.bytes_received = 0
+        self.status_codes = Counter()
+        self.error_types = Counter()
+        self.timings = {name: Histogram(DURATION_BUCKETS) for name in TIMINGS}
+        self.size = Histogram(SIZE_BUCKETS)
+
+    def record(self, info):
+        self.requests += 1
+        self.retries += info.get("retries", 0)
+        self.rate_limit_wait += info.get("rate_limit_wait", 0.0)
+        if info.get("cache") == "hit":
+            self.cache_hits += 1
+        elif info.get("cache") == "miss":
+            self.cache_misses += 1
+        # Statuses of the attempts that were retried, then of the final attempt
+        statuses = list(info.get("retried_statuses", ()))
+        if info.get("status_code") is not None:
+            statuses.append(info["status_code"])
+        for status in statuses:
+            self.status_codes[status] += 1
+            if status == 429:
+                self.rate_limited += 1
+        if info.get("error"):
+            self.errors += 1
+            self.error_types[info["error"]] += 1
+        if info.get("coalesced"):
+            self.coalesced += 1
+        if info.get("prefetch") == "fresh":
+            self.prefetch_hits += 1
+        elif info.get("prefetch") == "stale":
+            self.stale_hits += 1
+        elif info.get("prefetch") == "refresh":
+            self.prefetches += 1
+        if info.get("revalidated") == "not_modified":
+            self.not_modified += 1
+            self.bytes_saved += info.get("bytes_saved", 0)
+        elif info.get("revalidated") == "unchanged":
+            self.unchanged += 1
+        if info.get("connect") is not None:
+            self.new_connections += 1
+        if info.get("size") is not None:
+            self.bytes_received += info["size"]
+            self.size.observe(info["size"])
+        for name in TIMINGS:
+            if info.get(name) is not None:
+                self.timings[name].observe(info[name])
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "rate_limit_wait": self.rate_limit_wait,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "coalesced": self.coalesced,
+            "prefetch_hits": self.prefetch_hits,
+            "stale_hits": self.stale_hits,
+            "prefetches": self.prefetches,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "bytes_saved": self.bytes_saved,
+            "new_connections": self.new_connections,
+            "bytes_received": self.bytes_received,
+            "status_codes": dict(self.status_codes),
+            "error_types": dict(self.error_types),
+            "timings": {name: histogram.as_dict() for name, histogram in self.timings.items()},
+            "size": self.size.as_dict(),
+        }
+
+
+class Metrics:
+
+    """
+    Per endpoint request metrics and instrumentation hooks of a client.
+
+    Hooks are callables `hook(event, info)` called with event 'request_start' before a request and
+    'request_end' once its response has been decoded (or it failed). `info` is the same dict for both events,
+    so a tracing hook can keep its span in it:
+
+        def trace(event, info):
+            if event == "request_start":
+                info["span"] = tracer.start_span("bnm " + info["endpoint"])
+            else:
+                info["span"].set_attribute("http.status_code", info.get("status_code"))
+                info["span"].end()
+
+        obnmapi.metrics.add_hook(trace)
+
+    `info` holds: endpoint, url, params, cache ('hit', 'miss' or None), coalesced, prefetch ('fresh' or 'stale'
+    for calls served by the prefetcher, 'refresh' for its background requests, or None), status_code, retries,
+    retried_statuses, rate_limit_wait, revalidated ('not_modified', 'unchanged' or None), bytes_saved, size,
+    error, and the timings listed in TIMINGS (seconds).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._hooks = []
+
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def _emit(self, event, info):
+        for hook in self._hooks:
+            try:
+                hook(event, info)
+            except Exception:
+                # A broken hook must not break the request
+                logger.exception("openbnmapi metrics hook %r failed on %s", hook, event)
+
+    def start(self, endpoint, url, params):
+        """
+        returns: the info dict of a new request
+        rtype: dict
+        """
+        info = {"endpoint": endpoint, "url": url, "params": params, "retries": 0, "_started": time.perf_counter()}
+        self._emit("request_start", info)
+        return info
+
+    def finish(self, info, error=None):
+        """
+        Record a finished request, `error` being the exception it failed with, if any.
+        """
+        if info.get("_finished"):
+            return
+        info["_finished"] = True
+        info["total"] = time.perf_counter() - info["_started"]
+        if error is not None:
+            info["error"] = type(error).__name__
+            if info.get("status_code") is None:
+                info["status_code"] = getattr(error, "status_code", None)
+
+        with self._lock:
+            endpoint = self._endpoints.get(info["endpoint"])
+            if endpoint is None:
+                endpoint = self._endpoints[info["endpoint"]] = EndpointMetrics()
+            endpoint.record(info)
+        self._emit("request_end", info)
+
+    def snapshot(self):
+        """
+        returns: the metrics of every endpoint, keyed by endpoint path
+        rtype: dict
+        """
+        with self._lock:
+            return {endpoint: metrics.as_dict() for endpoint, metrics in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def prometheus(self, prefix="openbnmapi"):
+        """
+        returns: the metrics in the Prometheus text exposition format
+        rtype: string
+        """
+        lines = []
+        snapshot = self.snapshot()
+
+        def counter(name, help_text, values):
+            lines.append("# HELP {}_{} {}".format(prefix, name, help_text))
+            lines.append("# TYPE {}_{} counter".format(prefix, name))
+            for labels, value in values:
+                lines.append("{}_{}{{{}}} {}".format(prefix, name, labels, value))
+
+        def label(endpoint, **extra):
+            pairs = [("endpoint", endpoint)] + sorted(extra.items())
+            return ",".join('{}="{}"'.format(key, value) for key, value in pairs)
+
+        counter("requests_total", "Requests sent, including cache hits",
+                [(label(e), m["requests"]) for e, m in snapshot.items()])
+        counter("errors_total", "Requests that failed",
+                [(label(e, type=t), n) for e, m in snapshot.items() for t, n in m["error_types"].items()])
+        counter("responses_total", "Responses by status code",
+                [(label(e, code=c), n) for e, m in snapshot.items() for c, n in m["status_codes"].items()])
+        counter("retries_total", "Retried attempts", [(label(e), m["retries"]) for e, m in snapshot.items()])
+        counter("rate_limited_total", "429 responses received",
+                [(label(e), m["rate_limited"]) for e, m in snapshot.items()])
+        counter("rate_limit_wait_seconds_total", "Time spent waiting for the client-side rate limiter",
+                [(label(e), m["rate_limit_wait"]) for e, m in snapshot.items()])
+        counter("cache_hits_total", "Responses served from the cache",
+                [(label(e), m["cache_hits"]) for e, m in snapshot.items()])
+        counter("cache_misses_total", "Cache lookups that missed",
+                [(label(e), m["cache_misses"]) for e, m in snapshot.items()])
+        counter("coalesced_total", "Calls served by an identical request already in flight",
+                [(label(e), m["coalesced"]) for e, m in snapshot.items()])
+        counter("prefetch_hits_total", "Calls served by the prefetcher with fresh data",
+                [(label(e), m["prefetch_hits"]) for e, m in snapshot.items()])
+        counter("stale_hits_total", "Calls served by the prefetcher with stale data while it refreshed them",
+                [(label(e), m["stale_hits"]) for e, m in snapshot.items()])
+        counter("prefetches_total", "Background refreshes sent by the prefetcher",
+                [(label(e), m["prefetches"]) for e, m in snapshot.items()])
+        counter("not_modified_total", "Conditional requests answered with 304 Not Modified",
+                [(label(e), m["not_modified"]) for e, m in snapshot.items()])
+        counter("unchanged_total", "Responses with an unchanged meta.last_updated, not decoded again",
+                [(label(e), m["unchanged"]) for e, m in snapshot.items()])
+        counter("saved_bytes_total", "Response body bytes not downloaded thanks to 304s",
+                [(label(e), m["bytes_saved"]) for e, m in snapshot.items()])
+        counter("received_bytes_total", "Response body bytes received",
+                [(label(e), m["bytes_received"]) for e, m in snapshot.items()])
+
+        def histogram(name, help_text, get):
+            lines.append("# HELP {}_{} {}".format(prefix, name, help_text))
+            lines.append("# TYPE {}_{} histogram".format(prefix, name))
+            for endpoint, metrics in snapshot.items():
+                hist = get(metrics)
+                for bound, count in hist["buckets"].items():
+                    lines.append('{}_{}_bucket{{{},le="{}"}} {}'.format(prefix, name, label(endpoint), bound, count))
+                lines.append('{}_{}_bucket{{{},le="+Inf"}} {}'.format(prefix, name, label(endpoint), hist["count"]))
+                lines.append("{}_{}_sum{{{}}} {}".format(prefix, name, label(endpoint), hist["sum"]))
+                lines.append("{}_{}_count{{{}}} {}".format(prefix, name, label(endpoint), hist["count"]))
+
+        for timing in TIMINGS:
+            histogram("{}_seconds".format(timing), "Request {} time".format(timing),
+                      lambda metrics, timing=timing: metrics["timings"][timing])
+        histogram("response_size_bytes", "Response body size", lambda metrics: metrics["size"])
+
+        return "\n".join(lines) + "\n"
@@ -1,538 +1,912 @@
-import json
-import requests
-import pandas as pd
-
-from datetime import datetime, date
-
-# Local modules
-from . import constants
-
-class OpenBNMAPI:
-    
-    """
-    Initialise the OpenBNMAPy class.
-
-    params:
-    
-    default_rtype: str
-        Accepts either 'json' or 'dataframe'. Sets the default return type of data to either json or
-        pandas DataFrame object. Defaults to 'json'.
-
-    """
-    def __init__(self, default_rtype = 'json'):
-        self.base_url = constants.base_url
-        self.headers = constants.headers
-        self.default_rtype = default_rtype
-        
-        self.bank_codes = constants.SWIFT_codes
-        
-        self.interest_related_products = constants.interest_related_products
-        self.exchange_rate_snapshots = constants.exchange_rate_snapshots
-
-    """
-    Helper function to send requests. Handles error codes and exceptions too.
-    """ 
-    def _send_get_request(self, req_url, params={}): 
-        # Send request       
-        r = requests.get(req_url, headers=self.headers, params=params)
-        
-        # Handle Response
-        if r.status_code == 200 or r.status_code == 201:
-            return r
-        else:
-            return
-            # To-Do: Handle error codes and exceptions here
-            
-    """
-    Helper function to handle return types of data
-    """
-    def _return_response(self, response, rtype):
-        if rtype is None:
-            rtype = self.default_rtype
-        if rtype =='json':
-            return response.json()
-        if rtype == 'df':
-            # TO-DO: Handle to dataframes
-            return
-    
-    """
-    Helper function to process date, year, month as additional parameters. 
-    This is due to the fact that these arguments are to be processed as url path parameters
-
-    returns: a valid url path parameter. eg: /date/{date} or /year/{year}/month/{month}
-    rtype: string
-
-    """
-    def _parse_date_args(self, date, year, month):
-        # Check is both date and year,month is being filled up. Either one of them can be inputed
-        if (date) and (year and month):
-            raise ValueError("Either 'date' or 'year, month' is accepted as arguments")
-        
-        if date:
-            try:
-                parsed_date = datetime.strptime(date, '%Y-%m-%d')
-                print(parsed_date)
-
-                # Only accept date arguments after year 2000 
-                if (parsed_date.year > 2000) and (1 <= parsed_date.month <= 12):
-                    # Craft return url
-                    return_url = "/date/{}".format(date)
-                    return return_url
-                else:
-                    raise ValueError('Year out of range. Please ensure year is more recent than 2000')
-     
-            except ValueError:
-                raise ValueError("Incorrect date format, should be YYYY-MM-DD")
-        
-        # Check is year and month exists and is of type int
-        if (year and month) and (type(year) == int) and (type(month) == int):
-            if (year > 2000) and (1 <= month <= 12): # Needs a more elegant check
-                # Craft return url
-                return_url = "/year/{}/month/{}".format(year,month)
-                return return_url
-            else:
-                raise ValueError("Incorrect year and month format. \
-                                  Ensure year is more recent than 2000 and month is in range of [1...12]")
-        
-        # Default case. Return nothing
-        return
-
-    """
-    Get Base Rates / BLR
-
-    Optional Parameters:
-        
-        bank_codes : string
-            Must correspond to a valid 8 characters SWIFT code
-
-    Reference: https://api.bnm.gov.my/portal#operation/BRLatest
-    """
-    def base_rate(self, bank_codes=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/base-rate')
-        
-        # Append additional arguments to the url if present
-        if bank_codes:
-            # Validate if its a valid swift code
-            if bank_codes in self.bank_codes:
-                req_url = "{}/{}".format(req_url, bank_codes)
-            else:
-                # To-DO: Handle the exception for invalid params value
-                raise ValueError("Wrong Swift Code")
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-    
-    """
-    Get Daily FX Turnover
-
-    Optional Parameters:
-        
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#tag/Daily-FX-Turnover
-    """
-    def daily_fx_turnover(self, date=None, year=None, month=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/fx-turn-over')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Date (/date/{date})
-        - By Month and Year (/year/{year}/month/{month})
-        """
-        args = self._parse_date_args(date, year, month)
-        if args:
-            req_url = req_url + args
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-
-    """
-    Get Exchange Rates
-
-    Optional Parameters:
-        
-        quote: dict{session : string, quote: string}
-            session: string, 4 characters
-                A snapshot of the exchange rate daily at 0900, 1130, 1200 and 1700 intervals
-                Defaults to '1130'
-                Valid values: ['0900', '1130', '1200', '1700']
-            quote: string, 2 characters
-                Base currency (Ringgit or foreign currency) as the denominator for the exchange rate
-                Defaults to 'rm'
-                Valid values: ['rm','fx']
-
-        currency_code: string
-            3-characters currency code based on ISO4217 standard
-
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#operation/ERLatest
-    """
-    def exchange_rate(self, quote={"session":"1130", "quote":"rm"}, currency_code=None, date=None, 
-                      year=None, month=None,rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/exchange-rate')
-        
-        # Validation args
-        if not quote['session'] in self.exchange_rate_snapshots:
-            raise ValueError("Invalid exchange rate snapshots. Valid snapshots are: '0900', '1130', '1200', '1700'")
-        if not quote['quote'] in ["rm", "fx"]:
-            raise ValueError("Invalid quote. Valid quotes are: 'rm' and 'fx'")
-
-        # Append additional arguments to the url if present
-        """
-        - Latest
-        - Latest by Currency
-        - By Currency and Date
-        - By Currency and Month and Year
-        """
-        if currency_code:
-            currency_code_error =   ("Invalid Currency Code.\n"
-                                    "Please ensure your currency is in ISO 4217 standard format.\n"
-                                    "Read more here: https://www.iso.org/iso-4217-currency-codes.html")
-            
-            if not (len(currency_code) == 3) or \
-                currency_code not in constants.currency_codes:
-                raise ValueError(currency_code_error)
-
-            
-            # Append Currency args first
-            currency_args = "/{}".format(currency_code)
-            req_url = req_url + currency_args
-
-            # Then append date-related args, if present
-            args = self._parse_date_args(date, year, month)
-            if args:
-                req_url = req_url + args
-        
-        res = self._send_get_request(req_url, quote)
-        
-        return self._return_response(res, rtype)
-    
-    """
-    Get Financial Consumer Alert
-
-    Optional Parameters:
-        
-        search_query : string
-            Must be < 50 characters
-
-    Reference: https://api.bnm.gov.my/portal#tag/Financial-Consumer-Alert
-    """
-    def consumer_alert(self, search_query="", rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/consumer-alert')
-        
-        # Append additional arguments to the url path if present
-        if (len(search_query) > 0) & (len(search_query) < 50):
-            req_url = "{}/{}".format(req_url, search_query)
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-    
-    """
-    Get InterBank Swaps
-
-    Optional Parameters:
-        
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#tag/Daily-FX-Turnover
-    """
-    def interbank_swap(self, date=None, year=None, month=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/interbank-swap')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Date (/date/{date})
-        - By Month and Year (/year/{year}/month/{month})
-        """
-        args = self._parse_date_args(date, year, month)
-        if args:
-            req_url = req_url + args
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-    
-    """
-    Get Interest Rates
-
-    Optional Parameters:
-        product : string
-            Provide selection of interbank rates or volumes from three choices; money market operations, 
-            interbank or overall
-            Defaults to 'money_market_operations'
-            Valid values : 'money_market_operations', 'interbank', 'overall'
-
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#tag/Interest-Rate
-    """
-    def interest_rate(self, product="money_market_operations", date=None, year=None, month=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/interest-rate')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Date (/date/{date})
-        - By Month and Year (/year/{year}/month/{month})
-        """
-        args = self._parse_date_args(date, year, month)
-        if args:
-            req_url = req_url + args
-        
-        # Handle the args params
-        if not product in self.interest_related_products:
-            raise ValueError("Invalid product type")
-
-        res = self._send_get_request(req_url, {"product":product})
-        
-        return self._return_response(res, rtype)
-
-    """
-    Get Interest Volume
-
-    Optional Parameters:
-        product : string
-            Provide selection of interbank rates or volumes from three choices; money market operations, 
-            interbank or overall
-            Defaults to 'money_market_operations'
-            Valid values : 'money_market_operations', 'interbank', 'overall'
-
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#tag/Interest-Volume
-    """
-    def interest_volume(self, product="money_market_operations", date=None, year=None, month=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/interest-volume')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Date (/date/{date})
-        - By Month and Year (/year/{year}/month/{month})
-        """
-        args = self._parse_date_args(date, year, month)
-        if args:
-            req_url = req_url + args
-        
-        # Handle the args params
-        if not product in self.interest_related_products:
-            raise ValueError("Invalid product type")
-
-        res = self._send_get_request(req_url, {"product":product})
-        
-        return self._return_response(res, rtype)
-
-    """
-    Get Islamic Interbank Rate
-
-    Optional Parameters:
-        
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#tag/Islamic-Interbank-Rate
-    """
-    def islamic_interback_rate(self, date=None, year=None, month=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/islamic-interbank-rate')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Date (/date/{date})
-        - By Month and Year (/year/{year}/month/{month})
-        """
-        args = self._parse_date_args(date, year, month)
-        if args:
-            req_url = req_url + args
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-
-    """
-    Get Kijang Emas
-
-    Optional Parameters:
-        
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#tag/Kijang-Emas
-    """
-    def kijang_emas(self, date=None, year=None, month=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/kijang-emas')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Date (/date/{date})
-        - By Month and Year (/year/{year}/month/{month})
-        """
-        args = self._parse_date_args(date, year, month)
-        if args:
-            req_url = req_url + args
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-
-    """
-    Get Overnight Policy Rate (OPR)
-
-    Optional Parameters:
-        
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-
-    Reference: https://api.bnm.gov.my/portal#tag/Overnight-Policy-Rate-(OPR)
-    """
-    def overnight_policy_rate(self, year=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/opr')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Year (/year/{year})
-        """
-        if year:
-            if year > 2000:
-                args = "/year/{}".format(year)
-                req_url = req_url + args
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-    
-    """
-    Get Renminbi Deposit Acceptance Rate
-
-    Reference: https://api.bnm.gov.my/portal#tag/Renminbi
-    """
-    def renminbi_deposit_acceptance_rate(self, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/renminbi-deposit-acceptance-rate')
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-    
-    """
-    Get Renminbi Deposit Acceptance Rate
-
-    Reference: https://api.bnm.gov.my/portal#tag/Renminbi
-    """
-    def renminbi_fx_forward_price(self, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/renminbi-fx-forward-price')
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-    
-    """
-    Get USD Interbank Intraday Rate
-
-    Optional Parameters:
-        
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#tag/USDMYR-Interbank-Intraday-Rate
-    """
-    def usd_interbank_intraday_rate(self, date=None, year=None, month=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/usd-interbank-intraday-rate')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Date (/date/{date})
-        - By Month and Year (/year/{year}/month/{month})
-        """
-        args = self._parse_date_args(date, year, month)
-        if args:
-            req_url = req_url + args
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-
-    """
-    Get KL USD Reference Rate
-
-    Optional Parameters:
-        
-        date : string<date>
-            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
-        year: int
-            Year in format 'YYYYY'. Must be after year 2000
-        month: int
-            Month in numeric format. [1...12]
-
-    Reference: https://api.bnm.gov.my/portal#tag/Kuala-Lumpur-USDMYR-Reference-Rate
-    """
-    def kl_usd_reference_rate(self, date=None, year=None, month=None, rtype = 'json'):
-        # Form the request url
-        req_url = "{}{}".format(self.base_url, '/kl-usd-reference-rate')
-        
-        # Append additional arguments to the url if present
-        """
-        - By Date (/date/{date})
-        - By Month and Year (/year/{year}/month/{month})
-        """
-        args = self._parse_date_args(date, year, month)
-        if args:
-            req_url = req_url + args
-        
-        res = self._send_get_request(req_url)
-        
-        return self._return_response(res, rtype)
-    
-    
-
-    
+import contextvars
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from urllib.parse import urlparse
+
+# Local modules
+from . import constants
+from .alerts import AlertIndex
+from .arrow import batch_reader, records_to_table, to_table
+from .cache import CachedResponse, TTLPolicy, ValidatorStore, cache_key
+from .decoding import RecordStream, loads
+from .endpoints import BANK_CODES, CURRENCY_CODES, ENDPOINTS, build_request, date_segment
+from .exceptions import BNMNotFoundError, OpenBNMAPIError
+from .fanout import FAN_OUT_WORKERS, FanOutResult, is_fan_out, published_codes, resolve_codes
+from .frames import records_to_frame, to_frame
+from .ranges import DATE_ARGUMENTS, DATE_ENDPOINTS, merge_range_results, split_date_range, to_date
+from .metrics import Metrics
+from .prefetch import Prefetcher
+from .ratelimit import as_rate_limiter
+from .records import endpoint_of, expand_record
+from .recordset import RecordSet
+from .session import BNMSession
+from .singleflight import SingleFlight
+from .snapshot import SnapshotResult, snapshot_requests
+
+# Size of the chunks read from the network when streaming records
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Metrics info of the request sent by _send_get_request, handed over to _return_response
+_request_info = contextvars.ContextVar("openbnmapi_request_info", default=None)
+
+class OpenBNMAPI:
+    
+    """
+    Initialise the OpenBNMAPy class.
+
+    params:
+    
+    default_rtype: str
+        Accepts either 'json' or 'dataframe'. Sets the default return type of data to either json or
+        pandas DataFrame object. Defaults to 'json'.
+    pool_size: int
+        Number of keep-alive connections kept open to the API. Defaults to 10
+    timeout: float or tuple(float, float)
+        Connect and read timeouts in seconds. Defaults to (3.05, 30)
+    max_retries: int
+        Retries on timeouts, connection errors, 429 and 5xx responses. Defaults to 3
+    backoff_factor: float
+        Base delay in seconds of the exponential backoff between retries. Defaults to 0.5
+    session: BNMSession
+        Use an existing session instead of creating one. Allows several clients to share one pool
+    cache: MemoryCache or SQLiteCache
+        Cache responses in this backend. Defaults to no caching
+    cache_ttls: dict
+        Per endpoint ttl overrides, eg: {'/opr': 86400}. See cache.TTLPolicy
+    conditional: bool
+        Remember the last response of each url and send conditional requests (If-None-Match,
+        If-Modified-Since), reusing the stored body when it did not change. Responses are then read in full
+        and the last 64 bodies kept in memory, so rtype='records' no longer streams them. See
+        cache.ValidatorStore. Defaults to False
+    rate_limit: float or RateLimiter
+        Maximum requests per second, or a RateLimiter with per endpoint budgets, shared between processes and
+        slowing down on 429s (see ratelimit.py). Defaults to no limit
+    coalesce: bool
+        Send one request for identical calls made at the same time (same url and parameters), every caller
+        getting its response. See singleflight.SingleFlight. Defaults to True
+    prefetch: bool or Prefetcher
+        Keep the latest data requested so far fresh in the background, refreshing it right after BNM publishes
+        and serving the previous response while a refresh is in flight, so that calls do not wait for the
+        network. Responses are then read in full before rtype='records' iterates them. See prefetch.Prefetcher.
+        Defaults to False
+
+    """
+    def __init__(self, default_rtype = 'json', pool_size=10, timeout=(3.05, 30), max_retries=3,
+                 backoff_factor=0.5, session=None, cache=None, cache_ttls=None, conditional=False,
+                 coalesce=True, rate_limit=None, prefetch=False):
+        self.base_url = constants.base_url
+        self.headers = constants.headers
+        self.default_rtype = default_rtype
+        
+        self.bank_codes = constants.SWIFT_codes
+        
+        self.interest_related_products = constants.interest_related_products
+        self.exchange_rate_snapshots = constants.exchange_rate_snapshots
+
+        # One pooled session shared by every endpoint
+        if session is None:
+            session = BNMSession(headers=self.headers, pool_size=pool_size, timeout=timeout,
+                                 max_retries=max_retries, backoff_factor=backoff_factor,
+                                 rate_limiter=as_rate_limiter(rate_limit))
+        self.session = session
+
+        self.cache = cache
+        self.cache_policy = TTLPolicy(cache_ttls)
+        self.validators = ValidatorStore() if conditional else None
+        self.inflight = SingleFlight() if coalesce else None
+
+        if prefetch is True:
+            prefetch = Prefetcher()
+        elif prefetch is False:
+            prefetch = None
+        self.prefetcher = None if prefetch is None else prefetch.attach(self)
+
+        self.metrics = Metrics()
+
+        # consumer_alert_index() and when it was last checked
+        self._alert_index = None
+        self._alert_checked = None
+        self._alert_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    """
+    Stop the background refreshes and close the pooled connections
+    """
+    def close(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        self.session.close()
+
+    """
+    Snapshot of the per endpoint request metrics: counts, status codes, retries, cache hits, 304s and bytes
+    saved, sizes and connect/tls/ttfb/download/decode/total timing histograms. See metrics.Metrics, which also renders them for
+    Prometheus (client.metrics.prometheus()) and accepts tracing hooks (client.metrics.add_hook(...)).
+    """
+    def stats(self):
+        return self.metrics.snapshot()
+
+    """
+    Helper function to send requests. Handles error codes and exceptions too.
+
+    raises: BNMTimeoutError, BNMConnectionError or a BNMHTTPError subclass (see exceptions.py)
+    """ 
+    def _send_get_request(self, req_url, params={}): 
+        info = self.metrics.start(endpoint_of(req_url[len(self.base_url):]), req_url, params)
+        try:
+            # Serve the latest data kept fresh in the background, even if a refresh is in flight
+            r = None if self.prefetcher is None else self.prefetcher.serve(req_url, params, info)
+            if r is None:
+                r = self._get(req_url, params, info)
+        except Exception as e:
+            self.metrics.finish(info, e)
+            raise
+
+        # Picked up by _return_response, in the same thread or asyncio task
+        _request_info.set(info)
+        return r
+
+    """
+    Helper function to get a response from the cache, from an identical request in flight or from the API,
+    and have the prefetcher keep it fresh from then on.
+    """
+    def _get(self, req_url, params, info=None):
+        # Serve from the cache if we already have a fresh copy
+        key, cached = self._cache_lookup(req_url, params, info)
+        if cached is not None:
+            r = cached
+        elif self.inflight is None:
+            r = self._fetch(req_url, params, key, info)
+        else:
+            # Identical calls in flight at the same time share one request
+            r, shared = self.inflight.do(key, lambda: self._fetch(req_url, params, key, info),
+                                         lambda response: self._shareable(response, info))
+            if shared:
+                self._coalesced(r, info)
+        if self.prefetcher is not None:
+            r = self.prefetcher.track(key, req_url, r, params, info)
+        return r
+
+    """
+    Helper function to send a request through the pooled session, conditionally if we have a previous response.
+    Retries and error codes are handled by the session.
+    """
+    def _fetch(self, req_url, params, key, info=None):
+        stale = self._validated(key)
+        r = self.session.get(req_url, params=params, headers=self._conditional_headers(stale), info=info)
+        r = self._revalidate(key, stale, r, info)
+        return self._cache_store(req_url, key, r, info)
+
+    """
+    Helper functions for coalesced requests: read the body so that one response can serve several callers,
+    and record a caller that was served by another one's request.
+    """
+    def _shareable(self, response, info=None):
+        if isinstance(response, CachedResponse):
+            return response
+        self._read_body(response, info)
+        return CachedResponse.from_response(response)
+
+    def _coalesced(self, response, info=None):
+        if info is not None:
+            info["coalesced"] = True
+            info["status_code"] = response.status_code
+
+    """
+    Helper functions to read from and write to the cache, shared by the sync and async clients.
+    """
+    def _cache_lookup(self, req_url, params, info=None):
+        key = cache_key(req_url, params, self.headers.get("Accept"))
+        if self.cache is None:
+            return key, None
+        cached = self.cache.get(key)
+        if info is not None:
+            info["cache"] = "miss" if cached is None else "hit"
+        return key, cached
+
+    def _cache_store(self, req_url, key, response, info=None):
+        if self.cache is None:
+            return response
+        ttl = self.cache_policy.ttl(req_url[len(self.base_url):])
+        if ttl is None or ttl > 0:
+            if not isinstance(response, CachedResponse):
+                self._read_body(response, info)
+                response = CachedResponse.from_response(response)
+            self.cache.set(key, response, ttl)
+        return response
+
+    """
+    Helper functions for conditional requests, shared by the sync and async clients.
+
+    _revalidate returns the response to use: the stored one if the server answered 304 or the body carries
+    the same meta.last_updated, the new one (remembered for next time) otherwise.
+    """
+    def _validated(self, key):
+        if self.validators is None:
+            return None
+        return self.validators.get(key)
+
+    def _conditional_headers(self, stale):
+        if stale is None:
+            return None
+        return stale.conditional_headers() or None
+
+    def _revalidate(self, key, stale, response, info=None):
+        if self.validators is None:
+            return response
+
+        if response.status_code == 304:
+            response.close()
+            if stale is None:
+                raise ValueError("Received 304 Not Modified for {} without a conditional request".format(response.url))
+            self.validators.record("not_modified", len(stale.response.content))
+            if info is not None:
+                info["revalidated"] = "not_modified"
+                info["bytes_saved"] = len(stale.response.content)
+            return stale.response
+
+        self._read_body(response, info)
+        if not isinstance(response, CachedResponse):
+            response = CachedResponse.from_response(response)
+        if stale is not None and stale.unchanged(response):
+            # Same data: keep the stored response
+            self.validators.record("unchanged", len(response.content))
+            if info is not None:
+                info["revalidated"] = "unchanged"
+            return stale.response
+
+        self.validators.set(key, response)
+        return response
+            
+    """
+    Helper function to handle return types of data
+    """
+    def _return_response(self, response, rtype):
+        info = _request_info.get()
+        _request_info.set(None)
+
+        if rtype is None:
+            rtype = self.default_rtype
+        if rtype == 'records':
+            return self._iter_records(response, info)
+
+        try:
+            if rtype =='json':
+                data = self._decode_response(response, info)
+            elif rtype in ('df', 'dataframe'):
+                payload = self._decode_response(response, info)
+                start = time.perf_counter()
+                data = to_frame(self._endpoint_path(response.url), payload)
+                if info is not None:
+                    info["decode"] += time.perf_counter() - start
+            elif rtype == 'recordset':
+                data = self._decode_recordset(response, info)
+            elif rtype == 'arrow':
+                payload = self._decode_response(response, info)
+                start = time.perf_counter()
+                data = to_table(self._endpoint_path(response.url), payload)
+                if info is not None:
+                    info["decode"] += time.perf_counter() - start
+            else:
+                raise ValueError("Invalid rtype. Valid values are: 'json', 'df', 'records', 'recordset' and 'arrow'")
+        except Exception as e:
+            if info is not None:
+                self.metrics.finish(info, e)
+            raise
+
+        if info is not None:
+            self.metrics.finish(info)
+        return data
+
+    """
+    Helper function to read the body of a response, timing the download
+    """
+    def _read_body(self, response, info=None):
+        start = time.perf_counter()
+        content = response.content
+        # Bodies from the cache, or already read, were not downloaded by this call
+        if info is not None and not isinstance(response, CachedResponse):
+            info["download"] = time.perf_counter() - start
+            info["size"] = len(content)
+        return content
+
+    """
+    Helper function to decode a response body with the fastest JSON backend available (see decoding.py)
+    """
+    def _decode_response(self, response, info=None):
+        # The body of compact cached responses is not kept, they decode from their columns
+        content = None if isinstance(response, CachedResponse) else self._read_body(response, info)
+        start = time.perf_counter()
+        if isinstance(response, CachedResponse):
+            data = response.json()
+        else:
+            data = loads(content)
+        if info is not None:
+            info["decode"] = time.perf_counter() - start
+        return data
+
+    """
+    Helper function for rtype='recordset'. Compact cached responses already hold one
+    """
+    def _decode_recordset(self, response, info=None):
+        if isinstance(response, CachedResponse) and response.records is not None:
+            return response.records
+        payload = self._decode_response(response, info)
+        start = time.perf_counter()
+        records = RecordSet.from_payload(payload)
+        if info is not None:
+            info["decode"] += time.perf_counter() - start
+        return records
+
+    """
+    Helper function for rtype='records'. Yields the records of the "data" array one at a time while the body
+    is being downloaded, so the whole document is never held in memory.
+    """
+    def _iter_records(self, response, info=None):
+        stream = RecordStream()
+        size = 0
+        error = None
+        try:
+            if isinstance(response, CachedResponse) and response.records is not None:
+                # Compact cached response, nothing to download or parse
+                yield from response.records.records()
+                return
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                if stream.done:
+                    # Keep reading what is left (eg: meta) so that the connection can be reused
+                    continue
+                for record in stream.feed(chunk):
+                    yield from self._expand_streamed(record)
+            if not stream.done:
+                for record in stream.close():
+                    yield from self._expand_streamed(record)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            response.close()
+            if info is not None:
+                if not isinstance(response, CachedResponse):
+                    info["size"] = size
+                self.metrics.finish(info, error)
+
+    def _expand_streamed(self, record):
+        if isinstance(record, dict):
+            return expand_record(record)
+        return [record]
+
+    """
+    Helper function to get the path of a request url relative to the base url. eg: /kijang-emas/date/2020-01-02
+    """
+    def _endpoint_path(self, url):
+        path = urlparse(url).path
+        base_path = urlparse(self.base_url).path
+        if path.startswith(base_path):
+            path = path[len(base_path):]
+        return path
+    
+    """
+    Helper function to send the request of an endpoint and handle its return type. The arguments are validated
+    and the url is built from the endpoint registry (see endpoints.py).
+    """
+    def _call(self, name, rtype, argument=None, date=None, year=None, month=None, query=None):
+        path, params = build_request(name, argument, date, year, month, query)
+        res = self._send_get_request(self.base_url + path, params)
+        return self._return_response(res, rtype)
+
+    """
+    Helper functions for fetch_range: resolve the endpoint method and shape the merged result
+    """
+    def _range_endpoint(self, endpoint, kwargs=None):
+        name = endpoint if isinstance(endpoint, str) else getattr(endpoint, "__name__", None)
+        if name not in DATE_ENDPOINTS:
+            raise ValueError("fetch_range supports these endpoints only: {}".format(", ".join(DATE_ENDPOINTS)))
+        argument = DATE_ARGUMENTS.get(name)
+        if argument is not None and not (kwargs or {}).get(argument):
+            raise ValueError("{} needs '{}' for a date range".format(name, argument))
+        return name, getattr(self, name)
+
+    def _range_response(self, name, records, start, end, requests_sent, rtype):
+        if rtype is None:
+            rtype = self.default_rtype
+        if rtype in ('df', 'dataframe'):
+            return records_to_frame(DATE_ENDPOINTS[name], records)
+        if rtype == 'records':
+            return iter(records)
+        meta = {
+            "start": to_date(start).isoformat(),
+            "end": to_date(end).isoformat(),
+            "requests": requests_sent,
+        }
+        if rtype == 'recordset':
+            return RecordSet.from_records(records, {"meta": meta})
+        if rtype == 'arrow':
+            return records_to_table(DATE_ENDPOINTS[name], records, meta)
+        return {"data": records, "meta": meta}
+
+    """
+    Fetch every record of a date-aware endpoint between two dates (inclusive).
+
+    The span is split into the fewest /year/{year}/month/{month} requests plus /date/{date} requests for
+    short partial months at the edges. Requests run in parallel and the records are merged into one
+    date sorted list, without duplicates. Days or months without data are skipped.
+
+    Parameters:
+
+        endpoint : string or method
+            Name of a date-aware endpoint, eg: 'kijang_emas' or obnmapi.kijang_emas
+        start, end : string<date> or date
+            First and last day of the range (YYYY-MM-DD)
+        max_workers : int
+            Number of requests sent in parallel. Defaults to 8
+        max_edge_days : int
+            Partial months of up to this many days are fetched day by day. Defaults to 3
+        **kwargs
+            Other arguments of the endpoint, eg: currency_code='USD' for exchange_rate, which needs one
+
+    returns: {"data": [records], "meta": {"start": ..., "end": ..., "requests": ...}}, or those records as a
+        DataFrame (rtype='df'), an iterator (rtype='records'), a RecordSet (rtype='recordset') or a
+        pyarrow.Table (rtype='arrow', the meta in its schema metadata)
+
+    Example:
+        obnmapi.fetch_range("kl_usd_reference_rate", "2019-01-15", "2020-12-31")
+    """
+    def fetch_range(self, endpoint, start, end, max_workers=8, max_edge_days=3, rtype = 'json', **kwargs):
+        name, method = self._range_endpoint(endpoint, kwargs)
+        requests_args = split_date_range(start, end, max_edge_days)
+
+        def fetch(args):
+            try:
+                return method(rtype='json', **kwargs, **args)
+            except BNMNotFoundError:
+                # No data published for that day or month
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            payloads = [payload for payload in pool.map(fetch, requests_args) if payload is not None]
+
+        records = merge_range_results(payloads, start, end)
+        return self._range_response(name, records, start, end, len(requests_args), rtype)
+
+    """
+    Get the records of a date-aware endpoint between two dates (inclusive) as Arrow record batches, one or more
+    per request, in date order. Same requests as fetch_range, sent in parallel, but lazily: requests are sent
+    as the stream is read, at most max_workers ahead of it, and the records of each request are converted to
+    Arrow and released with its batches. The range is never held in memory as a whole. Needs pyarrow.
+
+    The schema of the stream is known from the first request (see arrow.batch_reader): a column first seen in a
+    later request is left out, use fetch_range(..., rtype='arrow') to keep every column. Write it to an Arrow
+    IPC / Feather file with arrow.write_ipc, or hand it to Polars (pl.from_arrow) or DuckDB as is.
+
+    Parameters: same as fetch_range
+
+    returns: pyarrow.RecordBatchReader
+
+    Example:
+        reader = obnmapi.fetch_range_batches("kl_usd_reference_rate", "2015-01-01", "2020-12-31")
+        arrow.write_ipc(reader, "kl_usd_reference_rate.arrow")
+    """
+    def fetch_range_batches(self, endpoint, start, end, max_workers=8, max_edge_days=3, **kwargs):
+        name, method = self._range_endpoint(endpoint, kwargs)
+        requests_args = split_date_range(start, end, max_edge_days)
+        path = DATE_ENDPOINTS[name]
+
+        def fetch(args):
+            try:
+                return method(rtype='json', **kwargs, **args)
+            except BNMNotFoundError:
+                # No data published for that day or month
+                return None
+
+        def tables():
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                queue = iter(requests_args)
+                pending = deque(pool.submit(fetch, args) for args in islice(queue, max_workers))
+                while pending:
+                    # In the order of the requests, the next one sent as soon as one is read
+                    payload = pending.popleft().result()
+                    for args in islice(queue, 1):
+                        pending.append(pool.submit(fetch, args))
+                    if payload is not None:
+                        yield records_to_table(path, merge_range_results([payload], start, end))
+
+        return batch_reader(path, tables())
+
+    """
+    Fetch the latest data of every endpoint at once, eg: to refresh a dashboard.
+
+    The requests are all sent at once, the connection pool growing to hold them, so the call takes about as
+    long as the slowest request, and at most `deadline` seconds. Failures and requests still in flight at the
+    deadline are reported per endpoint instead of raised.
+
+    Parameters:
+
+        endpoints : list(string)
+            Endpoint names or request keys (eg: 'interest_rate.interbank'). Defaults to every endpoint but
+            consumer_alert, interest rates and volumes once per product. See snapshot.snapshot_requests
+        deadline : float
+            Seconds to wait for the responses. Defaults to 10
+        max_workers : int
+            Number of requests sent in parallel. Defaults to all of them
+
+    returns: {"data": {key: data}, "errors": {key: exception}, "meta": {"requested": ..., "returned": ...,
+        "timed_out": [keys], "elapsed": ...}}, data being of type `rtype`
+
+    Example:
+        snapshot = obnmapi.snapshot(deadline=5)
+        snapshot["data"]["interest_rate.interbank"]
+    """
+    def snapshot(self, endpoints=None, deadline=10, max_workers=None, rtype = 'json'):
+        requests_args = snapshot_requests(endpoints)
+        result = SnapshotResult(requests_args)
+
+        def fetch(request):
+            key, name, kwargs = request
+            try:
+                result.add(key, getattr(self, name)(rtype=rtype, **kwargs))
+            except Exception as e:
+                result.fail(key, e)
+
+        workers = max(min(max_workers or len(requests_args), len(requests_args)), 1)
+        # Enough pooled connections for every request, or the extra ones would be discarded after one use
+        if hasattr(self.session, "grow_pool"):
+            self.session.grow_pool(workers)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            wait([pool.submit(fetch, request) for request in requests_args], timeout=deadline)
+        finally:
+            # Requests past the deadline finish in the background, their results are dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+        return result.response(deadline)
+
+    """
+    Helper function for the list / "all" forms of exchange_rate and base_rate (see fanout.py).
+
+    "all" (codes is None) stands for the codes of the unfiltered response of `fetch_latest()`, which raises if
+    it fails. Unless `dated`, codes found in that response are served from it, the others are fetched with
+    `fetch_one(code)` in parallel. Failures of those are reported per code instead of raised.
+    """
+    def _fan_out(self, endpoint, key, codes, fetch_one, fetch_latest, rtype=None, dated=False):
+        latest = None
+        if codes is None:
+            latest = fetch_latest()
+            codes = published_codes(latest, key)
+        elif not dated and len(codes) > 1:
+            try:
+                latest = fetch_latest()
+            except OpenBNMAPIError:
+                # Fall back to one request per code
+                latest = False
+
+        result = FanOutResult(endpoint, codes)
+        if latest is not None:
+            result.requests += 1
+        if latest and not dated:
+            result.add_latest(latest, key)
+
+        def fetch(code):
+            try:
+                result.add(code, fetch_one(code))
+            except OpenBNMAPIError as e:
+                result.errors[code] = e
+
+        missing = result.missing()
+        result.requests += len(missing)
+        with ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS) as pool:
+            list(pool.map(fetch, missing))
+
+        return result.response(rtype or self.default_rtype)
+
+    """
+    Get Base Rates / BLR
+
+    Optional Parameters:
+        
+        bank_codes : string or list(string)
+            Must correspond to a valid 8 characters SWIFT code. A list of codes or 'all' (the banks of the
+            unfiltered response) returns {'data': {code: base rate}, 'errors': {code: exception}, 'meta': {...}}
+            (or a DataFrame indexed by bank code), served from the unfiltered response when it holds every bank
+
+    Reference: https://api.bnm.gov.my/portal#operation/BRLatest
+    """
+    def base_rate(self, bank_codes=None, rtype = 'json'):
+        # Several banks at once
+        if is_fan_out(bank_codes):
+            codes = resolve_codes(bank_codes, BANK_CODES)
+            return self._fan_out('/base-rate', 'bank_code', codes,
+                                 lambda code: self.base_rate(code, rtype='json'),
+                                 lambda: self.base_rate(rtype='json'), rtype)
+
+        return self._call('base_rate', rtype, bank_codes)
+    
+    """
+    Get Daily FX Turnover
+
+    Optional Parameters:
+        
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#tag/Daily-FX-Turnover
+    """
+    def daily_fx_turnover(self, date=None, year=None, month=None, rtype = 'json'):
+        return self._call('daily_fx_turnover', rtype, date=date, year=year, month=month)
+
+    """
+    Get Exchange Rates
+
+    Optional Parameters:
+        
+        quote: dict{session : string, quote: string}
+            session: string, 4 characters
+                A snapshot of the exchange rate daily at 0900, 1130, 1200 and 1700 intervals
+                Defaults to '1130'
+                Valid values: ['0900', '1130', '1200', '1700']
+            quote: string, 2 characters
+                Base currency (Ringgit or foreign currency) as the denominator for the exchange rate
+                Defaults to 'rm'
+                Valid values: ['rm','fx']
+
+        currency_code: string or list(string)
+            3-characters currency code based on ISO4217 standard. A list of codes or 'all' (the currencies
+            of the unfiltered response) returns {'data': {code: rates}, 'errors': {code: exception},
+            'meta': {...}} (or a DataFrame indexed by date and currency code). Latest rates are served from the
+            unfiltered response when it holds every currency
+
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#operation/ERLatest
+    """
+    def exchange_rate(self, quote={"session":"1130", "quote":"rm"}, currency_code=None, date=None, 
+                      year=None, month=None,rtype = 'json'):
+        # Several currencies at once
+        if is_fan_out(currency_code):
+            # Validate every argument once, before sending anything
+            ENDPOINTS['exchange_rate'].params_for(quote)
+            codes = resolve_codes(currency_code, CURRENCY_CODES)
+            dated = date_segment(date, year, month)
+            return self._fan_out('/exchange-rate', 'currency_code', codes,
+                                 lambda code: self.exchange_rate(quote, code, date, year, month, rtype='json'),
+                                 lambda: self.exchange_rate(quote, rtype='json'), rtype, dated is not None)
+
+        # Latest, latest by currency, by currency and date, by currency and month and year
+        return self._call('exchange_rate', rtype, currency_code, date, year, month, quote)
+    
+    """
+    Get Financial Consumer Alert
+
+    Optional Parameters:
+        
+        search_query : string
+            Must be < 50 characters, longer queries list every alert. See consumer_alert_index to search
+            and screen names locally
+
+    Reference: https://api.bnm.gov.my/portal#tag/Financial-Consumer-Alert
+    """
+    def consumer_alert(self, search_query="", rtype = 'json'):
+        return self._call('consumer_alert', rtype, search_query)
+
+    """
+    Get the Financial Consumer Alert list as a local index, to search and screen names without a request each.
+
+    The full list is downloaded on the first call and checked again once `max_age` has passed; the index is
+    only rebuilt when the list changed (its meta.last_updated). With prefetch=True the list is refreshed
+    in the background and the check does not wait for the network.
+
+    Optional Parameters:
+
+        max_age : float
+            Seconds before the list is checked again. Defaults to the cache ttl of /consumer-alert (1 hour)
+
+    returns: alerts.AlertIndex, with search(query), match(name) and screen(names)
+
+    Example:
+        index = obnmapi.consumer_alert_index()
+        index.search("emas dinar")                   # every alert whose name has both words
+        index.screen(["Acme Trading Sdn Bhd", ...])  # {name: [(score, record), ...]} fuzzy matches
+
+    Reference: https://api.bnm.gov.my/portal#tag/Financial-Consumer-Alert
+    """
+    def consumer_alert_index(self, max_age=None):
+        with self._alert_lock:
+            now = time.time()
+            if self._alert_index_fresh(now, max_age):
+                return self._alert_index
+            return self._update_alert_index(now, self.consumer_alert(rtype='json'))
+
+    """
+    Helper functions for consumer_alert_index, shared by the sync and async clients: whether the index was
+    checked less than `max_age` ago, and rebuild it from a new list if it changed.
+    """
+    def _alert_index_fresh(self, now, max_age=None):
+        if max_age is None:
+            max_age = self.cache_policy.ttl(ENDPOINTS['consumer_alert'].path)
+        return self._alert_index is not None and (max_age is None or now - self._alert_checked < max_age)
+
+    def _update_alert_index(self, checked, payload):
+        self._alert_checked = checked
+        updated = (payload.get("meta") or {}).get("last_updated") if isinstance(payload, dict) else None
+        current = self._alert_index
+        if current is None or not updated or current.meta.get("last_updated") != updated:
+            self._alert_index = AlertIndex.from_payload(payload)
+        return self._alert_index
+    
+    """
+    Get InterBank Swaps
+
+    Optional Parameters:
+        
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#tag/Daily-FX-Turnover
+    """
+    def interbank_swap(self, date=None, year=None, month=None, rtype = 'json'):
+        return self._call('interbank_swap', rtype, date=date, year=year, month=month)
+    
+    """
+    Get Interest Rates
+
+    Optional Parameters:
+        product : string
+            Provide selection of interbank rates or volumes from three choices; money market operations, 
+            interbank or overall
+            Defaults to 'money_market_operations'
+            Valid values : 'money_market_operations', 'interbank', 'overall'
+
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#tag/Interest-Rate
+    """
+    def interest_rate(self, product="money_market_operations", date=None, year=None, month=None, rtype = 'json'):
+        return self._call('interest_rate', rtype, date=date, year=year, month=month, query={"product":product})
+
+    """
+    Get Interest Volume
+
+    Optional Parameters:
+        product : string
+            Provide selection of interbank rates or volumes from three choices; money market operations, 
+            interbank or overall
+            Defaults to 'money_market_operations'
+            Valid values : 'money_market_operations', 'interbank', 'overall'
+
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#tag/Interest-Volume
+    """
+    def interest_volume(self, product="money_market_operations", date=None, year=None, month=None, rtype = 'json'):
+        return self._call('interest_volume', rtype, date=date, year=year, month=month, query={"product":product})
+
+    """
+    Get Islamic Interbank Rate
+
+    Optional Parameters:
+        
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#tag/Islamic-Interbank-Rate
+    """
+    def islamic_interback_rate(self, date=None, year=None, month=None, rtype = 'json'):
+        return self._call('islamic_interback_rate', rtype, date=date, year=year, month=month)
+
+    """
+    Get Kijang Emas
+
+    Optional Parameters:
+        
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#tag/Kijang-Emas
+    """
+    def kijang_emas(self, date=None, year=None, month=None, rtype = 'json'):
+        return self._call('kijang_emas', rtype, date=date, year=year, month=month)
+
+    """
+    Get Overnight Policy Rate (OPR)
+
+    Optional Parameters:
+        
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+
+    Reference: https://api.bnm.gov.my/portal#tag/Overnight-Policy-Rate-(OPR)
+    """
+    def overnight_policy_rate(self, year=None, rtype = 'json'):
+        return self._call('overnight_policy_rate', rtype, year=year)
+    
+    """
+    Get Renminbi Deposit Acceptance Rate
+
+    Reference: https://api.bnm.gov.my/portal#tag/Renminbi
+    """
+    def renminbi_deposit_acceptance_rate(self, rtype = 'json'):
+        return self._call('renminbi_deposit_acceptance_rate', rtype)
+    
+    """
+    Get Renminbi Deposit Acceptance Rate
+
+    Reference: https://api.bnm.gov.my/portal#tag/Renminbi
+    """
+    def renminbi_fx_forward_price(self, rtype = 'json'):
+        return self._call('renminbi_fx_forward_price', rtype)
+    
+    """
+    Get USD Interbank Intraday Rate
+
+    Optional Parameters:
+        
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#tag/USDMYR-Interbank-Intraday-Rate
+    """
+    def usd_interbank_intraday_rate(self, date=None, year=None, month=None, rtype = 'json'):
+        return self._call('usd_interbank_intraday_rate', rtype, date=date, year=year, month=month)
+
+    """
+    Get KL USD Reference Rate
+
+    Optional Parameters:
+        
+        date : string<date>
+            Date with format as defined by RFC 3339, section 5.6 (YYYY-MM-DD)
+        year: int
+            Year in format 'YYYYY'. Must be after year 2000
+        month: int
+            Month in numeric format. [1...12]
+
+    Reference: https://api.bnm.gov.my/portal#tag/Kuala-Lumpur-USDMYR-Reference-Rate
+    """
+    def kl_usd_reference_rate(self, date=None, year=None, month=None, rtype = 'json'):
+        return self._call('kl_usd_reference_rate', rtype, date=date, year=year, month=month)
+    
+    
+
+    
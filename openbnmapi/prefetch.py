@@ -0,0 +1,315 @@
+import heapq
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# Local modules
+from . import constants
+from .cache import DAY, MYT, cache_key
+from .records import endpoint_of
+
+logger = logging.getLogger(__name__)
+
+# When BNM publishes the "latest" data of an endpoint, as HHMM in Malaysian time on business days. Endpoints
+# missing from here are refreshed when their cache ttl runs out (see cache.TTLPolicy)
+PUBLICATION_TIMES = {
+    "/exchange-rate": constants.exchange_rate_snapshots,
+    "/kijang-emas": ["0900"],
+    "/kl-usd-reference-rate": ["1530"],
+}
+
+
+def next_publication(times, after):
+    """
+    returns: the first publication time (HHMM in Malaysian time, Monday to Friday) strictly after `after`
+    rtype: datetime
+    """
+    local = after.astimezone(MYT)
+    times = sorted(times)
+    day = local.replace(second=0, microsecond=0)
+    # A week always holds the next business day
+    for _ in range(8):
+        if day.weekday() < 5:
+            for hhmm in times:
+                publication = day.replace(hour=int(hhmm[:2]), minute=int(hhmm[2:]))
+                if publication > local:
+                    return publication
+        day = day + timedelta(days=1)
+    raise ValueError("No publication times given")
+
+
+class _Entry:
+    # The last response of a tracked request, and when it has to be refreshed
+
+    def __init__(self, key, req_url, params, path):
+        self.key = key
+        self.req_url = req_url
+        self.params = dict(params or {})
+        self.path = path
+        self.response = None
+        self.fetched_at = None
+        # When the response goes stale, and when the next refresh is scheduled (later after failures)
+        self.due = None
+        self.next_refresh = None
+        self.refreshing = False
+        self.failures = 0
+        self.error = None
+        self.last_used = time.time()
+
+
+class Prefetcher:
+
+    """
+    Keep the "latest" data of an OpenBNMAPI client fresh in the background (stale-while-revalidate).
+
+    Every request of latest data (without a date) made through the client is tracked. A background thread
+    refreshes it right after BNM's next expected publication (`calendar`, eg: the 0900/1130/1200/1700 exchange
+    rate sessions), or when its cache ttl runs out for endpoints without a calendar. Calls are served from the
+    tracked response: when it is due but its refresh has not finished, the stale response is returned and
+    the refresh happens in the background, so calls never wait for the network once a request is tracked.
+    With conditional=True on the client, refreshes are conditional requests (see cache.ValidatorStore), cheap
+    when nothing was published.
+
+    params:
+
+    calendar: dict
+        Overrides the publication times of an endpoint. Maps the endpoint path (eg: '/kijang-emas') to a list of
+        HHMM times in Malaysian time, or None to follow the cache ttl. See PUBLICATION_TIMES
+    delay: float
+        Seconds after a publication time before refreshing, leaving BNM time to publish. Defaults to 60
+    max_stale: float
+        Stale responses older than this many seconds past their refresh time are not served, the call fetches
+        the data itself. Defaults to 1 day
+    retry_delay: float
+        Seconds before retrying a failed refresh, doubled on each consecutive failure. Defaults to 60
+    maxsize: int
+        Maximum number of requests tracked, least recently used are dropped first. Defaults to 64
+    workers: int
+        Refreshes sent in parallel. Defaults to 2
+    """
+    def __init__(self, calendar=None, delay=60, max_stale=DAY, retry_delay=60, maxsize=64, workers=2):
+        self.calendar = dict(PUBLICATION_TIMES)
+        if calendar:
+            self.calendar.update(calendar)
+        self.delay = delay
+        self.max_stale = max_stale
+        self.retry_delay = retry_delay
+        self.maxsize = maxsize
+        self.workers = workers
+        self.client = None
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.failures = 0
+        self._entries = {}
+        # (next_refresh, key) of the tracked requests, entries rescheduled since are skipped when popped
+        self._schedule = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._closed = False
+
+    def attach(self, client):
+        """
+        Serve the calls of `client`. A Prefetcher serves one client.
+        """
+        if self.client is not None and self.client is not client:
+            raise ValueError("This Prefetcher already serves another client")
+        self.client = client
+        return self
+
+    def due(self, path, fetched_at):
+        """
+        returns: when the response of `path` fetched at `fetched_at` has to be refreshed (epoch seconds), or
+            None if it never changes
+        rtype: float
+        """
+        times = self.calendar.get(endpoint_of(path))
+        if times:
+            fetched = datetime.fromtimestamp(fetched_at, timezone.utc)
+            return next_publication(times, fetched).timestamp() + self.delay
+        ttl = self.client.cache_policy.ttl(path, datetime.fromtimestamp(fetched_at, timezone.utc))
+        if ttl is None:
+            return None
+        return fetched_at + max(ttl, 0) + self.delay
+
+    def serve(self, req_url, params, info=None):
+        """
+        returns: the tracked response of a request, refreshing it in the background when it is due, or None
+            if the request is not tracked or its response is too old to serve
+        rtype: CachedResponse
+        """
+        key = cache_key(req_url, params, self.client.headers.get("Accept"))
+        now = time.time()
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is None or entry.response is None:
+                return None
+            entry.last_used = now
+            if now < entry.due:
+                self.fresh_hits += 1
+                outcome = "fresh"
+            elif now - entry.due <= self.max_stale:
+                self.stale_hits += 1
+                outcome = "stale"
+                if now >= entry.next_refresh:
+                    # Not waiting for a retry after a failed refresh
+                    self._submit(entry)
+            else:
+                return None
+            response = entry.response
+        if info is not None:
+            info["prefetch"] = outcome
+            info["status_code"] = response.status_code
+        return response
+
+    def track(self, key, req_url, response, params=None, info=None):
+        """
+        Start tracking the request of a response the client fetched itself.
+
+        returns: the response to use, read in full if it was streamed
+        rtype: CachedResponse or requests.Response
+        """
+        path = req_url[len(self.client.base_url):]
+        if response.status_code != 200 or self.client.cache_policy.ttl(path) is None:
+            # Errors and historical data are not tracked
+            return response
+        response = self.client._shareable(response, info)
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(key, req_url, params, path)
+                self._evict()
+            self._store(entry, response)
+            self._start()
+        return response
+
+    def refresh(self, wait=False):
+        """
+        Refresh every tracked request now, eg: after a known publication.
+
+        wait: bool
+            Return once the refreshes are done. Defaults to False
+        """
+        with self._condition:
+            futures = [self._submit(entry) for entry in self._entries.values()]
+        if wait:
+            for future in futures:
+                if future is not None:
+                    future.result()
+
+    def stats(self):
+        """
+        returns: counters of the calls served, refreshes and the tracked requests
+        rtype: dict
+        """
+        with self._condition:
+            return {
+                "tracked": len(self._entries),
+                "fresh_hits": self.fresh_hits,
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "next_refresh": min((e.next_refresh for e in self._entries.values()), default=None),
+            }
+
+    def close(self):
+        """
+        Stop the background thread. Refreshes in flight are finished first.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread, executor = self._thread, self._executor
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # The methods below are called with self._condition held
+
+    def _store(self, entry, response):
+        entry.response = response
+        entry.fetched_at = time.time()
+        entry.due = self.due(entry.path, entry.fetched_at)
+        entry.failures = 0
+        entry.error = None
+        if entry.due is None:
+            # Became historical, eg: the month is over
+            del self._entries[entry.key]
+            return
+        self._schedule_refresh(entry, entry.due)
+
+    def _schedule_refresh(self, entry, when):
+        entry.next_refresh = when
+        heapq.heappush(self._schedule, (when, entry.key))
+        self._condition.notify_all()
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            oldest = min(self._entries.values(), key=lambda e: e.last_used)
+            del self._entries[oldest.key]
+
+    def _start(self):
+        if self._thread is None and not self._closed:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="openbnmapi-prefetch")
+            self._thread = threading.Thread(target=self._run, name="openbnmapi-prefetch-scheduler", daemon=True)
+            self._thread.start()
+
+    def _submit(self, entry):
+        if entry.refreshing or self._closed or self._executor is None:
+            return None
+        entry.refreshing = True
+        return self._executor.submit(self._refresh, entry)
+
+    def _run(self):
+        # Wake up at the next refresh time, or when a new request is tracked
+        with self._condition:
+            while not self._closed:
+                now = time.time()
+                while self._schedule and self._schedule[0][0] <= now:
+                    when, key = heapq.heappop(self._schedule)
+                    entry = self._entries.get(key)
+                    if entry is not None and entry.next_refresh == when:
+                        self._submit(entry)
+                timeout = self._schedule[0][0] - now if self._schedule else None
+                self._condition.wait(timeout)
+
+    def _refresh(self, entry):
+        # Runs in the executor, without the lock
+        client = self.client
+        info = client.metrics.start(endpoint_of(entry.path), entry.req_url, entry.params)
+        info["prefetch"] = "refresh"
+        try:
+            def fetch():
+                return client._fetch(entry.req_url, entry.params, entry.key, info)
+
+            if client.inflight is None:
+                response = fetch()
+            else:
+                # A call fetching the same request at the same time shares this one
+                response, _ = client.inflight.do(entry.key, fetch, lambda r: client._shareable(r, info))
+            response = client._shareable(response, info)
+        except Exception as e:
+            client.metrics.finish(info, e)
+            logger.warning("openbnmapi prefetch of %s failed: %r", entry.req_url, e)
+            with self._condition:
+                entry.refreshing = False
+                entry.failures += 1
+                entry.error = e
+                self.failures += 1
+                if self._entries.get(entry.key) is entry:
+                    self._schedule_refresh(entry, time.time() + self.retry_delay * 2 ** min(entry.failures - 1, 6))
+            return
+        client.metrics.finish(info)
+        with self._condition:
+            entry.refreshing = False
+            self.refreshes += 1
+            if self._entries.get(entry.key) is entry:
+                self._store(entry, response)
@@ -0,0 +1,93 @@
+import calendar
+import json
+
+from datetime import date, datetime, timedelta
+
+# Local modules
+from .endpoints import ENDPOINTS
+from .records import extract_records, record_date
+
+# Endpoints accepting 'date' or 'year, month' arguments (see endpoints.date_segment), and their paths
+DATE_ENDPOINTS = {name: endpoint.path for name, endpoint in ENDPOINTS.items() if endpoint.dated}
+
+# Date-aware endpoints that only take dates together with their path argument: without it the date arguments
+# are ignored and every request would return the latest data
+DATE_ARGUMENTS = {"exchange_rate": "currency_code"}
+
+
+def to_date(value):
+    """
+    Accept a date, datetime or 'YYYY-MM-DD' string and return a date.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError("Incorrect date format, should be YYYY-MM-DD")
+
+
+def split_date_range(start, end, max_edge_days=3):
+    """
+    Split [start, end] into the date arguments of the fewest requests.
+
+    Whole months become one /year/{y}/month/{m} request. A partial month at either edge becomes one
+    /date/{date} request per day if it covers at most `max_edge_days` days, otherwise one month request
+    whose records are trimmed to the range afterwards.
+
+    returns: keyword arguments of each request, eg: [{'year': 2020, 'month': 1}, {'date': '2020-02-01'}]
+    rtype: list(dict)
+    """
+    start, end = to_date(start), to_date(end)
+    if start > end:
+        raise ValueError("'start' must not be after 'end'")
+
+    requests = []
+    month_start = start
+    while month_start <= end:
+        last_day = calendar.monthrange(month_start.year, month_start.month)[1]
+        month_end = month_start.replace(day=last_day)
+
+        span_start = month_start
+        span_end = min(month_end, end)
+        whole_month = span_start.day == 1 and span_end == month_end
+        days = (span_end - span_start).days + 1
+
+        if whole_month or days > max_edge_days:
+            requests.append({"year": span_start.year, "month": span_start.month})
+        else:
+            requests.extend({"date": (span_start + timedelta(days=i)).isoformat()} for i in range(days))
+
+        month_start = month_end + timedelta(days=1)
+
+    return requests
+
+
+def merge_range_results(payloads, start, end):
+    """
+    Merge the responses of the requests of a range into one date sorted list of records, dropping records
+    outside [start, end] and duplicates.
+
+    returns: merged records
+    rtype: list(dict)
+    """
+    start, end = to_date(start).isoformat(), to_date(end).isoformat()
+
+    seen = set()
+    merged = []
+    for payload in payloads:
+        for record in extract_records(payload):
+            day = record_date(record)
+            if day is not None and not (start <= day <= end):
+                continue
+
+            key = json.dumps(record, sort_keys=True)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(record)
+
+    merged.sort(key=lambda record: record_date(record) or "")
+    return merged
@@ -0,0 +1,299 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+
+class TokenBucket:
+
+    """
+    Client-side token bucket rate limiter. Safe to share between threads and asyncio tasks.
+
+    The bucket slows down on its own when BNM answers 429: `throttle` cuts the rate and holds requests for
+    Retry-After seconds, then every successful request (`succeed`) wins a little of the rate back. Requests
+    held by a 429 are released one by one at the reduced rate, not all at once.
+
+    params:
+
+    rate: float
+        Requests allowed per second on average
+    burst: int
+        Requests that can be sent back to back before the rate applies. Defaults to `rate` (min 1)
+    min_rate: float
+        Lowest rate `throttle` may cut down to. Defaults to a tenth of `rate`
+    decrease: float
+        Factor applied to the rate on a 429. Defaults to 0.5
+    recovery: float
+        Share of `rate` won back by every successful request. Defaults to 0.02
+    """
+    def __init__(self, rate, burst=None, min_rate=None, decrease=0.5, recovery=0.02):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.max_rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.min_rate = float(min_rate if min_rate is not None else self.max_rate / 10)
+        self.decrease = decrease
+        self.recovery = recovery
+        self._lock = threading.Lock()
+        self._state = None
+        # Rate seen by the last operation, saves a write on success when the bucket runs at full speed
+        self._rate_seen = self.max_rate
+
+    @property
+    def rate(self):
+        """
+        Current rate, lower than the configured one after a 429.
+        """
+        return self._transact(lambda state, now: (state, state[2]))
+
+    def _clock(self):
+        return time.monotonic()
+
+    def _initial_state(self, now):
+        # tokens, last refill, current rate, last time the rate was cut
+        return (self.burst, now, self.max_rate, 0.0)
+
+    def _transact(self, func):
+        # Apply func(state, now) -> (new state, result) atomically
+        with self._lock:
+            now = self._clock()
+            state = self._state or self._initial_state(now)
+            self._state, result = func(state, now)
+            self._rate_seen = self._state[2]
+            return result
+
+    def _refill(self, state, now):
+        tokens, updated, rate, throttled = state
+        return (min(self.burst, tokens + max(0.0, now - updated) * rate), now, rate, throttled)
+
+    def _reserve(self):
+        # Take a token now, possibly going into debt, and return how long the caller must wait for it
+        def reserve(state, now):
+            tokens, updated, rate, throttled = self._refill(state, now)
+            tokens -= 1
+            return (tokens, updated, rate, throttled), max(0.0, -tokens / rate)
+        return self._transact(reserve)
+
+    def acquire(self):
+        """
+        Block the calling thread until a request may be sent.
+
+        returns: seconds waited
+        rtype: float
+        """
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self):
+        """
+        Wait, without blocking the event loop, until a request may be sent.
+
+        returns: seconds waited
+        rtype: float
+        """
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def throttle(self, retry_after=None):
+        """
+        Slow down after a 429: cut the rate (once per Retry-After window, however many requests got the 429)
+        and hold the next requests for `retry_after` seconds.
+        """
+        def throttle(state, now):
+            tokens, updated, rate, throttled = self._refill(state, now)
+            if now - throttled >= max(1.0, retry_after or 0.0):
+                rate = max(self.min_rate, rate * self.decrease)
+                throttled = now
+            # A debt of retry_after seconds worth of tokens: the first request waits retry_after, the next
+            # ones follow at the new rate
+            tokens = min(tokens, -(retry_after or 0.0) * rate)
+            return (tokens, updated, rate, throttled), None
+        self._transact(throttle)
+
+    def succeed(self):
+        """
+        Win back some of the rate after a successful request.
+        """
+        if self._rate_seen >= self.max_rate:
+            return
+
+        def succeed(state, now):
+            tokens, updated, rate, throttled = self._refill(state, now)
+            rate = min(self.max_rate, rate + self.max_rate * self.recovery)
+            return (tokens, updated, rate, throttled), None
+        self._transact(succeed)
+
+
+class SQLiteTokenBucket(TokenBucket):
+
+    """
+    TokenBucket whose state lives in a SQLite file, so that several processes on one host (eg: Celery workers)
+    share one budget. The file must be on a local disk.
+
+    params:
+
+    path: string
+        Location of the SQLite file
+    name: string
+        Name of the bucket in the file. Buckets with the same path and name are the same bucket
+
+    Other params: see TokenBucket. Every process should use the same values.
+    """
+    def __init__(self, path, name, rate, burst=None, min_rate=None, decrease=0.5, recovery=0.02):
+        super().__init__(rate, burst, min_rate, decrease, recovery)
+        self.path = path
+        self.name = name
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY, tokens REAL, updated REAL, rate REAL, throttled REAL)"
+        )
+
+    def _clock(self):
+        # Shared by processes, so wall clock time
+        return time.time()
+
+    def _transact(self, func):
+        with self._lock:
+            # Take the write lock first, so that no other process reads the state until we are done
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = self._clock()
+                row = self._conn.execute(
+                    "SELECT tokens, updated, rate, throttled FROM buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                state, result = func(tuple(row) if row else self._initial_state(now), now)
+                self._conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)", (self.name,) + state)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._rate_seen = state[2]
+            return result
+
+    def close(self):
+        self._conn.close()
+
+
+class RateLimiter:
+
+    """
+    Rate limits of a client: an optional budget for all requests and optional budgets per endpoint. A request
+    waits for a token from each bucket that applies to it.
+
+        # 10 requests/s overall, 2/s for exchange rates, shared by every process using /tmp/bnm-rate.sqlite
+        limiter = RateLimiter(10, endpoints={"/exchange-rate": 2}, path="/tmp/bnm-rate.sqlite")
+        obnmapi = OpenBNMAPI(rate_limit=limiter)
+
+    params:
+
+    rate: float
+        Requests per second for the whole client. Defaults to no overall limit
+    burst: int
+        Burst of the overall budget, see TokenBucket
+    endpoints: dict
+        Maps an endpoint path (eg: '/exchange-rate') to its rate, or to a (rate, burst) tuple
+    path: string
+        SQLite file holding the buckets, to share them between processes. Defaults to buckets in memory
+    adaptive: bool
+        Slow down on 429 and Retry-After, see TokenBucket.throttle. Defaults to True
+    """
+    def __init__(self, rate=None, burst=None, endpoints=None, path=None, adaptive=True):
+        self.path = path
+        self.adaptive = adaptive
+        self.bucket = self._bucket("*", rate, burst) if rate else None
+        self.endpoints = {}
+        for endpoint, limit in (endpoints or {}).items():
+            limit_rate, limit_burst = limit if isinstance(limit, tuple) else (limit, None)
+            self.endpoints[endpoint] = self._bucket(endpoint, limit_rate, limit_burst)
+
+    def _bucket(self, name, rate, burst):
+        if self.path is None:
+            return TokenBucket(rate, burst)
+        return SQLiteTokenBucket(self.path, name, rate, burst)
+
+    def buckets(self, endpoint=None):
+        """
+        returns: the buckets a request of `endpoint` takes a token from
+        rtype: list(TokenBucket)
+        """
+        buckets = [self.bucket] if self.bucket is not None else []
+        if endpoint in self.endpoints:
+            buckets.append(self.endpoints[endpoint])
+        return buckets
+
+    def _reserve(self, endpoint):
+        return max([bucket._reserve() for bucket in self.buckets(endpoint)], default=0.0)
+
+    def acquire(self, endpoint=None):
+        """
+        Block the calling thread until a request of `endpoint` may be sent.
+
+        returns: seconds waited
+        rtype: float
+        """
+        delay = self._reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, endpoint=None):
+        """
+        Wait, without blocking the event loop, until a request of `endpoint` may be sent.
+
+        returns: seconds waited
+        rtype: float
+        """
+        delay = self._reserve(endpoint)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def throttle(self, endpoint=None, retry_after=None):
+        """
+        Report a 429 from `endpoint`. The endpoint's own bucket slows down if it has one, the overall one
+        otherwise.
+        """
+        if not self.adaptive:
+            return
+        bucket = self.endpoints.get(endpoint, self.bucket)
+        if bucket is not None:
+            bucket.throttle(retry_after)
+
+    def succeed(self, endpoint=None):
+        """
+        Report a successful request of `endpoint`.
+        """
+        if not self.adaptive:
+            return
+        for bucket in self.buckets(endpoint):
+            bucket.succeed()
+
+    def as_dict(self):
+        """
+        returns: the current rate of every bucket, '*' being the overall one
+        rtype: dict
+        """
+        buckets = dict(self.endpoints)
+        if self.bucket is not None:
+            buckets["*"] = self.bucket
+        return {name: bucket.rate for name, bucket in buckets.items()}
+
+    def close(self):
+        for bucket in self.buckets() + list(self.endpoints.values()):
+            if isinstance(bucket, SQLiteTokenBucket):
+                bucket.close()
+
+
+def as_rate_limiter(rate_limit):
+    """
+    returns: the RateLimiter for the `rate_limit` argument of the clients: None, requests per second or a RateLimiter
+    """
+    if rate_limit is None or isinstance(rate_limit, RateLimiter):
+        return rate_limit
+    return RateLimiter(rate_limit)
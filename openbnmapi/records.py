@@ -0,0 +1,63 @@
+# Helpers to turn the "data" part of BNM responses into flat lists of records
+
+# Names used by the different endpoints for the date of a record
+DATE_FIELDS = ("date", "effective_date")
+
+
+def endpoint_of(path):
+    """
+    returns: the endpoint part of a url path relative to the base url, eg: '/kijang-emas/date/2020-01-02' -> '/kijang-emas'
+    rtype: string
+    """
+    return "/" + path.lstrip("/").split("/", 1)[0].split("?", 1)[0]
+
+
+def record_date(record):
+    """
+    returns: the date of a record as 'YYYY-MM-DD', or None if it has none
+    rtype: string
+    """
+    for field in DATE_FIELDS:
+        value = record.get(field)
+        if value:
+            return value[:10]
+    return None
+
+
+def expand_record(record):
+    # Hoist a nested dated dict (eg: exchange rate {"rate": {"date": ...}}) and explode a nested list of
+    # dated dicts (eg: exchange rate by month {"rate": [{"date": ...}, ...]}) into the parent record
+    for key, value in record.items():
+        if isinstance(value, dict) and record_date(value) and not record_date(record):
+            flat = {k: v for k, v in record.items() if k != key}
+            flat.update(value)
+            return [flat]
+        if isinstance(value, list) and value and isinstance(value[0], dict) and record_date(value[0]):
+            parent = {k: v for k, v in record.items() if k != key}
+            rows = []
+            for item in value:
+                flat = dict(parent)
+                flat.update(item)
+                rows.append(flat)
+            return rows
+    return [record]
+
+
+def extract_records(payload):
+    """
+    Flatten the "data" of a response into a list of records, one per dated observation where possible.
+
+    returns: list of records
+    rtype: list(dict)
+    """
+    data = payload.get("data") if isinstance(payload, dict) else payload
+    if data is None:
+        return []
+    if isinstance(data, dict):
+        data = [data]
+
+    records = []
+    for record in data:
+        if isinstance(record, dict):
+            records.extend(expand_record(record))
+    return records
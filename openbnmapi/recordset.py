@@ -0,0 +1,453 @@
+# Compact, columnar form of endpoint results. A list of JSON records costs a dict per record and an object per
+# value; a RecordSet keeps one array per field instead: rates in array('d'), dates as day numbers, strings
+# (eg: currency codes) interned once per distinct value.
+
+import re
+import sys
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date as Date, timedelta
+
+# Local modules
+from .lazy import LazyModule
+from .records import DATE_FIELDS, extract_records
+from .ranges import to_date
+
+# Only needed by the numpy and pandas views
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# Column kinds
+FLOAT = "float"
+INT = "int"
+DATE = "date"
+CATEGORY = "category"
+OBJECT = "object"
+
+# Fields used as the second index level of to_frame
+CODE_FIELDS = ("currency_code", "bank_code")
+
+# Dates are stored as days since the epoch, the layout of numpy's datetime64[D]
+EPOCH = Date(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+DATE_VALUE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+NUMPY_TYPES = {FLOAT: "float64", INT: "int64", DATE: "datetime64[D]", CATEGORY: "int32"}
+
+# Field paths are shared by every RecordSet of the process, like the interned strings
+_PATHS = {}
+
+
+class _Missing:
+    # Marks a field absent from a record, as opposed to a null value
+
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def _is_date(value):
+    if not DATE_VALUE.match(value):
+        return False
+    try:
+        Date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+class Column:
+
+    """
+    Values of one field, in the most compact form that holds all of them exactly.
+
+    - FLOAT: array('d'), nulls as NaN
+    - INT: array('q')
+    - DATE: array('q') of days since 1970-01-01 ('YYYY-MM-DD' strings)
+    - CATEGORY: array('i') of positions in `labels`, the distinct strings, interned. -1 for nulls
+    - OBJECT: list, for anything else (mixed types, lists, absent fields)
+    """
+    __slots__ = ("kind", "data", "labels")
+
+    def __init__(self, kind, data, labels=None):
+        self.kind = kind
+        self.data = data
+        self.labels = labels
+
+    @classmethod
+    def from_values(cls, values):
+        types = set(map(type, values))
+        try:
+            # Integers among floats come back as floats, equal to them
+            if float in types and types <= {float, int, type(None)}:
+                return cls(FLOAT, array("d", [float("nan") if value is None else value for value in values]))
+            if types == {int}:
+                return cls(INT, array("q", values))
+        except OverflowError:
+            return cls(OBJECT, list(values))
+
+        if types == {str} and all(_is_date(value) for value in values):
+            return cls(DATE, array("q", [Date.fromisoformat(value).toordinal() - EPOCH_ORDINAL for value in values]))
+
+        if str in types and types <= {str, type(None)}:
+            positions = {}
+            labels = []
+            codes = array("i")
+            for value in values:
+                if value is None:
+                    codes.append(-1)
+                    continue
+                position = positions.get(value)
+                if position is None:
+                    position = positions[value] = len(labels)
+                    labels.append(sys.intern(value))
+                codes.append(position)
+            return cls(CATEGORY, codes, tuple(labels))
+
+        return cls(OBJECT, list(values))
+
+    def __len__(self):
+        return len(self.data)
+
+    def getter(self):
+        """
+        returns: a function of a row number returning its value as it was in the JSON document
+        """
+        data = self.data
+        if self.kind == FLOAT:
+            return lambda i: None if data[i] != data[i] else data[i]
+        if self.kind == DATE:
+            return lambda i: (EPOCH + timedelta(days=data[i])).isoformat()
+        if self.kind == CATEGORY:
+            labels = self.labels
+            return lambda i: None if data[i] < 0 else labels[data[i]]
+        return data.__getitem__
+
+    def slice(self, start, stop):
+        # Arrays are sliced through a memoryview, without copying
+        if isinstance(self.data, list):
+            return Column(self.kind, self.data[start:stop], self.labels)
+        return Column(self.kind, memoryview(self.data)[start:stop], self.labels)
+
+    def take(self, rows):
+        if isinstance(self.data, list):
+            return Column(self.kind, [self.data[i] for i in rows], self.labels)
+        return Column(self.kind, array(self.data.format if isinstance(self.data, memoryview) else self.data.typecode,
+                                       (self.data[i] for i in rows)), self.labels)
+
+    def to_numpy(self):
+        """
+        returns: a read-only view of the values for FLOAT, INT and DATE columns (no copy), the positions in
+            `labels` for CATEGORY columns, an object array otherwise
+        rtype: numpy.ndarray
+        """
+        if self.kind == OBJECT:
+            values = np.empty(len(self.data), dtype=object)
+            for i, value in enumerate(self.data):
+                values[i] = None if value is MISSING else value
+            return values
+        view = np.frombuffer(self.data, dtype=NUMPY_TYPES[self.kind])
+        view.flags.writeable = False
+        return view
+
+    def to_pandas(self):
+        if self.kind == CATEGORY:
+            return pd.Categorical.from_codes(self.to_numpy(), self.labels)
+        return self.to_numpy()
+
+    @property
+    def nbytes(self):
+        if isinstance(self.data, list):
+            return sys.getsizeof(self.data) + sum(sys.getsizeof(value) for value in self.data if value is not MISSING)
+        return len(self.data) * self.data.itemsize + sum(sys.getsizeof(label) for label in self.labels or ())
+
+
+def _flatten(record, prefix=()):
+    # (path, value) pairs of a record, nested dicts flattened into paths, eg: ('one_oz', 'buying')
+    for key, value in record.items():
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, prefix + (key,))
+        else:
+            yield prefix + (key,), value
+
+
+def _nested_key(record):
+    # Key of the nested list of records exploded into one row each (eg: the rates of an exchange rate by month)
+    for key, value in record.items():
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            return key
+    return None
+
+
+class RecordSet:
+
+    """
+    Columnar container of the records of an endpoint result.
+
+    Rates live in array('d'), dates as day numbers and repeated strings once, so a few years of daily
+    history take a fraction of the memory of the decoded JSON. Numeric and date columns are exposed to numpy
+    and pandas without copying, and when the records are in date order `between` slices them without
+    copying either.
+
+        rs = obnmapi.fetch_range("exchange_rate", "2015-01-01", "2020-12-31", currency_code="USD", rtype="recordset")
+        rs.to_numpy("middle_rate")                  # float64 view
+        rs.between("2020-01-01", "2020-03-31")      # view of Q1 2020
+        rs.to_frame()
+
+    A RecordSet built from a response (`from_payload`) gives the same document back with `to_payload`, which is
+    how MemoryCache stores responses.
+
+    params:
+
+    columns: dict
+        Maps each field path (tuple of keys, eg: ('one_oz', 'buying')) to its Column
+    meta: dict
+        The other keys of the document (eg: 'meta'), in order. 'data' is a placeholder giving its position
+    groups: tuple(array, tuple)
+        Rows of each record of the document and the key of its nested list exploded into those rows (None if
+        it had none), to rebuild the document. None for flat records
+    single: bool
+        'data' was one record rather than a list
+    sorted: bool
+        Whether the records are in date order. Checked when not given
+    """
+    def __init__(self, columns, meta=None, groups=None, single=False, sorted=None):
+        self.columns = columns
+        self.meta = meta if meta is not None else {}
+        self.groups = groups
+        self.single = single
+        self._length = len(next(iter(columns.values()))) if columns else 0
+        self.date_path = next((path for path, column in columns.items()
+                               if column.kind == DATE and path[-1] in DATE_FIELDS), None)
+        if sorted is None:
+            dates = self.columns[self.date_path].data if self.date_path else None
+            sorted = dates is not None and all(dates[i] <= dates[i + 1] for i in range(len(dates) - 1))
+        self.sorted = sorted
+
+    @classmethod
+    def from_records(cls, records, meta=None):
+        """
+        Build a RecordSet of flat records, eg: the merged records of fetch_range.
+        """
+        rows = [dict(_flatten(record)) for record in records]
+        return cls(cls._columns(rows), meta)
+
+    @classmethod
+    def from_payload(cls, payload):
+        """
+        Build a RecordSet of a decoded BNM response, eg: {'data': [...], 'meta': {...}}.
+
+        raises: ValueError if the document is not a BNM response of records
+        """
+        if not isinstance(payload, dict) or "data" not in payload:
+            raise ValueError("Not a BNM response: no 'data'")
+        data = payload["data"]
+        single = isinstance(data, dict)
+        if single:
+            data = [data]
+        if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+            raise ValueError("Not a BNM response of records")
+
+        rows = []
+        sizes = array("q")
+        nested = []
+        for record in data:
+            key = _nested_key(record)
+            if key is None:
+                rows.append(dict(_flatten(record)))
+                sizes.append(1)
+                nested.append(None)
+                continue
+            for item in record[key]:
+                # Fields in the order of the document, the nested ones under the key of the list
+                row = {}
+                for k, v in record.items():
+                    row.update(_flatten(item, (key,)) if k == key else _flatten({k: v}))
+                rows.append(row)
+            sizes.append(len(record[key]))
+            nested.append(key)
+
+        # 'data' is kept as a placeholder, to give the document back with its keys in order
+        meta = {k: (None if k == "data" else v) for k, v in payload.items()}
+        groups = None if not any(nested) else (sizes, tuple(nested))
+        return cls(cls._columns(rows), meta, groups, single)
+
+    @staticmethod
+    def _columns(rows):
+        paths = {}
+        for row in rows:
+            for path in row:
+                paths.setdefault(path, None)
+        return {_PATHS.setdefault(path, path): Column.from_values([row.get(path, MISSING) for row in rows])
+                for path in paths}
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return "<RecordSet {} records, {} fields>".format(len(self), len(self.columns))
+
+    @property
+    def fields(self):
+        """
+        Field paths, eg: [('date',), ('one_oz', 'buying'), ...]
+        """
+        return list(self.columns)
+
+    def column(self, field):
+        """
+        returns: the Column of a field, given as a path tuple or a name ('rate.date' for ('rate', 'date'))
+        rtype: Column
+        """
+        path = field if isinstance(field, tuple) else tuple(field.split("."))
+        if path in self.columns:
+            return self.columns[path]
+        # A top level name is enough when only one path ends with it, eg: 'middle_rate'
+        matches = [candidate for candidate in self.columns if candidate[-1] == field]
+        if len(matches) == 1:
+            return self.columns[matches[0]]
+        raise KeyError(field)
+
+    def to_numpy(self, field):
+        """
+        returns: the values of a field, see Column.to_numpy
+        rtype: numpy.ndarray
+        """
+        return self.column(field).to_numpy()
+
+    @property
+    def dates(self):
+        """
+        Dates of the records as a datetime64[D] view, or None if they have none.
+        """
+        return self.columns[self.date_path].to_numpy() if self.date_path else None
+
+    def between(self, start, end):
+        """
+        Records dated in [start, end] (inclusive). A view of this RecordSet if its records are in date order,
+        a copy otherwise.
+
+        rtype: RecordSet
+        """
+        if self.date_path is None:
+            raise ValueError("The records have no date")
+        low = to_date(start).toordinal() - EPOCH_ORDINAL
+        high = to_date(end).toordinal() - EPOCH_ORDINAL
+        dates = self.columns[self.date_path].data
+
+        if self.sorted:
+            first, last = bisect_left(dates, low), bisect_right(dates, high)
+            columns = {path: column.slice(first, last) for path, column in self.columns.items()}
+            return RecordSet(columns, self._flat_meta(), sorted=True)
+
+        rows = [i for i in range(len(dates)) if low <= dates[i] <= high]
+        columns = {path: column.take(rows) for path, column in self.columns.items()}
+        return RecordSet(columns, self._flat_meta())
+
+    def _flat_meta(self):
+        # Slices are flat lists of records, without the nesting of the document they came from
+        return {k: v for k, v in self.meta.items() if k != "data"}
+
+    def _row_builder(self, key=None, nested=False):
+        # Rebuild records, nested dicts included. With `key`, only the fields under it (nested=True, the key
+        # stripped from their paths) or only the others (nested=False)
+        getters = []
+        for path, column in self.columns.items():
+            if key is not None and (path[0] == key) != nested:
+                continue
+            getters.append((path[1:] if nested else path, column.getter()))
+
+        def row(i):
+            record = {}
+            for path, get in getters:
+                value = get(i)
+                if value is MISSING:
+                    continue
+                target = record
+                for name in path[:-1]:
+                    target = target.setdefault(name, {})
+                target[path[-1]] = value
+            return record
+        return row
+
+    def records(self):
+        """
+        returns: the flat records, the same as records.extract_records of the document
+        rtype: list(dict)
+        """
+        if "data" in self.meta:
+            # Built from a document, whose records may be nested
+            return extract_records(self.to_payload())
+        row = self._row_builder()
+        return [row(i) for i in range(len(self))]
+
+    def to_payload(self):
+        """
+        returns: the document, eg: {'data': [...], 'meta': {...}}. Numbers of fields mixing integers and
+            floats all come back as floats
+        rtype: dict
+        """
+        if self.groups is None:
+            row = self._row_builder()
+            data = [row(i) for i in range(len(self))]
+        else:
+            data = []
+            builders = {}
+            start = 0
+            for size, key in zip(*self.groups):
+                if key not in builders:
+                    builders[key] = (self._row_builder(key), self._row_builder(key, nested=True))
+                parent, item = builders[key]
+                record = parent(start)
+                if key is not None:
+                    record = self._nest(record, key, [item(i) for i in range(start, start + size)])
+                data.append(record)
+                start += size
+
+        if self.single and len(data) == 1:
+            data = data[0]
+        if "data" not in self.meta:
+            return dict({"data": data}, **self.meta)
+        return {k: (data if k == "data" else v) for k, v in self.meta.items()}
+
+    def _nest(self, parent, key, items):
+        # Put the nested list back at its place among the parent fields
+        record = {}
+        for path in self.columns:
+            name = path[0]
+            if name == key:
+                record.setdefault(key, items)
+            elif name in parent and name not in record:
+                record[name] = parent[name]
+        return record
+
+    def to_frame(self):
+        """
+        returns: the records as a DataFrame indexed by date (and by currency or bank code when they have one),
+            one column per field named after its path, eg: 'one_oz.buying'. Numeric columns are not copied
+        rtype: pandas.DataFrame
+        """
+        index_paths = [path for path in self.columns if path[-1] in CODE_FIELDS]
+        if self.date_path is not None:
+            index_paths.insert(0, self.date_path)
+        columns = {".".join(path): column.to_pandas() for path, column in self.columns.items()
+                   if path not in index_paths}
+        frame = pd.DataFrame(columns, index=pd.RangeIndex(len(self)), copy=False)
+        if index_paths:
+            levels = [self.columns[path].to_pandas() for path in index_paths]
+            names = [path[-1] for path in index_paths]
+            if len(levels) == 1:
+                frame.index = pd.Index(levels[0], name=names[0])
+            else:
+                frame.index = pd.MultiIndex.from_arrays(levels, names=names)
+        return frame
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory held by the values, in bytes.
+        """
+        return sum(column.nbytes for column in self.columns.values())
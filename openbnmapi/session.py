@@ -0,0 +1,285 @@
+import random
+import threading
+import time
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Local modules
+from .exceptions import BNMConnectionError, BNMTimeoutError, error_for_status
+
+# Status codes that are worth retrying. Anything else is returned or raised straight away
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# Status codes treated as a successful response
+SUCCESS_STATUSES = frozenset([200, 201])
+
+# Headers making a request conditional. Only then is a 304 a successful response, see cache.ValidatorStore
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+
+def is_conditional(headers):
+    """
+    Whether a request sent with these headers is conditional, ie: may be answered with 304 Not Modified.
+    """
+    return bool(headers) and any(name in headers for name in CONDITIONAL_HEADERS)
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header value into seconds to wait.
+
+    Accepts both forms allowed by RFC 7231: delay-seconds ("120") or an HTTP-date.
+    Returns None when the header is missing or cannot be parsed.
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, backoff_factor, backoff_max):
+    """
+    Exponential backoff with full jitter: a random delay in [0, factor * 2^attempt], capped at backoff_max.
+    """
+    return random.uniform(0, min(backoff_max, backoff_factor * (2 ** attempt)))
+
+
+def retry_delay(attempt, status_code, retry_after, backoff_factor, backoff_max, rate_limiter=None):
+    """
+    How long to wait before retrying: Retry-After if the server sent it, the exponential backoff otherwise.
+    After a 429 the rate limiter, if any, already holds every request back for Retry-After, the retry included.
+    """
+    if retry_after is not None:
+        return 0.0 if status_code == 429 and rate_limiter is not None else retry_after
+    return backoff_delay(attempt, backoff_factor, backoff_max)
+
+
+# Connection setup timings of the request running in the current thread, see TimedHTTPAdapter
+_connection_timings = threading.local()
+
+
+class _TimedConnectionMixin:
+    # Time the TCP connect (including the DNS lookup) and the TLS handshake of new connections
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        _connection_timings.connect = time.perf_counter() - start
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        if isinstance(self, HTTPSConnection):
+            elapsed = time.perf_counter() - start
+            _connection_timings.tls = max(0.0, elapsed - (getattr(_connection_timings, "connect", None) or 0.0))
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+
+    """
+    HTTPAdapter whose connections record how long connecting and the TLS handshake took.
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class RetryingSession:
+
+    """
+    Retry decisions shared by BNMSession and aio.AsyncBNMSession, whose request loops only differ in how they
+    send requests and wait. Subclasses set max_retries, backoff_factor, backoff_max and rate_limiter.
+    """
+    def _failure_delay(self, attempt, url, timed_out, error):
+        """
+        returns: how long to wait before retrying a request that timed out or could not connect
+        rtype: float
+
+        raises: BNMTimeoutError or BNMConnectionError once the retries are used up
+        """
+        if attempt >= self.max_retries:
+            if timed_out:
+                raise BNMTimeoutError("Request to {} timed out".format(url)) from error
+            raise BNMConnectionError("Could not connect to {}".format(url)) from error
+        return backoff_delay(attempt, self.backoff_factor, self.backoff_max)
+
+    def _response_delay(self, attempt, endpoint, response, info=None, conditional=False):
+        """
+        returns: None for a successful response, how long to wait before retrying otherwise
+        rtype: float
+
+        raises: a BNMHTTPError subclass for statuses that are not retried, once the retries are used up, or
+            when Retry-After asks for a longer wait than backoff_max. A 304 is an error too, unless the request
+            was `conditional`
+        """
+        status_code = response.status_code
+        if status_code in SUCCESS_STATUSES or (status_code == 304 and conditional):
+            if self.rate_limiter is not None:
+                self.rate_limiter.succeed(endpoint)
+            return None
+
+        # Read the (small) error body so that the connection goes back to the pool
+        response.content
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if status_code == 429 and self.rate_limiter is not None:
+            self.rate_limiter.throttle(endpoint, retry_after)
+        if status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+            raise error_for_status(status_code, response.url, response, retry_after)
+        if info is not None:
+            info.setdefault("retried_statuses", []).append(status_code)
+
+        # Do not sleep for longer than we are willing to, give up instead
+        if retry_after is not None and retry_after > self.backoff_max:
+            raise error_for_status(status_code, response.url, response, retry_after)
+        return retry_delay(attempt, status_code, retry_after, self.backoff_factor, self.backoff_max,
+                           self.rate_limiter)
+
+    def _rate_limit_waited(self, info, waited):
+        if info is not None:
+            info["rate_limit_wait"] = info.get("rate_limit_wait", 0.0) + waited
+
+
+class BNMSession(RetryingSession):
+
+    """
+    Pooled, keep-alive HTTP session shared by every endpoint of a client.
+
+    params:
+
+    headers: dict
+        Headers sent with every request
+    pool_size: int
+        Number of keep-alive connections kept open per host. Defaults to 10
+    timeout: float or tuple(float, float)
+        Connect and read timeouts in seconds. Defaults to (3.05, 30)
+    max_retries: int
+        How many times a request is retried on timeouts, connection errors, 429 and 5xx. Defaults to 3
+    backoff_factor: float
+        Base delay in seconds for the exponential backoff. Defaults to 0.5
+    backoff_max: float
+        Longest we are willing to sleep between two attempts, including Retry-After. Defaults to 30
+    rate_limiter: RateLimiter
+        Optional client-side rate limiter, see ratelimit.py. It is told about 429s and then enforces Retry-After
+        for every request sharing it, instead of each request sleeping on its own
+    """
+    def __init__(self, headers=None, pool_size=10, timeout=(3.05, 30), max_retries=3,
+                 backoff_factor=0.5, backoff_max=30, rate_limiter=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        self._pool_lock = threading.Lock()
+        self._mount(pool_size)
+
+    def _mount(self, pool_size):
+        # Retries are handled by us so that we can honour Retry-After and raise typed exceptions
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def grow_pool(self, pool_size):
+        """
+        Keep up to `pool_size` connections open per host from now on, eg: before sending that many requests at
+        once. Does nothing if the pool is already that large. The idle connections of the old pool are closed.
+        """
+        with self._pool_lock:
+            if pool_size <= self.pool_size:
+                return
+            previous = self.session.get_adapter("https://")
+            self.pool_size = pool_size
+            self._mount(pool_size)
+        previous.close()
+
+    def get(self, url, params=None, headers=None, info=None):
+        """
+        Send a GET request, retrying transient failures.
+
+        info: dict
+            Optional request info (see metrics.Metrics) to fill with the status code, retries and timings
+
+        returns: the response for a 2xx status code, or 304 if `headers` make the request conditional
+        rtype: requests.Response
+
+        raises: BNMTimeoutError, BNMConnectionError or a BNMHTTPError subclass
+        """
+        endpoint = info.get("endpoint") if info is not None else None
+        conditional = is_conditional(headers)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self._rate_limit_waited(info, self.rate_limiter.acquire(endpoint))
+            _connection_timings.connect = None
+            _connection_timings.tls = None
+            if info is not None:
+                info["retries"] = attempt
+            try:
+                # Streamed so that callers can decode the body incrementally, see decoding.RecordStream
+                r = self.session.get(url, params=params, headers=headers, timeout=self.timeout, stream=True)
+            except requests.exceptions.Timeout as e:
+                delay = self._failure_delay(attempt, url, True, e)
+            except requests.exceptions.ConnectionError as e:
+                delay = self._failure_delay(attempt, url, False, e)
+            else:
+                if info is not None:
+                    self._record(info, r)
+                delay = self._response_delay(attempt, endpoint, r, info, conditional)
+                if delay is None:
+                    return r
+
+            attempt += 1
+            time.sleep(delay)
+
+    def _record(self, info, r):
+        connect = _connection_timings.connect
+        tls = _connection_timings.tls
+        info["status_code"] = r.status_code
+        info["connect"] = connect
+        info["tls"] = tls
+        # requests' elapsed runs until the headers are parsed, and includes setting up a new connection
+        info["ttfb"] = max(0.0, r.elapsed.total_seconds() - (connect or 0.0) - (tls or 0.0))
+
+    def close(self):
+        self.session.close()
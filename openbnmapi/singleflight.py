@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+
+class _Call:
+    # A fetch in flight and the callers waiting for it
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    """
+    Deduplicate concurrent identical calls across threads: while a call for a key is in flight, other callers
+    with the same key wait for it and get its result (or its exception) instead of making their own.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, share=None):
+        """
+        Run `func()`, or wait for the identical call already in flight.
+
+        params:
+
+        key: string
+            Identifies identical calls
+        func: callable
+            The call to make
+        share: callable
+            Converts the result into one that can be handed to several callers. Only called when other
+            callers are waiting, eg: to read a streamed response body
+
+        returns: the result, and whether it came from another caller's call
+        rtype: tuple(object, bool)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                call.waiters += 1
+                leader = False
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            result = func()
+            # Callers arriving from now on make a new call
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+            if waiters and share is not None:
+                result = share(result)
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.error = e
+            raise
+        else:
+            call.result = result
+        finally:
+            call.event.set()
+        return result, False
+
+
+class AsyncSingleFlight:
+
+    """
+    asyncio counterpart of SingleFlight: deduplicate concurrent identical calls across tasks of one event loop.
+    If the task making the call is cancelled, the waiting tasks try again rather than being cancelled too.
+    """
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func):
+        """
+        Await `func()`, or the identical call already in flight. Same as SingleFlight.do, `func` returning
+        an awaitable whose result can be shared as is.
+        """
+        while key in self._calls:
+            future = self._calls[key]
+            try:
+                # Shielded, so that cancelling a waiting task does not cancel the shared call
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved, nobody may be waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[key]
+        return result, False
@@ -0,0 +1,94 @@
+# Latest data of every endpoint in one call, see OpenBNMAPI.snapshot
+
+import threading
+import time
+
+# Local modules
+from .endpoints import ENDPOINTS, PRODUCTS
+from .exceptions import BNMTimeoutError
+
+# Left out of a snapshot unless asked for: the whole alert list, see consumer_alert_index
+SNAPSHOT_EXCLUDED = ("consumer_alert",)
+
+
+def snapshot_requests(endpoints=None):
+    """
+    The latest data requests of a snapshot: one per endpoint, one per product for interest rates and volumes.
+
+    params:
+
+    endpoints: list(string)
+        Endpoint names (eg: 'kijang_emas', 'interest_rate' for every product) or request keys (eg:
+        'interest_rate.interbank'). Defaults to every endpoint but consumer_alert
+
+    raises: ValueError for unknown names
+
+    returns: (key, endpoint name, arguments) of each request, eg: ('interest_rate.interbank', 'interest_rate',
+        {'product': 'interbank'})
+    rtype: list(tuple(string, string, dict))
+    """
+    requests = []
+    for endpoint in ENDPOINTS.values():
+        if "product" in endpoint.query:
+            requests.extend(("{}.{}".format(endpoint.name, product), endpoint.name, {"product": product})
+                            for product in PRODUCTS.values)
+        else:
+            requests.append((endpoint.name, endpoint.name, {}))
+
+    if endpoints is None:
+        return [request for request in requests if request[1] not in SNAPSHOT_EXCLUDED]
+
+    wanted = set(endpoints)
+    known = {request[0] for request in requests} | set(ENDPOINTS)
+    unknown = sorted(wanted - known)
+    if unknown:
+        raise ValueError("Unknown snapshot endpoint: {}. Valid endpoints are: {}".format(
+            ", ".join(unknown), ", ".join(sorted(known))))
+    return [request for request in requests if request[0] in wanted or request[1] in wanted]
+
+
+class SnapshotResult:
+
+    """
+    Results and errors of the requests of a snapshot, gathered until the deadline. Requests finishing after it
+    are ignored.
+    """
+    def __init__(self, requests):
+        self.keys = [request[0] for request in requests]
+        self.data = {}
+        self.errors = {}
+        self.started = time.perf_counter()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def add(self, key, value):
+        with self._lock:
+            if not self._closed:
+                self.data[key] = value
+
+    def fail(self, key, error):
+        with self._lock:
+            if not self._closed:
+                self.errors[key] = error
+
+    def response(self, deadline):
+        """
+        returns: {'data': {key: result}, 'errors': {key: exception}, 'meta': {...}}, in the order of the
+            requests. Requests still in flight get a BNMTimeoutError
+        rtype: dict
+        """
+        with self._lock:
+            self._closed = True
+            timed_out = [key for key in self.keys if key not in self.data and key not in self.errors]
+            for key in timed_out:
+                self.errors[key] = BNMTimeoutError("No response within the snapshot deadline of {}s".format(deadline))
+            return {
+                "data": {key: self.data[key] for key in self.keys if key in self.data},
+                "errors": {key: self.errors[key] for key in self.keys if key in self.errors},
+                "meta": {
+                    "requested": len(self.keys),
+                    "returned": len(self.data),
+                    "timed_out": timed_out,
+                    "elapsed": round(time.perf_counter() - self.started, 6),
+                },
+            }
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from datetime import datetime
+
+# Local modules
+from .cache import MYT
+from .frames import records_to_frame
+from .ranges import DATE_ENDPOINTS, to_date
+from .records import record_date
+
+
+def series_key(params):
+    """
+    Identify a series of an endpoint by its extra arguments, eg: {'currency_code': 'USD'} for exchange_rate.
+    """
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class LocalStore:
+
+    """
+    Local copy of BNM series in a SQLite file, kept up to date with `sync`.
+
+    A record that is already stored (same endpoint, arguments and content) is skipped. For every series the
+    store remembers the last date it holds, so `sync` only downloads the days and months that are missing. The
+    days `sync` downloads again replace the ones stored, since BNM may have revised or completed them.
+
+        store = LocalStore("bnm.sqlite")
+        store.sync(obnmapi, "kl_usd_reference_rate", start="2015-01-01")   # first run: full history
+        store.sync(obnmapi, "kl_usd_reference_rate")                        # then only the new days
+        store.read("kl_usd_reference_rate", start="2020-01-01", rtype="df")
+
+    params:
+
+    path: string
+        Location of the SQLite file
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " endpoint TEXT, series TEXT, date TEXT, hash TEXT, record TEXT,"
+                " PRIMARY KEY (endpoint, series, hash))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS records_by_date ON records (endpoint, series, date)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                " endpoint TEXT, series TEXT, last_date TEXT, synced_at REAL,"
+                " PRIMARY KEY (endpoint, series))"
+            )
+
+    def last_date(self, endpoint, **params):
+        """
+        returns: the last date synced for a series, or None if it was never synced
+        rtype: string
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_date FROM sync_state WHERE endpoint = ? AND series = ?", (endpoint, series_key(params))
+            ).fetchone()
+        return row[0] if row else None
+
+    def append(self, endpoint, records, replace=False, **params):
+        """
+        Store records of a series, skipping the ones already stored.
+
+        params:
+
+        replace: bool
+            The records hold every record of their dates: the records stored for those dates are dropped first,
+            in the same transaction. Defaults to False
+
+        returns: number of records added, less the ones dropped
+        rtype: int
+        """
+        series = series_key(params)
+        rows = []
+        for record in records:
+            text = json.dumps(record, sort_keys=True)
+            rows.append((endpoint, series, record_date(record), hashlib.sha1(text.encode()).hexdigest(), text))
+        dates = sorted({row[2] for row in rows if row[2] is not None})
+
+        with self._lock, self._conn:
+            deleted = 0
+            if replace and dates:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "DELETE FROM records WHERE endpoint = ? AND series = ? AND date = ?",
+                    [(endpoint, series, day) for day in dates]
+                )
+                deleted = self._conn.total_changes - before
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO records VALUES (?, ?, ?, ?, ?)", rows)
+            return self._conn.total_changes - before - deleted
+
+    def read(self, endpoint, start=None, end=None, rtype='json', **params):
+        """
+        Read a series from the local copy, without any request.
+
+        params:
+
+        endpoint: string
+            Endpoint name, eg: 'kijang_emas'
+        start, end: string<date> or date
+            Optional bounds of the range (inclusive)
+        rtype: string
+            'json' for a list of records, 'df' for a DataFrame
+        **params
+            Other arguments the series was synced with, eg: currency_code='USD'
+        """
+        query = "SELECT record FROM records WHERE endpoint = ? AND series = ?"
+        args = [endpoint, series_key(params)]
+        if start is not None:
+            query += " AND date >= ?"
+            args.append(to_date(start).isoformat())
+        if end is not None:
+            query += " AND date <= ?"
+            args.append(to_date(end).isoformat())
+        query += " ORDER BY date, rowid"
+
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        records = [json.loads(row[0]) for row in rows]
+        if rtype in ('df', 'dataframe'):
+            return records_to_frame(DATE_ENDPOINTS[endpoint], records)
+        return records
+
+    def sync(self, client, endpoint, start=None, end=None, **params):
+        """
+        Download the records missing from a series and append them.
+
+        The first sync of a series needs `start`. Later syncs resume from the last date already stored
+        (included, since that day may have been incomplete) up to `end`, which defaults to today. The records
+        of the dates downloaded replace the ones stored for them.
+
+        params:
+
+        client: OpenBNMAPI
+            Client used for the requests
+        endpoint: string
+            Name of a date-aware endpoint, eg: 'kl_usd_reference_rate'
+        start, end: string<date> or date
+            Range to sync
+        **params
+            Other arguments of the endpoint, eg: currency_code='USD' for exchange_rate
+
+        returns: summary of the sync
+        rtype: dict
+        """
+        if endpoint not in DATE_ENDPOINTS:
+            raise ValueError("sync supports these endpoints only: {}".format(", ".join(DATE_ENDPOINTS)))
+
+        last = self.last_date(endpoint, **params)
+        if last is not None:
+            start = max(to_date(last), to_date(start)) if start is not None else to_date(last)
+        elif start is None:
+            raise ValueError("'start' is required the first time a series is synced")
+        end = to_date(end) if end is not None else datetime.now(MYT).date()
+
+        fetched = []
+        if to_date(start) <= end:
+            fetched = client.fetch_range(endpoint, start, end, rtype='json', **params)["data"]
+        added = self.append(endpoint, fetched, replace=True, **params)
+
+        dates = [day for day in (record_date(record) for record in fetched) if day]
+        new_last = max(dates + ([last] if last else []), default=None)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                (endpoint, series_key(params), new_last, time.time())
+            )
+
+        return {
+            "endpoint": endpoint,
+            "params": params,
+            "start": to_date(start).isoformat(),
+            "end": end.isoformat(),
+            "fetched": len(fetched),
+            "added": added,
+            "last_date": new_last,
+        }
+
+    def sync_all(self, client, series, start=None, end=None):
+        """
+        Sync several series, eg: [('kl_usd_reference_rate', {}), ('exchange_rate', {'currency_code': 'USD'})]
+
+        rtype: list(dict)
+        """
+        return [self.sync(client, endpoint, start, end, **params) for endpoint, params in series]
+
+    def close(self):
+        self._conn.close()
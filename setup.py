@@ -17,4 +17,9 @@ setup(name='openbnmapi',
           'pandas',
           'requests'
       ],
+      extras_require={
+          'async': ['aiohttp'],
+          'fast': ['orjson'],
+          'arrow': ['pyarrow']
+      },
       zip_safe=False)
\ No newline at end of file
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# The offline BNM server lives with the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from mock_server import MockBNMServer  # noqa: E402
+
+from openbnmapi import OpenBNMAPI  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with MockBNMServer() as server:
+        yield server
+
+
+@pytest.fixture
+def etag_server():
+    with MockBNMServer(etags=True) as server:
+        yield server
+
+
+def make_client(server, **kwargs):
+    client = OpenBNMAPI(**kwargs)
+    client.base_url = server.url
+    return client
+
+
+@pytest.fixture
+def client(server):
+    client = make_client(server)
+    yield client
+    client.close()
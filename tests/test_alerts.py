@@ -0,0 +1,82 @@
+import asyncio
+
+from openbnmapi import AsyncOpenBNMAPI
+from openbnmapi.alerts import AlertIndex, ngrams, normalize
+
+RECORDS = [
+    {"name": "Émas Dinar Sdn. Bhd.", "registration_number": "123-A", "added_date": "2020-01-02"},
+    {"name": "Global Forex Trading", "alias": "GFT Investment", "added_date": "2020-02-03"},
+    {"name": "Dinar Gold Berhad", "added_date": "2020-03-04"},
+    {"name": "SDN BHD", "added_date": "2020-04-05"},
+    {"name": "", "added_date": "2020-05-06"},
+]
+
+
+def test_normalize():
+    assert normalize("Émas Dinar  SDN. BHD.") == "emas dinar"
+    assert normalize("Acme Berhad") == normalize("ACME sdn bhd") == "acme"
+    # Legal forms only
+    assert normalize("Sdn Bhd") == "sdn bhd"
+    assert normalize(None) == ""
+
+
+def test_ngrams_pad_word_edges():
+    assert ngrams("ab") == frozenset([" ab", "ab "])
+
+
+def test_search_needs_every_word_in_any_order():
+    index = AlertIndex(RECORDS)
+    assert len(index) == 5
+    assert [record["name"] for _, record in index.search("dinar emas")] == ["Émas Dinar Sdn. Bhd."]
+    names = [record["name"] for _, record in index.search("DINAR")]
+    assert sorted(names) == ["Dinar Gold Berhad", "Émas Dinar Sdn. Bhd."]
+    assert index.search("dinar silver") == []
+    assert index.search("   ") == []
+    assert len(index.search("dinar", limit=1)) == 1
+
+
+def test_match_threshold():
+    index = AlertIndex(RECORDS)
+    score, record = index.match("EMAS DINAR BERHAD")[0]
+    assert score == 1.0 and record is RECORDS[0]
+
+    near = index.match("Emas Dinnar", threshold=0.6)
+    assert near and near[0][1] is RECORDS[0] and 0.6 <= near[0][0] < 1.0
+    assert index.match("Emas Dinnar", threshold=0.95) == []
+    assert index.match("Completely Unrelated Holdings") == []
+
+
+def test_screen_keeps_the_names_asked_for():
+    index = AlertIndex(RECORDS)
+    result = index.screen(["Global Forex Trading Ltd", "Nobody", "global forex trading"])
+    assert list(result) == ["Global Forex Trading Ltd", "Nobody", "global forex trading"]
+    assert result["Global Forex Trading Ltd"][0] == (1.0, RECORDS[1])
+    assert result["Nobody"] == []
+
+
+def test_every_field_is_indexed_once_per_record():
+    index = AlertIndex(RECORDS, fields=("name", "alias"))
+    assert [record for _, record in index.match("GFT Investment")] == [RECORDS[1]]
+    assert [record for _, record in index.search("global")] == [RECORDS[1]]
+
+
+def test_client_index_is_reused(server, client):
+    index = client.consumer_alert_index()
+    assert len(index) == 300
+    assert client.consumer_alert_index() is index
+    assert server.requests == 1
+    # Checked again, the list did not change
+    assert client.consumer_alert_index(max_age=0) is index
+    assert server.requests == 2
+
+
+def test_async_client_index(server):
+    async def main():
+        async with AsyncOpenBNMAPI() as client:
+            client.base_url = server.url
+            indexes = await asyncio.gather(*(client.consumer_alert_index() for _ in range(3)))
+        return indexes
+
+    indexes = asyncio.run(main())
+    assert indexes[0] is indexes[1] is indexes[2]
+    assert server.requests == 1
@@ -0,0 +1,96 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+import asyncio  # noqa: E402
+
+from openbnmapi import AsyncOpenBNMAPI  # noqa: E402
+from openbnmapi.arrow import arrow_schema, batch_reader, records_to_table, stream_schema  # noqa: E402
+
+from .conftest import make_client  # noqa: E402
+
+ENDPOINT = "/interbank-swap"
+
+
+def test_columns_are_never_null_typed():
+    table = records_to_table(ENDPOINT, [{"date": "2020-01-02", "empty": None, "websites": ["a", "b"]}])
+    assert not any(pa.types.is_null(field.type) for field in table.schema)
+    assert table.schema.field("empty").type == pa.float64()
+    assert table.column("websites").to_pylist() == ['["a", "b"]']
+
+
+def test_stream_schema_is_known_from_the_first_table():
+    first = records_to_table(ENDPOINT, [{"date": "2020-01-02", "overnight": 3.0, "1_week": None}])
+    schema = stream_schema(ENDPOINT, first)
+    assert schema.names == arrow_schema(ENDPOINT).names + ["overnight", "1_week"]
+    assert schema.field("1_week").type == pa.float64()
+    assert schema.metadata == first.schema.metadata
+
+
+def test_batch_reader_conforms_every_table():
+    first = records_to_table(ENDPOINT, [{"date": "2020-01-02", "overnight": None}])
+    second = records_to_table(ENDPOINT, [{"date": "2020-02-03", "overnight": "-", "1_year": 3.5}])
+    third = records_to_table(ENDPOINT, [{"date": "2020-03-02"}])
+    reader = batch_reader(ENDPOINT, [first, second, third])
+    assert reader.schema.field("overnight").type == pa.float64()
+    # Text in a number column is null, a column first seen in a later table is left out
+    assert reader.read_all().to_pylist() == [
+        {"date": table.column("date")[0].as_py(), "overnight": None} for table in (first, second, third)
+    ]
+
+
+def test_batch_reader_reads_tables_lazily():
+    read = []
+
+    def tables():
+        for day in (2, 3, 6):
+            read.append(day)
+            yield records_to_table(ENDPOINT, [{"date": "2020-01-{:02d}".format(day), "overnight": 3.0}])
+
+    reader = batch_reader(ENDPOINT, tables())
+    assert read == [2]
+    reader.read_next_batch()
+    reader.read_next_batch()
+    assert read == [2, 3]
+    assert reader.read_all().num_rows == 1
+    assert read == [2, 3, 6]
+
+
+def test_empty_stream_has_the_endpoint_schema():
+    reader = batch_reader(ENDPOINT, [])
+    assert reader.read_all().num_rows == 0
+    assert "date" in reader.schema.names
+
+
+def test_fetch_range_batches_match_fetch_range(client):
+    args = ("kl_usd_reference_rate", "2020-01-30", "2020-03-10")
+    table = client.fetch_range(*args, rtype="arrow")
+    batches = client.fetch_range_batches(*args).read_all()
+    assert batches.num_rows == table.num_rows > 0
+    assert sorted(batches.column_names) == sorted(table.column_names)
+    for name in table.column_names:
+        assert batches.column(name).to_pylist() == table.column(name).to_pylist()
+
+
+def test_fetch_range_batches_send_requests_as_the_stream_is_read(server):
+    client = make_client(server)
+    try:
+        # One request per month
+        reader = client.fetch_range_batches("kl_usd_reference_rate", "2020-01-01", "2020-12-31", max_workers=2)
+        # The first request and the max_workers after it
+        assert server.requests <= 3
+        assert reader.read_all().num_rows > 0
+    finally:
+        client.close()
+    assert server.requests == 12
+
+
+def test_async_fetch_range_batches(server, client):
+    args = ("kl_usd_reference_rate", "2020-01-30", "2020-03-10")
+
+    async def main():
+        async with AsyncOpenBNMAPI() as aclient:
+            aclient.base_url = server.url
+            return (await aclient.fetch_range_batches(*args)).read_all()
+
+    assert asyncio.run(main()).equals(client.fetch_range_batches(*args).read_all())
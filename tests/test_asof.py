@@ -0,0 +1,99 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from openbnmapi.asof import AsOfRates, to_utc_ns  # noqa: E402
+from openbnmapi.exceptions import BNMNotFoundError  # noqa: E402
+
+INTRADAY = {
+    (2020, 2): [("2020-02-28", "1700", 4.0)],
+    (2020, 3): [("2020-03-02", "0900", 4.1), ("2020-03-02", "1000", 4.2), ("2020-03-02", "1100", float("nan")),
+                ("2020-03-03", "0900", 4.3)],
+}
+
+REFERENCE = {
+    (2020, 3): [("2020-03-02", 4.21), ("2020-03-03", 4.22)],
+}
+
+
+class FakeClient:
+    # Serves the rtype='df' frames of the as-of endpoints from the tables above
+
+    def __init__(self):
+        self.months = []
+
+    def usd_interbank_intraday_rate(self, year, month, rtype):
+        rows = self._rows(INTRADAY, year, month)
+        index = pd.MultiIndex.from_arrays([pd.to_datetime([r[0] for r in rows]), [r[1] for r in rows]],
+                                          names=["date", "time"])
+        return pd.DataFrame({"rate": [r[2] for r in rows]}, index=index)
+
+    def kl_usd_reference_rate(self, year, month, rtype):
+        rows = self._rows(REFERENCE, year, month)
+        index = pd.DatetimeIndex(pd.to_datetime([r[0] for r in rows]), name="date")
+        return pd.DataFrame({"rate": [r[1] for r in rows]}, index=index)
+
+    def _rows(self, table, year, month):
+        self.months.append((year, month))
+        if (year, month) not in table:
+            raise BNMNotFoundError("No data", 404)
+        return table[(year, month)]
+
+
+def rates(asof, *timestamps):
+    return asof.rate_asof(list(timestamps)).tolist()
+
+
+def test_rate_in_effect_at_each_timestamp():
+    asof = AsOfRates(FakeClient())
+    result = rates(asof, "2020-03-02 09:59", "2020-03-02 10:00", "2020-03-02 12:00", "2020-03-03 09:00")
+    # A rate applies from its own time, a missing rate keeps the previous one
+    assert result == [4.1, 4.2, 4.2, 4.3]
+
+
+def test_month_boundaries_use_the_previous_month():
+    asof = AsOfRates(FakeClient())
+    assert rates(asof, "2020-03-02 08:00") == [4.0]
+
+
+def test_before_the_first_rate_and_nat_are_nan():
+    asof = AsOfRates(FakeClient())
+    result = asof.rate_asof(["2020-02-28 16:59", None, "2020-02-28 17:00"])
+    assert np.isnan(result[0]) and np.isnan(result[1])
+    assert result[2] == 4.0
+
+
+def test_naive_timestamps_are_malaysian_time():
+    asof = AsOfRates(FakeClient())
+    assert rates(asof, "2020-03-02 10:00") == [4.2]
+    assert asof.rate_asof(pd.Timestamp("2020-03-02 02:00", tz="UTC")).tolist() == [4.2]
+    assert asof.rate_asof(pd.Timestamp("2020-03-02 01:59", tz="UTC")).tolist() == [4.1]
+    assert to_utc_ns("2020-03-02 08:00")[0] == pd.Timestamp("2020-03-02 00:00").value
+
+
+def test_return_times():
+    asof = AsOfRates(FakeClient())
+    timestamps = pd.Series(pd.to_datetime(["2020-03-02 10:30", "2020-02-01 00:00"]))
+    result, times = asof.rate_asof(timestamps, return_times=True)
+    assert times[0] == np.datetime64("2020-03-02T02:00", "ns")
+    assert np.isnat(times[1]) and np.isnan(result[1])
+
+
+def test_reference_rates_take_effect_at_the_fixing():
+    asof = AsOfRates(FakeClient(), endpoint="kl_usd_reference_rate")
+    result = rates(asof, "2020-03-03 15:29", "2020-03-03 15:30")
+    assert result == [4.21, 4.22]
+
+
+def test_months_are_fetched_once():
+    client = FakeClient()
+    asof = AsOfRates(client)
+    asof.rate_asof(["2020-03-02 10:00"])
+    asof.rate_asof(pd.date_range("2020-03-01", "2020-03-31", freq="h"))
+    assert sorted(client.months) == [(2020, 2), (2020, 3)]
+
+
+def test_unsupported_endpoint():
+    with pytest.raises(ValueError):
+        AsOfRates(FakeClient(), endpoint="kijang_emas")
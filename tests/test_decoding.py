@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from openbnmapi.decoding import RecordStream, iter_json_items
+
+DOCUMENT = {
+    "data": [
+        {"currency_code": "USD", "rate": {"date": "2020-01-02", "middle_rate": 4.09}},
+        {"note": "braces } { and \"quotes\" \\ inside", "rates": [1, [2, 3]]},
+        {"unicode": "Ringgit é中"},
+    ],
+    "meta": {"quote": "rm", "last_updated": "2020-01-02 12:00:00", "total_result": 3},
+}
+
+
+def feed_all(text, size, key="data"):
+    stream = RecordStream(key)
+    items = []
+    data = text.encode("utf-8")
+    for i in range(0, len(data), size):
+        items.extend(stream.feed(data[i:i + size]))
+    items.extend(stream.close())
+    return stream, items
+
+
+@pytest.mark.parametrize("size", [1, 7, 1 << 20])
+def test_items_match_json_loads(size):
+    stream, items = feed_all(json.dumps(DOCUMENT), size)
+    assert items == DOCUMENT["data"]
+    assert stream.done
+
+
+def test_key_after_other_keys():
+    text = json.dumps({"meta": {"data": "not this one"}, "data": [{"a": 1}]})
+    assert feed_all(text, 3)[1] == [{"a": 1}]
+
+
+def test_single_object_value():
+    text = json.dumps({"data": {"date": "2020-01-02", "rate": 3.0}, "meta": {}})
+    assert feed_all(text, 1)[1] == [{"date": "2020-01-02", "rate": 3.0}]
+
+
+def test_scalar_items():
+    text = json.dumps({"data": [1, "two", None, 4.5, [6]]})
+    assert feed_all(text, 2)[1] == [1, "two", None, 4.5, [6]]
+
+
+def test_null_and_empty_values():
+    assert feed_all('{"data": null}', 1)[1] == []
+    assert feed_all('{"data": []}', 1)[1] == []
+
+
+def test_other_key():
+    text = json.dumps({"data": [1], "meta": {"total_result": 1}})
+    assert feed_all(text, 4, key="meta")[1] == [{"total_result": 1}]
+
+
+def test_truncated_document_raises():
+    stream = RecordStream()
+    stream.feed(b'{"data": [{"a": 1}, {"b": ')
+    with pytest.raises(ValueError):
+        stream.close()
+
+
+def test_iter_json_items_stops_scanning_after_the_key():
+    chunks = [b'{"data": [{"a": 1}', b', {"b": 2}]', b', "meta": {"x": [}']
+    assert list(iter_json_items(chunks)) == [{"a": 1}, {"b": 2}]
+
+
+def test_streamed_records_match_json(client):
+    streamed = list(client.exchange_rate(rtype="records"))
+    payload = client.exchange_rate()
+    assert len(streamed) == len(payload["data"]) == 25
+    assert streamed[0]["currency_code"] == payload["data"][0]["currency_code"]
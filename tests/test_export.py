@@ -0,0 +1,45 @@
+import json
+
+from openbnmapi import OpenBNMAPI
+from openbnmapi.exceptions import BNMServerError
+from openbnmapi.export import Exporter, plan
+
+START, END = "2020-01-01", "2020-05-31"
+
+
+class FlakyClient(OpenBNMAPI):
+    # February fails until `fail` is cleared
+    fail = True
+
+    def kijang_emas(self, *args, **kwargs):
+        if self.fail and kwargs.get("month") == 2:
+            raise BNMServerError("BNM API returned HTTP 503", 503)
+        return super().kijang_emas(*args, **kwargs)
+
+
+def dates(path):
+    with open(path) as f:
+        return [json.loads(line)["effective_date"] for line in f]
+
+
+def test_nothing_after_a_failure_is_written(server, tmp_path):
+    client = FlakyClient()
+    client.base_url = server.url
+    series = plan(client, ["kijang_emas"], start=START, end=END)
+    output = tmp_path / "kijang_emas.jsonl"
+    try:
+        stats = Exporter(client, str(tmp_path), workers=4).run(series, start=START, end=END)
+        assert stats["failed"] == 1
+        written = dates(output)
+        assert written and max(written) < "2020-02-01"
+
+        # Resuming fetches February onwards and keeps the file in order
+        client.fail = False
+        stats = Exporter(client, str(tmp_path), workers=4).run(series, start=START, end=END)
+    finally:
+        client.close()
+    assert stats["failed"] == 0
+    written = dates(output)
+    assert written == sorted(written)
+    assert len(set(written)) == len(written)
+    assert max(written) > "2020-05-01"
@@ -0,0 +1,24 @@
+def test_all_latest_is_one_request(server, client):
+    result = client.exchange_rate(currency_code="all")
+    assert result["meta"] == {"requested": 25, "returned": 25, "requests": 1}
+    assert server.requests == 1
+
+
+def test_all_dated_fetches_every_published_code(server, client):
+    result = client.exchange_rate(currency_code="all", year=2020, month=1)
+    assert result["meta"]["requested"] == 25
+    assert not result["errors"]
+    # The latest rates list the codes
+    assert server.requests == 26
+
+
+def test_upper_case_all_is_the_albanian_lek(server, client):
+    result = client.exchange_rate(currency_code="ALL")
+    assert result["data"]["currency_code"] == "ALL"
+    assert server.requests == 1
+
+
+def test_listed_codes(server, client):
+    result = client.exchange_rate(currency_code=["USD", "SGD"], date="2020-01-02")
+    assert result["meta"] == {"requested": 2, "returned": 2, "requests": 2}
+    assert server.requests == 2
@@ -0,0 +1,93 @@
+import pytest
+
+from openbnmapi.exceptions import BNMNotFoundError
+from openbnmapi.metrics import Histogram, Metrics
+
+from .conftest import make_client
+
+
+def test_histogram_is_cumulative():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    assert histogram.as_dict() == {"count": 4, "sum": 56.5, "min": 0.5, "max": 50, "buckets": {1: 2, 10: 3}}
+
+
+def test_counters_by_endpoint():
+    metrics = Metrics()
+    info = metrics.start("/opr", "http://bnm.test/opr", None)
+    info.update(status_code=200, retries=2, retried_statuses=[503, 429], size=2048, ttfb=0.02, cache="miss")
+    metrics.finish(info)
+    # Finishing twice records once
+    metrics.finish(info)
+    metrics.finish(metrics.start("/opr", "http://bnm.test/opr", None), BNMNotFoundError("No data", 404))
+
+    opr = metrics.snapshot()["/opr"]
+    assert opr["requests"] == 2
+    assert opr["retries"] == 2
+    assert opr["rate_limited"] == 1
+    assert opr["status_codes"] == {503: 1, 429: 1, 200: 1, 404: 1}
+    assert opr["errors"] == 1 and opr["error_types"] == {"BNMNotFoundError": 1}
+    assert opr["cache_misses"] == 1
+    assert opr["bytes_received"] == 2048
+    assert opr["timings"]["ttfb"]["count"] == 1
+    assert opr["timings"]["total"]["count"] == 2
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_hooks_see_both_events_and_cannot_break_requests():
+    metrics = Metrics()
+    events = []
+
+    def trace(event, info):
+        if event == "request_start":
+            info["span"] = "span-1"
+        events.append((event, info.get("span"), info.get("status_code")))
+
+    def broken(event, info):
+        raise RuntimeError("broken hook")
+
+    metrics.add_hook(broken)
+    metrics.add_hook(trace)
+    info = metrics.start("/opr", "http://bnm.test/opr", None)
+    info["status_code"] = 200
+    metrics.finish(info)
+    assert events == [("request_start", "span-1", None), ("request_end", "span-1", 200)]
+
+    metrics.remove_hook(trace)
+    metrics.finish(metrics.start("/opr", "http://bnm.test/opr", None))
+    assert len(events) == 2
+
+
+def test_prometheus_text():
+    metrics = Metrics()
+    info = metrics.start("/opr", "http://bnm.test/opr", None)
+    info.update(status_code=200, ttfb=0.03)
+    metrics.finish(info)
+
+    text = metrics.prometheus(prefix="bnm")
+    lines = text.splitlines()
+    assert "# TYPE bnm_requests_total counter" in lines
+    assert 'bnm_requests_total{endpoint="/opr"} 1' in lines
+    assert 'bnm_responses_total{endpoint="/opr",code="200"} 1' in lines
+    assert 'bnm_ttfb_seconds_bucket{endpoint="/opr",le="0.025"} 0' in lines
+    assert 'bnm_ttfb_seconds_bucket{endpoint="/opr",le="0.05"} 1' in lines
+    assert 'bnm_ttfb_seconds_bucket{endpoint="/opr",le="+Inf"} 1' in lines
+    assert text.endswith("\n")
+
+
+def test_client_records_every_call(server):
+    client = make_client(server)
+    try:
+        client.base_rate()
+        server.script = [404]
+        with pytest.raises(BNMNotFoundError):
+            client.kijang_emas(date="2020-01-01")
+    finally:
+        client.close()
+    snapshot = client.stats()
+    assert snapshot["/base-rate"]["status_codes"] == {200: 1}
+    assert snapshot["/base-rate"]["timings"]["download"]["count"] == 1
+    assert snapshot["/kijang-emas"]["error_types"] == {"BNMNotFoundError": 1}
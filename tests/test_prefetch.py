@@ -0,0 +1,90 @@
+import time
+
+from datetime import datetime
+
+from mock_server import MockBNMServer
+
+from openbnmapi.cache import MYT
+from openbnmapi.prefetch import Prefetcher, next_publication
+
+from .conftest import make_client
+
+# A Friday
+FRIDAY = datetime(2020, 3, 13, 10, 0, tzinfo=MYT)
+
+
+def test_next_publication():
+    assert next_publication(["0900", "1130"], FRIDAY) == FRIDAY.replace(hour=11, minute=30)
+    # After the last session of the week: Monday morning
+    assert next_publication(["1130", "0900"], FRIDAY.replace(hour=18)) == datetime(2020, 3, 16, 9, 0, tzinfo=MYT)
+    saturday = datetime(2020, 3, 14, 8, 0, tzinfo=MYT)
+    assert next_publication(["0900"], saturday) == datetime(2020, 3, 16, 9, 0, tzinfo=MYT)
+    # Strictly after
+    assert next_publication(["1000"], FRIDAY) == datetime(2020, 3, 16, 10, 0, tzinfo=MYT)
+
+
+def test_due_follows_the_calendar_then_the_cache_ttl(client):
+    prefetcher = Prefetcher(calendar={"/kijang-emas": ["0900"]}, delay=60).attach(client)
+    fetched = FRIDAY.timestamp()
+    assert prefetcher.due("/kijang-emas", fetched) == datetime(2020, 3, 16, 9, 1, tzinfo=MYT).timestamp()
+    # Historical data never changes
+    assert prefetcher.due("/interest-rate/date/2019-01-02", fetched) is None
+    # No calendar: when the base rate ttl (a day) runs out
+    assert prefetcher.due("/base-rate", fetched) == fetched + 86400 + 60
+
+
+def test_latest_data_is_served_from_memory(server):
+    client = make_client(server, prefetch=True)
+    try:
+        first = client.kijang_emas()
+        assert client.kijang_emas() == first
+        client.kijang_emas(date="2019-01-02")
+        stats = client.prefetcher.stats()
+    finally:
+        client.close()
+    assert server.requests == 2
+    # Historical requests are not tracked
+    assert stats["tracked"] == 1
+    assert stats["fresh_hits"] == 1
+
+
+def make_due(prefetcher, ago):
+    with prefetcher._condition:
+        for entry in prefetcher._entries.values():
+            entry.due = entry.next_refresh = time.time() - ago
+
+
+def test_stale_data_is_served_while_it_is_refreshed():
+    with MockBNMServer(latency=0.3) as server:
+        client = make_client(server, prefetch=True)
+        try:
+            client.kijang_emas()
+            make_due(client.prefetcher, 1)
+
+            start = time.perf_counter()
+            assert client.kijang_emas()["data"]
+            assert time.perf_counter() - start < 0.2
+
+            deadline = time.time() + 5
+            while client.prefetcher.stats()["refreshes"] < 1 and time.time() < deadline:
+                time.sleep(0.01)
+            stats = client.prefetcher.stats()
+        finally:
+            client.close()
+        assert stats["stale_hits"] == 1
+        assert stats["refreshes"] == 1
+        assert server.requests == 2
+        assert stats["next_refresh"] > time.time()
+
+
+def test_too_old_data_is_fetched_again(server):
+    client = make_client(server, prefetch=Prefetcher(max_stale=5))
+    try:
+        client.kijang_emas()
+        make_due(client.prefetcher, 10)
+        client.kijang_emas()
+        stats = client.prefetcher.stats()
+    finally:
+        client.close()
+    assert server.requests == 2
+    assert stats["stale_hits"] == 0 and stats["fresh_hits"] == 0
@@ -0,0 +1,55 @@
+import pytest
+
+from openbnmapi.ranges import merge_range_results, split_date_range
+
+
+def test_whole_months_are_one_request_each():
+    assert split_date_range("2020-01-01", "2020-03-31") == [
+        {"year": 2020, "month": 1}, {"year": 2020, "month": 2}, {"year": 2020, "month": 3}]
+
+
+def test_short_edges_are_daily_requests():
+    assert split_date_range("2020-01-30", "2020-02-02") == [
+        {"date": "2020-01-30"}, {"date": "2020-01-31"}, {"date": "2020-02-01"}, {"date": "2020-02-02"}]
+
+
+def test_long_edges_are_month_requests():
+    assert split_date_range("2020-01-10", "2020-02-29") == [{"year": 2020, "month": 1}, {"year": 2020, "month": 2}]
+    assert split_date_range("2020-01-10", "2020-01-11", max_edge_days=1) == [{"year": 2020, "month": 1}]
+
+
+def test_start_after_end_raises():
+    with pytest.raises(ValueError):
+        split_date_range("2020-02-01", "2020-01-31")
+    with pytest.raises(ValueError):
+        split_date_range("2020/01/01", "2020-01-31")
+
+
+def test_merge_trims_sorts_and_dedupes():
+    first = {"data": [{"date": "2020-01-31", "rate": 2}, {"date": "2020-01-15", "rate": 1}]}
+    second = {"data": [{"date": "2020-02-03", "rate": 3}, {"date": "2020-01-31", "rate": 2}]}
+    merged = merge_range_results([second, first], "2020-01-20", "2020-02-29")
+    assert merged == [{"date": "2020-01-31", "rate": 2}, {"date": "2020-02-03", "rate": 3}]
+
+
+def test_fetch_range_covers_the_range(server, client):
+    result = client.fetch_range("kl_usd_reference_rate", "2020-01-30", "2020-03-10")
+    dates = [record["date"] for record in result["data"]]
+    assert dates == sorted(dates)
+    assert dates[0] >= "2020-01-30" and dates[-1] <= "2020-03-10"
+    assert len(dates) == len(set(dates))
+    # 2 days of January, February and March
+    assert result["meta"]["requests"] == server.requests == 4
+
+
+def test_exchange_rate_range_needs_a_currency(server, client):
+    with pytest.raises(ValueError):
+        client.fetch_range("exchange_rate", "2020-01-01", "2020-01-31")
+    assert server.requests == 0
+    result = client.fetch_range("exchange_rate", "2020-01-01", "2020-01-31", currency_code="USD")
+    assert result["data"]
+
+
+def test_unsupported_endpoint_raises(client):
+    with pytest.raises(ValueError):
+        client.fetch_range("base_rate", "2020-01-01", "2020-01-31")
@@ -0,0 +1,114 @@
+import pytest
+
+from openbnmapi.ratelimit import RateLimiter, SQLiteTokenBucket, TokenBucket, as_rate_limiter
+
+
+class Clock:
+    # Time under the test's control, far from 0 like time.monotonic()
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def controlled(bucket, clock):
+    bucket._clock = clock
+    return bucket
+
+
+def test_burst_then_rate():
+    bucket = controlled(TokenBucket(2, burst=3), Clock())
+    assert [bucket._reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket._reserve() == pytest.approx(0.5)
+    assert bucket._reserve() == pytest.approx(1.0)
+
+
+def test_refill_is_capped_at_the_burst():
+    clock = Clock()
+    bucket = controlled(TokenBucket(2, burst=3), clock)
+    for _ in range(3):
+        bucket._reserve()
+    clock.now += 1
+    assert [bucket._reserve() for _ in range(3)] == [0.0, 0.0, pytest.approx(0.5)]
+    clock.now += 100
+    assert [bucket._reserve() for _ in range(4)] == [0.0, 0.0, 0.0, pytest.approx(0.5)]
+
+
+def test_throttle_halves_the_rate_once_per_retry_after_window():
+    clock = Clock()
+    bucket = controlled(TokenBucket(10, min_rate=2), clock)
+    bucket.throttle(retry_after=2)
+    # Several requests got the same 429
+    bucket.throttle(retry_after=2)
+    assert bucket.rate == 5
+    # Held for Retry-After, then released at the new rate
+    assert bucket._reserve() == pytest.approx(2.2)
+    assert bucket._reserve() == pytest.approx(2.4)
+
+    clock.now += 2
+    bucket.throttle(retry_after=2)
+    assert bucket.rate == 2.5
+    clock.now += 2
+    bucket.throttle()
+    assert bucket.rate == 2
+
+
+def test_successes_win_the_rate_back():
+    bucket = controlled(TokenBucket(10, recovery=0.1), Clock())
+    bucket.throttle(retry_after=1)
+    assert bucket.rate == 5
+    bucket.succeed()
+    assert bucket.rate == 6
+    for _ in range(10):
+        bucket.succeed()
+    assert bucket.rate == 10
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_sqlite_buckets_share_one_budget(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "rate.sqlite")
+    first = controlled(SQLiteTokenBucket(path, "/opr", 1, burst=2), clock)
+    second = controlled(SQLiteTokenBucket(path, "/opr", 1, burst=2), clock)
+    other = controlled(SQLiteTokenBucket(path, "/base-rate", 1, burst=2), clock)
+    try:
+        assert first._reserve() == 0.0
+        assert second._reserve() == 0.0
+        assert first._reserve() == pytest.approx(1.0)
+        assert other._reserve() == 0.0
+
+        second.throttle(retry_after=1)
+        assert first.rate == 0.5
+        assert other.rate == 1
+    finally:
+        for bucket in (first, second, other):
+            bucket.close()
+
+
+def test_rate_limiter_buckets():
+    limiter = RateLimiter(10, endpoints={"/exchange-rate": (2, 4)})
+    assert len(limiter.buckets("/opr")) == 1
+    assert len(limiter.buckets("/exchange-rate")) == 2
+
+    # Only the endpoint's own bucket slows down
+    limiter.throttle("/exchange-rate", 1)
+    assert limiter.as_dict() == {"/exchange-rate": 1, "*": 10}
+    limiter.throttle("/opr", 1)
+    assert limiter.as_dict()["*"] == 5
+
+    fixed = RateLimiter(10, adaptive=False)
+    fixed.throttle(None, 1)
+    assert fixed.as_dict() == {"*": 10}
+
+
+def test_as_rate_limiter():
+    assert as_rate_limiter(None) is None
+    limiter = RateLimiter(5)
+    assert as_rate_limiter(limiter) is limiter
+    assert as_rate_limiter(3).as_dict() == {"*": 3}
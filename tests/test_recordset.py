@@ -0,0 +1,103 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from openbnmapi.records import extract_records  # noqa: E402
+from openbnmapi.recordset import CATEGORY, DATE, FLOAT, INT, OBJECT, Column, RecordSet  # noqa: E402
+
+# Exchange rates of a month: records nesting a list of dated rates
+NESTED = {
+    "data": [
+        {"currency_code": "USD", "unit": 1, "rate": [
+            {"date": "2020-01-02", "buying_rate": 4.08, "middle_rate": None},
+            {"date": "2020-01-03", "buying_rate": 4.1, "middle_rate": 4.105},
+        ]},
+        {"currency_code": "JPY", "unit": 100, "rate": [
+            {"date": "2020-01-02", "buying_rate": 3.75, "middle_rate": 3.77},
+        ]},
+    ],
+    "meta": {"quote": "rm", "session": "1130", "total_result": 2},
+}
+
+DAILY = [{"date": "2020-01-{:02d}".format(day), "rate": day / 10} for day in range(1, 11)]
+
+
+def test_column_kinds():
+    assert Column.from_values([1.5, None, 2]).kind == FLOAT
+    assert Column.from_values([1, 2]).kind == INT
+    assert Column.from_values(["2020-01-02", "2020-01-03"]).kind == DATE
+    assert Column.from_values(["2020-02-30"]).kind == CATEGORY
+    assert Column.from_values([1, "a"]).kind == OBJECT
+
+    codes = Column.from_values(["USD", "JPY", None, "USD"])
+    assert codes.labels == ("USD", "JPY")
+    assert list(codes.data) == [0, 1, -1, 0]
+    get = codes.getter()
+    assert [get(i) for i in range(4)] == ["USD", "JPY", None, "USD"]
+
+
+def test_payload_round_trip():
+    rs = RecordSet.from_payload(NESTED)
+    assert len(rs) == 3
+    assert rs.column("rate.middle_rate").kind == FLOAT
+    assert rs.column("currency_code").kind == CATEGORY
+    assert rs.to_payload() == NESTED
+    assert rs.records() == extract_records(NESTED)
+
+
+def test_single_record_round_trip():
+    payload = {"data": {"date": "2020-05-05", "new_opr_level": 2}, "meta": {"total_result": 1}}
+    assert RecordSet.from_payload(payload).to_payload() == payload
+
+
+def test_not_a_bnm_response():
+    with pytest.raises(ValueError):
+        RecordSet.from_payload({"meta": {}})
+    with pytest.raises(ValueError):
+        RecordSet.from_payload({"data": [1, 2]})
+
+
+def test_numeric_columns_are_read_only_views():
+    rs = RecordSet.from_records(DAILY)
+    rates = rs.to_numpy("rate")
+    assert not rates.flags.writeable
+    # Same memory as the column
+    rs.column("rate").data[0] = 42.0
+    assert rates[0] == 42.0
+    assert rs.dates.dtype == np.dtype("datetime64[D]")
+    assert str(rs.dates[-1]) == "2020-01-10"
+
+
+def test_between_sorted_records_is_a_view():
+    rs = RecordSet.from_records(DAILY)
+    assert rs.sorted
+    window = rs.between("2020-01-03", "2020-01-05")
+    assert [record["date"] for record in window.records()] == ["2020-01-03", "2020-01-04", "2020-01-05"]
+    assert np.shares_memory(window.to_numpy("rate"), rs.to_numpy("rate"))
+    assert len(rs.between("2019-01-01", "2019-12-31")) == 0
+
+
+def test_between_unsorted_records_is_a_copy():
+    rs = RecordSet.from_records(list(reversed(DAILY)))
+    assert not rs.sorted
+    window = rs.between("2020-01-03", "2020-01-05")
+    assert [record["date"] for record in window.records()] == ["2020-01-05", "2020-01-04", "2020-01-03"]
+    assert not np.shares_memory(window.to_numpy("rate"), rs.to_numpy("rate"))
+
+
+def test_between_needs_dates():
+    with pytest.raises(ValueError):
+        RecordSet.from_records([{"rate": 1.0}]).between("2020-01-01", "2020-01-02")
+
+
+def test_to_frame_indexes_by_date_and_code():
+    pytest.importorskip("pandas")
+    frame = RecordSet.from_payload(NESTED).to_frame()
+    assert frame.index.names == ["date", "currency_code"]
+    assert list(frame.columns) == ["unit", "rate.buying_rate", "rate.middle_rate"]
+    assert np.isnan(frame["rate.middle_rate"].iloc[0])
+
+
+def test_client_recordset_matches_json(client):
+    rs = client.kijang_emas(year=2020, month=1, rtype="recordset")
+    assert rs.to_payload() == client.kijang_emas(year=2020, month=1)
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from mock_server import MockBNMServer
+
+from openbnmapi import AsyncOpenBNMAPI
+from openbnmapi.exceptions import BNMConnectionError, BNMRateLimitError, BNMServerError, BNMTimeoutError
+from openbnmapi.session import BNMSession, parse_retry_after
+
+from .conftest import make_client
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+    assert parse_retry_after("Wed, 01 Jan 2020 00:00:00 GMT") == 0.0
+
+
+def test_server_errors_are_retried(server):
+    server.script = [503, 502]
+    client = make_client(server, backoff_factor=0.01)
+    try:
+        assert client.overnight_policy_rate()["data"]
+    finally:
+        client.close()
+    assert server.requests == 3
+    assert client.metrics.snapshot()["/opr"]["retries"] == 2
+
+
+def test_retry_after_is_honoured(server):
+    server.script = [(429, {"Retry-After": "1"})]
+    client = make_client(server, backoff_factor=0.01)
+    try:
+        start = time.perf_counter()
+        assert client.overnight_policy_rate()["data"]
+        elapsed = time.perf_counter() - start
+    finally:
+        client.close()
+    assert server.requests == 2
+    assert elapsed >= 0.9
+
+
+def test_retry_after_longer_than_backoff_max_raises(server):
+    server.script = [(429, {"Retry-After": "60"})]
+    client = make_client(server, session=BNMSession(backoff_max=5))
+    try:
+        with pytest.raises(BNMRateLimitError) as error:
+            client.overnight_policy_rate()
+    finally:
+        client.close()
+    assert error.value.retry_after == 60.0
+    assert server.requests == 1
+
+
+def test_exhausted_retries_raise_the_typed_error(server):
+    server.script = [503] * 3 + [429] * 3
+    client = make_client(server, max_retries=2, backoff_factor=0.01)
+    try:
+        with pytest.raises(BNMServerError) as error:
+            client.overnight_policy_rate()
+        assert error.value.status_code == 503
+        with pytest.raises(BNMRateLimitError):
+            client.overnight_policy_rate()
+    finally:
+        client.close()
+    assert server.requests == 6
+
+
+def test_timeouts_raise_bnm_timeout_error():
+    with MockBNMServer(latency=0.5) as server:
+        client = make_client(server, timeout=(1, 0.1), max_retries=1, backoff_factor=0.01)
+        try:
+            with pytest.raises(BNMTimeoutError):
+                client.overnight_policy_rate()
+        finally:
+            client.close()
+        assert server.requests == 2
+
+
+def test_refused_connections_raise_bnm_connection_error():
+    with MockBNMServer() as server:
+        pass
+    # Nothing listens on the port any more
+    client = make_client(server, max_retries=0)
+    try:
+        with pytest.raises(BNMConnectionError) as error:
+            client.overnight_policy_rate()
+    finally:
+        client.close()
+    assert not isinstance(error.value, BNMTimeoutError)
+
+
+def test_async_client_retries(server):
+    server.script = [503, (429, {"Retry-After": "0"})]
+
+    async def main():
+        async with AsyncOpenBNMAPI(backoff_factor=0.01) as client:
+            client.base_url = server.url
+            return await client.overnight_policy_rate()
+
+    assert asyncio.run(main())["data"]
+    assert server.requests == 3
+
+
+def test_async_retry_waits_free_the_concurrency_slot(server):
+    server.script = [(429, {"Retry-After": "1"})]
+
+    async def timed(call):
+        start = time.perf_counter()
+        await call
+        return time.perf_counter() - start
+
+    async def main():
+        async with AsyncOpenBNMAPI(concurrency=1) as client:
+            client.base_url = server.url
+            waiting = asyncio.ensure_future(timed(client.overnight_policy_rate()))
+            await asyncio.sleep(0.1)
+            other = await timed(client.base_rate())
+            return await waiting, other
+
+    waiting, other = asyncio.run(main())
+    assert waiting >= 0.9
+    assert other < 0.5
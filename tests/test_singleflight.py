@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from openbnmapi.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_concurrently(flight, key, func, callers, share=None):
+    # Start `callers` threads calling flight.do while the first call is held inside func
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, func, share))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(flight, key, waiters):
+    while True:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters == waiters:
+                return
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait(5)
+        return "rate"
+
+    threads, results, errors = run_concurrently(flight, "opr", func, 5, share=lambda result: result.upper())
+    wait_for_waiters(flight, "opr", 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and not errors
+    assert sorted(results) == [("RATE", False)] + [("RATE", True)] * 4
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def func():
+        release.wait(5)
+        raise KeyError("opr")
+
+    threads, results, errors = run_concurrently(flight, "opr", func, 3)
+    wait_for_waiters(flight, "opr", 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results
+    assert len(errors) == 3 and all(isinstance(e, KeyError) for e in errors)
+
+
+def test_sequential_calls_are_not_shared():
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("opr", func) == (1, False)
+    assert flight.do("opr", func) == (2, False)
+    with pytest.raises(ValueError):
+        flight.do("opr", lambda: int("x"))
+    assert flight.do("opr", func) == (3, False)
+
+
+def test_async_calls_share_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "rate"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("opr", func) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(results) == [("rate", False)] + [("rate", True)] * 4
+
+
+def test_async_cancelled_leader_does_not_cancel_waiters():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("opr", func))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("opr", func))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter
+
+    # The waiter makes the call again
+    assert asyncio.run(main()) == (2, False)
+    assert len(calls) == 2
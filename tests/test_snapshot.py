@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from mock_server import MockBNMServer
+
+from openbnmapi.exceptions import BNMTimeoutError
+from openbnmapi.snapshot import snapshot_requests
+
+from .conftest import make_client
+
+LATENCY = 0.3
+
+
+def test_default_requests():
+    keys = [key for key, _, _ in snapshot_requests()]
+    assert len(keys) == 17
+    assert "consumer_alert" not in keys
+    assert "interest_rate.interbank" in keys
+    with pytest.raises(ValueError):
+        snapshot_requests(["no_such_endpoint"])
+
+
+def test_snapshot_takes_about_one_round_trip():
+    with MockBNMServer(latency=LATENCY) as server:
+        client = make_client(server)
+        try:
+            # Imports and the like of a first call out of the way
+            client.snapshot(["overnight_policy_rate"])
+            start = time.perf_counter()
+            result = client.snapshot()
+            elapsed = time.perf_counter() - start
+        finally:
+            client.close()
+    assert result["meta"]["returned"] == result["meta"]["requested"] == 17
+    assert not result["errors"]
+    # Every request in flight at once, more than the 10 connections of the default pool
+    assert LATENCY <= elapsed < 1.8 * LATENCY
+    assert client.session.pool_size == 17
+
+
+def test_requests_past_the_deadline_time_out():
+    with MockBNMServer(latency=1) as server:
+        client = make_client(server)
+        try:
+            result = client.snapshot(["kijang_emas", "overnight_policy_rate"], deadline=0.2)
+        finally:
+            client.close()
+    assert sorted(result["meta"]["timed_out"]) == ["kijang_emas", "overnight_policy_rate"]
+    assert isinstance(result["errors"]["kijang_emas"], BNMTimeoutError)
@@ -0,0 +1,31 @@
+from openbnmapi.store import LocalStore
+
+ENDPOINT = "usd_interbank_intraday_rate"
+
+
+def test_replace_drops_the_stored_records_of_the_dates(tmp_path):
+    store = LocalStore(str(tmp_path / "bnm.sqlite"))
+    try:
+        assert store.append(ENDPOINT, [{"date": "2020-01-02", "rate": [{"time": "0900", "rate": 4.1}]}]) == 1
+        # The day was completed
+        revised = [{"date": "2020-01-02", "rate": [{"time": "0900", "rate": 4.1}, {"time": "1000", "rate": 4.2}]}]
+        assert store.append(ENDPOINT, revised, replace=True) == 0
+        assert store.read(ENDPOINT) == revised
+        assert store.append(ENDPOINT, revised, replace=True) == 0
+        assert store.read(ENDPOINT) == revised
+    finally:
+        store.close()
+
+
+def test_sync_twice_keeps_one_copy(tmp_path, client):
+    store = LocalStore(str(tmp_path / "bnm.sqlite"))
+    try:
+        first = store.sync(client, "kl_usd_reference_rate", start="2020-01-01", end="2020-01-31")
+        again = store.sync(client, "kl_usd_reference_rate", end="2020-01-31")
+        records = store.read("kl_usd_reference_rate")
+    finally:
+        store.close()
+    assert first["added"] == len(records) > 0
+    assert again["start"] == first["last_date"]
+    assert again["added"] == 0
+    assert len({record["date"] for record in records}) == len(records)
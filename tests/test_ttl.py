@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from openbnmapi.cache import DAY, MYT, MemoryCache, TTLPolicy
+
+# A Thursday, 10:00 in Kuala Lumpur
+NOW = datetime(2020, 3, 12, 10, 0, tzinfo=MYT)
+
+
+def test_past_dates_never_expire():
+    policy = TTLPolicy()
+    assert policy.ttl("/kijang-emas/date/2020-03-11", NOW) is None
+    assert policy.ttl("/kijang-emas/year/2020/month/2", NOW) is None
+    assert policy.ttl("/exchange-rate/USD/date/2019-12-31", NOW) is None
+
+
+def test_single_digit_dates_are_historical():
+    assert TTLPolicy().ttl("/kijang-emas/date/2020-3-1", NOW) is None
+
+
+def test_today_and_the_current_month_expire():
+    policy = TTLPolicy()
+    assert policy.ttl("/kijang-emas/date/2020-03-12", NOW) is not None
+    assert policy.ttl("/kijang-emas/year/2020/month/3", NOW) is not None
+
+
+def test_exchange_rates_expire_at_the_next_session():
+    # Next session at 11:30
+    assert TTLPolicy().ttl("/exchange-rate", NOW) == 90 * 60
+    evening = NOW.replace(hour=18)
+    # Tomorrow 09:00
+    assert TTLPolicy().ttl("/exchange-rate", evening) == 15 * 60 * 60
+
+
+def test_endpoint_ttls_and_overrides():
+    policy = TTLPolicy({"/opr": 60, "/kijang-emas": lambda path, now: 5}, default_ttl=30)
+    assert policy.ttl("/base-rate", NOW) == DAY
+    assert policy.ttl("/opr", NOW) == 60
+    assert policy.ttl("/kijang-emas", NOW) == 5
+    assert policy.ttl("/interest-rate", NOW) == 30
+
+
+def test_client_caches_by_ttl(server, client):
+    client.cache = MemoryCache()
+    client.kijang_emas(year=2020, month=1)
+    client.kijang_emas(year=2020, month=1)
+    client.base_rate()
+    client.base_rate()
+    assert server.requests == 2
+    assert client.cache.stats.hits == 2
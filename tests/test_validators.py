@@ -0,0 +1,92 @@
+import pytest
+
+from openbnmapi.cache import CachedResponse, ValidatorStore
+from openbnmapi.exceptions import BNMHTTPError
+
+from .conftest import make_client
+
+
+def response(body, **headers):
+    return CachedResponse(200, headers, body, "http://bnm.test/opr")
+
+
+BODY = b'{"data": {"new_opr_level": 1.75}, "meta": {"last_updated": "2020-05-05 15:00:00", "total_result": 1}}'
+
+
+def test_responses_without_validators_are_not_stored():
+    store = ValidatorStore()
+    assert store.set("/opr", response(b'{"data": []}')) is None
+    assert store.get("/opr") is None
+    assert len(store) == 0
+
+
+def test_conditional_headers():
+    store = ValidatorStore()
+    entry = store.set("/opr", response(BODY, ETag='"v1"', **{"Last-Modified": "Tue, 05 May 2020 07:00:00 GMT"}))
+    assert entry.conditional_headers() == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Tue, 05 May 2020 07:00:00 GMT"}
+    assert store.set("/opr", response(BODY)).conditional_headers() == {}
+
+
+def test_least_recently_used_urls_are_dropped():
+    store = ValidatorStore(maxsize=2)
+    for key in ("/a", "/b"):
+        store.set(key, response(BODY))
+    store.get("/a")
+    store.set("/c", response(BODY))
+    assert store.get("/b") is None
+    assert store.get("/a") is not None and store.get("/c") is not None
+
+
+def test_unchanged_by_last_updated():
+    entry = ValidatorStore().set("/opr", response(BODY))
+    assert entry.unchanged(response(BODY.replace(b"1.75", b"2.00")))
+    assert not entry.unchanged(response(BODY.replace(b"15:00:00", b"16:00:00")))
+    # Responses with ETags are judged by the server
+    assert not ValidatorStore().set("/opr", response(BODY, ETag='"v1"')).unchanged(response(BODY))
+
+
+def test_second_request_is_not_modified(etag_server):
+    client = make_client(etag_server, conditional=True)
+    try:
+        first = client.base_rate()
+        second = client.base_rate()
+    finally:
+        client.close()
+    assert first == second
+    assert etag_server.requests == 2
+    assert client.validators.not_modified == 1
+    assert client.validators.bytes_saved > 0
+
+
+def test_conditional_is_off_by_default(etag_server):
+    client = make_client(etag_server)
+    try:
+        client.base_rate()
+        client.base_rate()
+    finally:
+        client.close()
+    assert client.validators is None
+
+
+def test_reused_data_is_a_copy(etag_server):
+    client = make_client(etag_server, conditional=True)
+    try:
+        first = client.base_rate()
+        first["data"].clear()
+        second = client.base_rate()
+    finally:
+        client.close()
+    assert client.validators.not_modified == 1
+    assert len(second["data"]) == 35
+
+
+def test_unexpected_not_modified_raises(server):
+    server.script = [304]
+    client = make_client(server)
+    try:
+        with pytest.raises(BNMHTTPError) as error:
+            client.base_rate()
+    finally:
+        client.close()
+    assert error.value.status_code == 304